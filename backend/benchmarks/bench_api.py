@@ -0,0 +1,548 @@
+"""
+Benchmark of every endpoint of the backend and of the SQL statements behind them.
+
+The application runs in-process against the PostGIS stand-in filled by
+benchmarks/datagen.py and a WCS stand-in serving synthetic terrain. Every case is
+requested a fixed number of times with a fixed number of requests in flight, and the
+latency percentiles and the bytes logged per request are reported. A second, sequential
+pass of a few requests under tracemalloc measures the peak Python memory of a request.
+The results are written as JSON, to be compared between runs with benchmarks/compare.py.
+
+Usage (from the backend directory):
+    python benchmarks/bench_api.py --requests 200 --concurrency 8 --output base.json
+    python benchmarks/bench_api.py --cases boundary,measurements --output new.json
+    python benchmarks/compare.py base.json new.json
+"""
+# pylint: disable=import-error,import-outside-toplevel
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.standin import use_standin_database  # noqa: E402
+
+# A benchmarked request. path and body are called with the iteration and the dataset
+Case = namedtuple(
+    'Case', ['method', 'path', 'body', 'requests', 'headers'], defaults=[None, None, None]
+)
+PACKED = {'Accept': 'application/x-packed-geometry'}
+
+# West, south, east and north of the terrain area fetched, in EPSG:25833
+TERRAIN_BBOX = (270000.0, 7040000.0, 271000.0, 7041000.0)
+
+
+def _terrain_bbox(iteration):
+    """Returns a terrain bounding box unique to the iteration, missing the terrain cache."""
+    west, south, east, north = TERRAIN_BBOX
+    return f'{west + iteration},{south},{east + iteration},{north}'
+
+
+def _inquiry(iteration, dataset):
+    """Returns the inquiry requested in an iteration, cycling through all of them."""
+    return dataset['inquiry_ids'][iteration % len(dataset['inquiry_ids'])]
+
+
+def _inquiries(iteration, dataset, count=20):
+    """Returns the comma separated IDs of the inquiries following that of an iteration."""
+    return ','.join(str(_inquiry(iteration + offset, dataset)) for offset in range(count))
+
+
+def _viewport(iteration, dataset, size=0.005):
+    """Returns a viewport of about 500 by 250 metres around the point of an iteration."""
+    point = dataset['points'][iteration % len(dataset['points'])]
+    west, south = point['lon'] - size, point['lat'] - size / 2
+    return f'{west},{south},{west + 2 * size},{south + size}'
+
+
+def _point_update(point):
+    """Returns a coordinate update writing back the current values of a point."""
+    return {'hoyde': point['height'], 'lat': point['lat'], 'lon': point['lon']}
+
+
+def _batch_update(iteration, dataset):
+    """Returns a batch coordinate update of the next 100 points."""
+    points = dataset['points']
+    size = min(100, len(points))
+    start = iteration * size % len(points)
+    batch = (points + points)[start : start + size]
+    return {str(point['id']): _point_update(point) for point in batch}
+
+
+# Read-only cases first, as edits trigger refreshes of the materialized views
+CASES = {
+    'root': Case('GET', lambda i, d: '/'),
+    'inquiries': Case('GET', lambda i, d: '/inquiries'),
+    'inquiries_page': Case('GET', lambda i, d: '/inquiries?limit=50'),
+    'inquiries_stream': Case('GET', lambda i, d: '/inquiries/stream'),
+    'boundary': Case(
+        'GET', lambda i, d: f'/geometries/area/boundary/inquiry/{_inquiry(i, d)}'
+    ),
+    'working_area': Case(
+        'GET', lambda i, d: f'/geometries/area/working_area/inquiry/{_inquiry(i, d)}'
+    ),
+    'measurements': Case(
+        'GET', lambda i, d: f'/geometries/measurements/inquiry/{_inquiry(i, d)}'
+    ),
+    'cable_points': Case(
+        'GET',
+        lambda i, d: f'/geometries/measurements/cable_points/inquiry/{_inquiry(i, d)}',
+    ),
+    'measurements_packed': Case(
+        'GET',
+        lambda i, d: f'/geometries/measurements/inquiry/{_inquiry(i, d)}',
+        headers=PACKED,
+    ),
+    'cable_points_packed': Case(
+        'GET',
+        lambda i, d: f'/geometries/measurements/cable_points/inquiry/{_inquiry(i, d)}',
+        headers=PACKED,
+    ),
+    'measurements_lod': Case(
+        'GET', lambda i, d: f'/geometries/measurements/inquiry/{_inquiry(i, d)}?lod=3'
+    ),
+    'cable_points_lod': Case(
+        'GET',
+        lambda i, d: f'/geometries/measurements/cable_points/inquiry/{_inquiry(i, d)}?lod=3',
+    ),
+    'bbox': Case('GET', lambda i, d: f'/geometries/bbox?bbox={_viewport(i, d)}'),
+    'bbox_region': Case(
+        'GET', lambda i, d: f'/geometries/bbox?bbox={_viewport(i, d, 0.2)}&limit=2000'
+    ),
+    'images': Case('GET', lambda i, d: f'/images/inquiry/{_inquiry(i, d)}'),
+    'image_manifests': Case('GET', lambda i, d: f'/images/inquiries?ids={_inquiries(i, d)}'),
+    'scene': Case('GET', lambda i, d: f'/scene/inquiry/{_inquiry(i, d)}'),
+    'fetch_geotiff': Case(
+        'GET',
+        lambda i, d: f'/fetch-geotiff?bbox={_terrain_bbox(i)}&width=1000&height=1000',
+        requests='terrain',
+    ),
+    'fetch_geotiff_mosaic': Case(
+        'GET',
+        lambda i, d: (
+            f'/fetch-geotiff?bbox={_terrain_bbox(i)}&width=3000&height=3000&mosaic=true'
+        ),
+        requests='terrain',
+    ),
+    'process_geotiff': Case('JOB', None, requests='terrain'),
+    'metrics': Case('GET', lambda i, d: '/metrics'),
+    'cache_stats': Case('GET', lambda i, d: '/cache/stats'),
+    'db_pool_stats': Case('GET', lambda i, d: '/db/pool/stats'),
+    'views_status': Case('GET', lambda i, d: '/views/status'),
+    'update_coordinates': Case(
+        'PUT',
+        lambda i, d: f'/update-coordinates/{d["points"][i % len(d["points"])]["id"]}',
+        lambda i, d: _point_update(d['points'][i % len(d['points'])]),
+    ),
+    'update_coordinates_batch': Case('PUT', lambda i, d: '/update-coordinates', _batch_update),
+}
+
+# Statements executed by the endpoints, with the parameters of an iteration
+SQL_CASES = {
+    'inquiry/fetch_inquiries_page': lambda i, d: {
+        'limit': 50,
+        'cursor': None,
+        'status': None,
+        'municipality': None,
+        'organization': None,
+    },
+    'geometry/fetch_boundary_geometry_by_inquiry': lambda i, d: {'inquiry_id': _inquiry(i, d)},
+    'geometry/fetch_working_area_by_inquiry': lambda i, d: {'inquiry_id': _inquiry(i, d)},
+    'geometry/fetch_measurement_geometry_by_inquiry': lambda i, d: {
+        'inquiry_id': _inquiry(i, d)
+    },
+    'geometry/fetch_points_of_cables_by_inquiry': lambda i, d: {'inquiry_id': _inquiry(i, d)},
+    'geometry/fetch_geometry_by_bbox': lambda i, d: {
+        **dict(zip(('west', 'south', 'east', 'north'), map(float, _viewport(i, d).split(',')))),
+        'include_areas': True,
+        'include_measurements': True,
+        'cursor_inquiry': None,
+        'cursor_kind': None,
+        'cursor_id': None,
+        'limit': 500,
+    },
+    'fetch_images_by_inquiry_id': lambda i, d: {'inquiry_id': _inquiry(i, d)},
+    'fetch_image_manifests': lambda i, d: {
+        'inquiry_ids': [int(value) for value in _inquiries(i, d).split(',')]
+    },
+}
+
+# Statements run on the public schema
+PUBLIC_SQL_CASES = ('fetch_images_by_inquiry_id', 'fetch_image_manifests')
+
+
+class LogVolume(logging.Handler):
+    """Counts the bytes the application logs, as its handlers would write them."""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.setFormatter(
+            logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        )
+        self.bytes = 0
+
+    def emit(self, record):
+        self.bytes += len(self.format(record).encode('utf-8')) + 1
+
+
+def summarize(latencies):
+    """Returns the count, mean and percentiles of latencies in milliseconds.
+
+    Args:
+        latencies (list): The latencies in seconds.
+
+    Returns:
+        dict: count, mean_ms, p50_ms, p95_ms, p99_ms and max_ms.
+    """
+    milliseconds = sorted(latency * 1000 for latency in latencies)
+    if len(milliseconds) > 1:
+        quantiles = statistics.quantiles(milliseconds, n=100, method='inclusive')
+        p50, p95, p99 = quantiles[49], quantiles[94], quantiles[98]
+    else:
+        p50 = p95 = p99 = milliseconds[0] if milliseconds else 0.0
+    return {
+        'count': len(milliseconds),
+        'mean_ms': statistics.fmean(milliseconds) if milliseconds else 0.0,
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'max_ms': milliseconds[-1] if milliseconds else 0.0,
+    }
+
+
+def measure_memory(call, iterations):
+    """Returns the highest Python memory peak of sequential calls, in bytes.
+
+    Args:
+        call (callable): Called with the iteration, the measured work.
+        iterations (iterable): The iterations to call it with.
+    """
+    peak = 0
+    tracemalloc.start()
+    try:
+        for iteration in iterations:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            call(iteration)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+async def measure_memory_async(call, iterations):
+    """Returns the highest Python memory peak of sequential awaited calls, in bytes.
+
+    Args:
+        call (callable): Called with the iteration, returning the measured awaitable.
+        iterations (iterable): The iterations to call it with.
+    """
+    peak = 0
+    tracemalloc.start()
+    try:
+        for iteration in iterations:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await call(iteration)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def load_dataset(connection):
+    """Reads the inquiries and points the benchmarks request from the stand-in."""
+    inquiry_ids = [
+        row[0]
+        for row in connection.exec_driver_sql(
+            'SELECT inquiry_id FROM "Measurements_by_Inquiry" GROUP BY inquiry_id ORDER BY 1'
+        )
+    ]
+    points = [
+        {'id': row[0], 'height': row[1], 'lon': row[2], 'lat': row[3]}
+        for row in connection.exec_driver_sql(
+            'SELECT id, hoyde, public.ST_X(geom), public.ST_Y(geom) '
+            'FROM public.ledningsmaaling_innmaaling_punkt ORDER BY id LIMIT 1000'
+        )
+    ]
+    counts = {
+        table: connection.exec_driver_sql(f'SELECT COUNT(*) FROM public.{table}').scalar()
+        for table in (
+            'henvendelse',
+            'ledningsmaaling_innmaaling',
+            'ledningsmaaling_innmaaling_punkt',
+        )
+    }
+    if not inquiry_ids:
+        raise SystemExit('The benchmark database is empty, run benchmarks/datagen.py first')
+    return {'inquiry_ids': inquiry_ids, 'points': points, 'counts': counts}
+
+
+async def run_case(client, case, dataset, iterations, concurrency, before_request):
+    """Requests a case once per iteration and returns the latencies and failed requests.
+
+    Args:
+        client (AsyncClient): The client of the application.
+        case (Case): The case.
+        dataset (dict): The dataset, as returned by load_dataset.
+        iterations (range): The iterations the requests are built for.
+        concurrency (int): The maximum number of requests in flight.
+        before_request (callable): Called before every request.
+
+    Returns:
+        tuple: The latency of every request in seconds, the number of failures and the
+        total size of the response bodies in bytes.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+    size = 0
+
+    async def request(iteration):
+        nonlocal failures, size
+        async with semaphore:
+            before_request()
+            start = time.perf_counter()
+            if case.method == 'JOB':
+                ok = await run_tile_job(client, iteration, dataset)
+            else:
+                body = case.body(iteration, dataset) if case.body else None
+                response = await client.request(
+                    case.method, case.path(iteration, dataset), json=body, headers=case.headers
+                )
+                ok = response.status_code < 400
+                size += response.num_bytes_downloaded
+            failures += not ok
+            return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*(request(iteration) for iteration in iterations))
+    return latencies, failures, size
+
+
+async def run_tile_job(client, iteration, dataset):
+    """Queues a tile job for the fetched terrain model and polls it until it finishes.
+
+    The bounding box differs slightly between iterations, so every job regenerates the
+    tiles instead of returning the previous job.
+    """
+    west, south, east, north = dataset['terrain_bounds']
+    inset = (iteration + 1) * 1e-7
+    bbox = f'{west + inset},{south + inset},{east - inset},{north - inset}'
+    response = await client.get(
+        '/process-geotiff', params={'file_path': dataset['terrain_file'], 'bbox': bbox}
+    )
+    if response.status_code >= 400:
+        return False
+    job = response.json()
+    while job['status'] not in ('done', 'failed'):
+        await asyncio.sleep(0.02)
+        job = (await client.get(job['status_url'])).json()
+    return job['status'] == 'done'
+
+
+def run_sql_cases(names, dataset, requests):
+    """Times execute_sql and the row conversion of every statement sequentially."""
+    from database import SCHEMA, SCHEMA_PUBLIC, connect
+    from sql_executer import QUERIES_DIR, SQL_EXTENSION, execute_sql, fetch_dicts
+
+    results = {}
+    for name in names:
+        params = SQL_CASES[name]
+        schema = SCHEMA_PUBLIC if name in PUBLIC_SQL_CASES else SCHEMA
+        path = os.path.join(QUERIES_DIR, name + SQL_EXTENSION)
+        if not os.path.exists(path):
+            path = os.path.join(QUERIES_DIR, name + SQL_EXTENSION.upper())
+        with connect(schema) as connection:
+
+            def call(iteration, connection=connection, path=path, params=params):
+                result = execute_sql(connection, path, params=params(iteration, dataset))
+                fetch_dicts(result, name)
+
+            latencies = []
+            for iteration in range(requests):
+                start = time.perf_counter()
+                call(iteration)
+                latencies.append(time.perf_counter() - start)
+            memory = measure_memory(call, range(min(requests, 5)))
+        results[f'sql:{name}'] = {**summarize(latencies), 'peak_memory_bytes': memory}
+        print_result(f'sql:{name}', results[f'sql:{name}'])
+    return results
+
+
+async def run_endpoint_cases(names, dataset, args):
+    """Requests every endpoint case and returns its summary."""
+    import httpx
+    from common.cache import response_cache
+    from main import app
+
+    before_request = (lambda: None) if args.warm_cache else response_cache.clear
+    transport = httpx.ASGITransport(app=app)
+    log_volume = LogVolume()
+    logging.getLogger().addHandler(log_volume)
+    results = {}
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url='http://bench', timeout=None
+    ) as client:
+        if 'process_geotiff' in names:
+            response = await client.get(
+                '/fetch-geotiff', params={'bbox': _terrain_bbox(-1), 'width': 500, 'height': 500}
+            )
+            dataset['terrain_file'] = response.json()['file_path']
+            dataset['terrain_bounds'] = _raster_bounds(dataset['terrain_file'])
+
+        # Iterations are never reused, so every terrain request misses the cache
+        next_iteration = 0
+
+        def take(count):
+            nonlocal next_iteration
+            next_iteration += count
+            return range(next_iteration - count, next_iteration)
+
+        for name in names:
+            case = CASES[name]
+            requests = args.terrain_requests if case.requests == 'terrain' else args.requests
+            await run_case(
+                client, case, dataset, take(min(args.warmup, requests)), 1, before_request
+            )
+            log_volume.bytes = 0
+            start = time.perf_counter()
+            latencies, failures, size = await run_case(
+                client, case, dataset, take(requests), args.concurrency, before_request
+            )
+            elapsed = time.perf_counter() - start
+            log_bytes = log_volume.bytes
+            memory = await measure_memory_async(
+                lambda iteration, case=case: run_case(
+                    client, case, dataset, range(iteration, iteration + 1), 1, before_request
+                ),
+                take(args.memory_requests),
+            )
+            results[name] = {
+                **summarize(latencies),
+                'failures': failures,
+                'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+                'response_bytes': size // len(latencies) if latencies else 0,
+                'log_bytes': log_bytes // len(latencies) if latencies else 0,
+                'peak_memory_bytes': memory,
+            }
+            print_result(name, results[name])
+    logging.getLogger().removeHandler(log_volume)
+    return results
+
+
+def _raster_bounds(file_path):
+    """Returns the west, south, east and north edges of a GeoTIFF in degrees."""
+    from terrain.tiler import open_raster, raster_bounds
+
+    return raster_bounds(open_raster(file_path))
+
+
+def print_result(name, result):
+    """Prints the latency and memory of a case on one line."""
+    failures = result.get('failures', 0)
+    print(
+        f'{name:>50}: p50 {result["p50_ms"]:8.1f} ms  p95 {result["p95_ms"]:8.1f} ms  '
+        f'p99 {result["p99_ms"]:8.1f} ms  peak {result["peak_memory_bytes"] / 2**20:7.1f} MiB'
+        + (f'  {failures} failed' if failures else '')
+    )
+
+
+def git_commit():
+    """Returns the checked out commit, or None outside of a git repository."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    """Parses the arguments, runs the selected cases and writes the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        '--cases',
+        help='Comma separated cases, sql:<statement> for a statement. Defaults to all.',
+    )
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--terrain-requests', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--memory-requests', type=int, default=3)
+    parser.add_argument(
+        '--warm-cache',
+        action='store_true',
+        help='Keep the geometry response cache between requests instead of clearing it',
+    )
+    parser.add_argument('--wcs-delay', type=float, default=0.0)
+    parser.add_argument('--output', help='File the results are written to as JSON')
+    args = parser.parse_args()
+
+    names = list(CASES) + [f'sql:{name}' for name in SQL_CASES]
+    if args.cases:
+        names = [name.strip() for name in args.cases.split(',') if name.strip()]
+        unknown = [name for name in names if name not in CASES and name[4:] not in SQL_CASES]
+        if unknown:
+            parser.error(f'Unknown cases: {unknown}')
+
+    # The stand-ins are configured before the backend modules read their settings
+    use_standin_database()
+    from benchmarks.wcs_stub import serve
+
+    work_dir = tempfile.mkdtemp(prefix='bench-')
+    wcs_url, wcs_server = serve(delay=args.wcs_delay)
+    os.environ['WCS_URL'] = wcs_url
+    os.environ['TERRAIN_CACHE_DIR'] = os.path.join(work_dir, 'terrain_cache')
+    os.environ['TERRAIN_OUTPUT_DIR'] = os.path.join(work_dir, 'tiles')
+    from database import SCHEMA, engines
+
+    with engines[SCHEMA].connect() as connection:
+        dataset = load_dataset(connection)
+
+    sql_names = [name[4:] for name in names if name.startswith('sql:')]
+    endpoint_names = [name for name in names if name in CASES]
+    results = asyncio.run(run_endpoint_cases(endpoint_names, dataset, args))
+    results.update(run_sql_cases(sql_names, dataset, args.requests))
+    wcs_server.shutdown()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'dataset': dataset['counts'],
+            'settings': {
+                key: getattr(args, key)
+                for key in (
+                    'requests',
+                    'terrain_requests',
+                    'concurrency',
+                    'warm_cache',
+                    'wcs_delay',
+                )
+            },
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark comparing the throughput of the sync and async database paths.
+
+Both paths run the same query function the same number of times with the same
+number of requests in flight. The sync path runs each call on a thread with a
+blocking connection, like the former `def` endpoints, while the async path runs
+them as tasks on the event loop, like the `async def` endpoints.
+
+Usage (from the backend directory):
+    python benchmarks/bench_async.py --inquiry-id 1234 --concurrency 50 --requests 500
+"""
+# pylint: disable=import-error
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import SCHEMA, async_engines, engines, run_query  # noqa: E402
+from queries import (  # noqa: E402
+    query_boundary_geometry_by_inquiry,
+    query_measurement_geometry_by_inquiry,
+    query_points_of_cables_by_inquiry,
+    query_working_area_geometry_by_inquiry,
+)
+
+# The cached wrappers would turn every call after the first into a cache hit
+QUERIES = {
+    'boundary': query_boundary_geometry_by_inquiry.uncached,
+    'working_area': query_working_area_geometry_by_inquiry.uncached,
+    'measurements': query_measurement_geometry_by_inquiry.uncached,
+    'cable_points': query_points_of_cables_by_inquiry.uncached,
+}
+
+
+def run_sync(query, inquiry_id, concurrency, requests):
+    """Runs the query on a thread pool with blocking connections.
+
+    Returns:
+        list: The latency of every call in seconds.
+    """
+
+    def call():
+        start = time.perf_counter()
+        with engines[SCHEMA].connect() as connection:
+            query(inquiry_id, connection)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda _: call(), range(requests)))
+
+
+async def run_async(query, inquiry_id, concurrency, requests):
+    """Runs the query as event loop tasks with async connections.
+
+    Returns:
+        list: The latency of every call in seconds.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            start = time.perf_counter()
+            async with async_engines[SCHEMA].connect() as connection:
+                await run_query(connection, query, inquiry_id)
+            return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*(call() for _ in range(requests)))
+    await async_engines[SCHEMA].dispose()
+    return latencies
+
+
+def report(name, latencies, elapsed):
+    """Prints throughput and latency percentiles of a run."""
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f'{name:>5}: {len(latencies) / elapsed:8.1f} req/s  '
+        f'p50 {quantiles[49] * 1000:7.1f} ms  '
+        f'p95 {quantiles[94] * 1000:7.1f} ms  '
+        f'p99 {quantiles[98] * 1000:7.1f} ms'
+    )
+
+
+def main():
+    """Parses the arguments and runs both paths."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--inquiry-id', type=int, required=True)
+    parser.add_argument('--query', choices=sorted(QUERIES), default='measurements')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    query = QUERIES[args.query]
+
+    start = time.perf_counter()
+    latencies = run_sync(query, args.inquiry_id, args.concurrency, args.requests)
+    report('sync', latencies, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run_async(query, args.inquiry_id, args.concurrency, args.requests))
+    report('async', latencies, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
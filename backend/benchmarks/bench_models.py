@@ -0,0 +1,159 @@
+"""
+Benchmark of the memory and time taken by the GeoJSON models on a large collection.
+
+A FeatureCollection of point features, like the cable points of a large inquiry, is
+loaded into the pydantic models of models/geojson_models.py and into the compact
+models of models/compact_geometry.py. For each the time to build the models from the
+decoded GeoJSON, the Python memory they retain and the peak while building, measured
+with tracemalloc, and the time to serialize them as JSON are reported.
+
+Usage (from the backend directory):
+    python benchmarks/bench_models.py --points 100000 --output models.json
+"""
+# pylint: disable=import-error
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.compact_geometry import CompactFeatureCollection  # noqa: E402
+from models.geojson_models import FeatureCollection  # noqa: E402
+
+
+def point_collection(points, seed=0):
+    """Generates a FeatureCollection of 3D points with the properties of cable points.
+
+    Args:
+        points (int): The number of point features.
+        seed (int, optional): The seed of the coordinates. Defaults to 0.
+
+    Returns:
+        dict: The FeatureCollection.
+    """
+    generator = random.Random(seed)
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'geometry': {
+                    'type': 'Point',
+                    'coordinates': [
+                        10.4 + generator.random() * 0.01,
+                        63.4 + generator.random() * 0.01,
+                        generator.uniform(0.0, 100.0),
+                    ],
+                },
+                'properties': {'point_id': index, 'cable_id': index // 100},
+            }
+            for index in range(points)
+        ],
+    }
+
+
+def _pydantic_json(collection):
+    """Serializes a pydantic FeatureCollection."""
+    return collection.model_dump_json().encode('utf-8')
+
+
+MODELS = {
+    'pydantic': (FeatureCollection.model_validate, _pydantic_json),
+    'compact': (CompactFeatureCollection.from_geojson, CompactFeatureCollection.to_json),
+}
+
+
+def measure(build, serialize, document):
+    """Builds and serializes the models of a document once.
+
+    Times are measured first, then the memory in a second build under tracemalloc,
+    which would slow down the first.
+
+    Returns:
+        dict: The build and serialization times in seconds, the memory retained by the
+        models and the peak memory while building them in bytes, and the size of the
+        JSON.
+    """
+    start = time.perf_counter()
+    models = build(document)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    body = serialize(models)
+    serialize_seconds = time.perf_counter() - start
+    del models
+
+    gc.collect()
+    tracemalloc.start()
+    models = build(document)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The models are only kept alive until their memory is measured
+    del models
+    return {
+        'build_seconds': build_seconds,
+        'serialize_seconds': serialize_seconds,
+        'retained_bytes': retained,
+        'peak_bytes': peak,
+        'json_bytes': len(body),
+    }
+
+
+def run(points, repeat=3, seed=0):
+    """Measures every model on a collection of points, keeping the best run.
+
+    The decoded document is frozen out of the garbage collector, so collections of
+    its objects are not counted against the models.
+
+    Args:
+        points (int): The number of point features.
+        repeat (int, optional): The number of runs of every model. Defaults to 3.
+        seed (int, optional): The seed of the coordinates. Defaults to 0.
+
+    Returns:
+        dict: The lowest measurements of every model.
+    """
+    document = point_collection(points, seed)
+    gc.collect()
+    gc.freeze()
+    try:
+        results = {}
+        for name, (build, serialize) in MODELS.items():
+            runs = [measure(build, serialize, document) for _ in range(repeat)]
+            results[name] = {key: min(run[key] for run in runs) for key in runs[0]}
+    finally:
+        gc.unfreeze()
+    return results
+
+
+def main():
+    """Parses the arguments, runs the benchmark and prints the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--points', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = run(args.points, args.repeat, args.seed)
+    print(
+        f'{"model":<10} {"build ms":>10} {"serialize ms":>13} '
+        f'{"retained MiB":>13} {"peak MiB":>10}'
+    )
+    for name, result in results.items():
+        print(
+            f'{name:<10} {result["build_seconds"] * 1000:>10.1f} '
+            f'{result["serialize_seconds"] * 1000:>13.1f} '
+            f'{result["retained_bytes"] / 2**20:>13.1f} {result["peak_bytes"] / 2**20:>10.1f}'
+        )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'points': args.points, 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Compares two result files of benchmarks/bench_api.py.
+
+Prints the change of the latency percentiles, memory peak and log volume of every case
+run in both, and exits with status 1 if a case regressed by more than the threshold.
+
+Usage (from the backend directory):
+    python benchmarks/compare.py base.json new.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+# Compared metrics, and those deciding whether a case regressed
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'peak_memory_bytes', 'log_bytes')
+GATING_METRICS = ('p95_ms', 'peak_memory_bytes')
+LABELS = {'peak_memory_bytes': 'peak', 'log_bytes': 'log'}
+
+
+def change(base, new):
+    """Returns the relative change from base to new in percent."""
+    if base == 0:
+        return 0.0 if new == 0 else float('inf')
+    return (new - base) / base * 100
+
+
+def compare(base, new, threshold=10.0):
+    """Compares the results of two runs.
+
+    Args:
+        base (dict): The report of the reference run.
+        new (dict): The report of the run checked.
+        threshold (float, optional): The relative increase in percent of the p95 latency
+            or memory peak above which a case has regressed. Defaults to 10.
+
+    Returns:
+        list: Per case run in both, a dictionary with its name, the base and new value
+        and change of every metric, and whether it regressed.
+    """
+    rows = []
+    for name, base_result in base['results'].items():
+        new_result = new['results'].get(name)
+        if new_result is None:
+            continue
+        row = {'case': name, 'regressed': False}
+        for metric in METRICS:
+            # Results written before a metric was added lack it
+            if metric not in base_result or metric not in new_result:
+                continue
+            delta = change(base_result[metric], new_result[metric])
+            row[metric] = {
+                'base': base_result[metric],
+                'new': new_result[metric],
+                'change_percent': delta,
+            }
+            if metric in GATING_METRICS and delta > threshold:
+                row['regressed'] = True
+        rows.append(row)
+    return rows
+
+
+def _format(metric, value):
+    """Formats a value of a metric for the table."""
+    if metric == 'peak_memory_bytes':
+        return f'{value / 2**20:.1f} MiB'
+    if metric == 'log_bytes':
+        return f'{value} B'
+    return f'{value:.1f} ms'
+
+
+def main():
+    """Prints the comparison of two result files and fails on regressions."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('base', help='Results of the reference run')
+    parser.add_argument('new', help='Results of the run to check')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=10.0,
+        help='Percent increase of p95 latency or memory peak counted as a regression',
+    )
+    args = parser.parse_args()
+    with open(args.base, encoding='utf-8') as file:
+        base = json.load(file)
+    with open(args.new, encoding='utf-8') as file:
+        new = json.load(file)
+
+    if base['meta'].get('dataset') != new['meta'].get('dataset'):
+        print('Warning: the runs used datasets of different sizes')
+    print(f'{base["meta"].get("commit")} -> {new["meta"].get("commit")}')
+    rows = compare(base, new, args.threshold)
+    for row in rows:
+        cells = [
+            f'{LABELS.get(metric, metric[:-3])} '
+            f'{_format(metric, row[metric]["new"])} ({row[metric]["change_percent"]:+.1f}%)'
+            for metric in METRICS
+            if metric in row
+        ]
+        marker = '  REGRESSED' if row['regressed'] else ''
+        print(f'{row["case"]:>50}: ' + '  '.join(cells) + marker)
+    sys.exit(1 if any(row['regressed'] for row in rows) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+"""
+Synthetic data generator filling the benchmark database at a configurable scale.
+
+Every inquiry gets a working area, one inquiry measurement with `cables` cable
+measurements of `points` points each, a few standalone point measurements and images.
+The data is generated from a seed, so runs at the same scale query the same rows.
+Inquiries are spread over a square of `region-size` metres; a smaller region gives the
+dense, overlapping data the viewport queries of /geometries/bbox are benchmarked with.
+
+Usage (from the backend directory, against the database of benchmarks/docker-compose.yml):
+    python benchmarks/datagen.py --inquiries 200 --cables 10 --points 50
+"""
+# pylint: disable=import-error
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.standin import use_standin_database  # noqa: E402
+from common.projection import WGS84, transform_points  # noqa: E402
+from view_refresh import MATERIALIZED_VIEWS  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_FILE = os.path.join(BACKEND_DIR, 'benchmarks', 'schema.sql')
+VIEWS_DIR = os.path.join(BACKEND_DIR, 'sql', 'views')
+
+# The views of the analytics schema queried by the backend, in dependency order
+VIEW_FILES = (
+    'psuedo_tables/view_Inquiry.sql',
+    'indexes/unique_indexes_materialized_views.sql',
+    'indexes/spatial_indexes_materialized_views.sql',
+    'indexes/image_lookup_indexes.sql',
+    'point/view_point_coordinates_with_height.sql',
+    'cable/view_cables_by_measurement.sql',
+    'cable/view_cables_as_geojson.sql',
+    'cable/view_cables_as_geojson_3d.sql',
+    'cable/view_cable_lines.sql',
+    'point/view_points_by_measurements_as_geojson.sql',
+    'point/view_standalone_points_by_measurements_as_geojson.sql',
+    'measurement/view_measurements_as_geojson.sql',
+    'measurement/view_measurements_as_geojson_3d.sql',
+    'inquiry/view_measurement_by_inquiry.sql',
+    'geometry/view_geometry_from_area_by_inquiry_as_geometry.sql',
+    'geometry/view_measurement_geometry_by_inquiry.sql',
+    'point/view_points_of_cables_as_geojson.sql',
+    'point/view_points_of_cables_as_geojson_by_inquiry.sql',
+)
+
+# Columns of every generated table, in load order
+TABLE_COLUMNS = {
+    'organisasjon': ('id', 'navn'),
+    'kommune': ('id', 'navn'),
+    'henvendelse': (
+        'id',
+        'navn',
+        'beskrivelse',
+        'status',
+        'fra_dato',
+        'til_dato',
+        'gateadresse',
+        'kommune_id',
+        'organisasjon_id',
+    ),
+    'geometri': ('id', 'henvendelse_id', 'geom'),
+    'henvendelse_ledningsmaaling': ('id', 'henvendelse_id'),
+    'ledningsmaaling_innmaaling': (
+        'id',
+        'henvendelse_ledningsmaaling_id',
+        'navn',
+        'metadata',
+        'geojson',
+    ),
+    'ledningsmaaling_innmaaling_punkt': (
+        'id',
+        'navn',
+        'bruker_id',
+        'geom',
+        'survey_geom',
+        'noyaktighet_z',
+        'hoyde',
+        'tidpunkt',
+        'metadata',
+    ),
+    'ledningsmaaling_innmaaling_kobling': (
+        'ledningsmaaling_innmaaling_id',
+        'ledningsmaaling_innmaaling_punkt_id',
+    ),
+    'vedlegg': ('id', 'bra_arkiv_id', 'beskrivelse', 'bearing', 'filnavn'),
+    'ledningsmaaling_innmaaling_bilde': (
+        'id',
+        'ledningsmaaling_innmaaling_punkt_id',
+        'bra_arkiv_id',
+        'geom',
+        'tidspunkt',
+    ),
+}
+
+# Inquiries are spread over an area around Trondheim, in EPSG:25833
+ORIGIN = (265000.0, 7035000.0)
+REGION_SIZE = 20000.0
+WORKING_AREA_SIZE = 200.0
+POINT_SPACING = 2.0
+STATUSES = (1, 2, 3, 4, 8)
+FEATURE_TYPES = ('Strøm', 'Tele', 'Fiber', 'Vann', 'Avløp')
+
+
+def generate(
+    inquiries,
+    cables,
+    points,
+    standalone_points=2,
+    images=2,
+    organizations=20,
+    municipalities=50,
+    seed=0,
+    region_size=REGION_SIZE,
+):
+    """Generates the rows of every table.
+
+    Args:
+        inquiries (int): The number of inquiries.
+        cables (int): The number of cable measurements per inquiry.
+        points (int): The number of points per cable measurement, at least 2.
+        standalone_points (int, optional): Single point measurements per inquiry.
+            Defaults to 2.
+        images (int, optional): Images per inquiry. Defaults to 2.
+        organizations (int, optional): The number of organizations. Defaults to 20.
+        municipalities (int, optional): The number of municipalities. Defaults to 50.
+        seed (int, optional): The seed of the generator. Defaults to 0.
+        region_size (float, optional): The side in metres of the square the working
+            areas are spread over. Defaults to REGION_SIZE.
+
+    Returns:
+        dict: A list of row tuples per table, in the column order of TABLE_COLUMNS.
+
+    Raises:
+        ValueError: If a cable would have fewer than two points.
+    """
+    if points < 2:
+        raise ValueError('A cable measurement needs at least two points')
+    rng = random.Random(seed)
+    tables = {table: [] for table in TABLE_COLUMNS}
+    tables['organisasjon'] = [(i, f'Organisasjon {i}') for i in range(1, organizations + 1)]
+    tables['kommune'] = [(i, f'Kommune {i}') for i in range(1, municipalities + 1)]
+    start = datetime(2024, 1, 1)
+
+    measurement_id = point_id = image_id = 0
+    point_xs, point_ys, point_rows = [], [], []
+    for inquiry_id in range(1, inquiries + 1):
+        min_x = ORIGIN[0] + rng.random() * region_size
+        min_y = ORIGIN[1] + rng.random() * region_size
+        max_x, max_y = min_x + WORKING_AREA_SIZE, min_y + WORKING_AREA_SIZE
+        from_date = start + timedelta(days=rng.randrange(365))
+        tables['henvendelse'].append(
+            (
+                inquiry_id,
+                f'Henvendelse {inquiry_id}',
+                f'Graving ved adresse {inquiry_id}',
+                rng.choice(STATUSES),
+                from_date,
+                from_date + timedelta(days=rng.randrange(1, 60)),
+                f'Gate {rng.randrange(1, 200)}',
+                rng.randrange(1, municipalities + 1),
+                rng.randrange(1, organizations + 1),
+            )
+        )
+        tables['geometri'].append(
+            (
+                inquiry_id,
+                inquiry_id,
+                f'SRID=25833;POLYGON(({min_x} {min_y},{max_x} {min_y},{max_x} {max_y},'
+                f'{min_x} {max_y},{min_x} {min_y}))',
+            )
+        )
+        tables['henvendelse_ledningsmaaling'].append((inquiry_id, inquiry_id))
+        first_point_id = point_id + 1
+
+        # Cables are random walks inside the working area, standalone points single steps
+        for count in [points] * cables + [1] * standalone_points:
+            measurement_id += 1
+            tables['ledningsmaaling_innmaaling'].append(
+                (
+                    measurement_id,
+                    inquiry_id,
+                    rng.choice(FEATURE_TYPES),
+                    json.dumps({'source': 'datagen'}),
+                    None,
+                )
+            )
+            x = min_x + rng.random() * WORKING_AREA_SIZE
+            y = min_y + rng.random() * WORKING_AREA_SIZE
+            heading = rng.random() * 2 * math.pi
+            for _ in range(count):
+                point_id += 1
+                heading += rng.uniform(-0.3, 0.3)
+                x = min(max(x + POINT_SPACING * math.cos(heading), min_x), max_x)
+                y = min(max(y + POINT_SPACING * math.sin(heading), min_y), max_y)
+                point_xs.append(x)
+                point_ys.append(y)
+                point_rows.append((point_id, from_date, 20.0 + 5.0 * rng.random()))
+                tables['ledningsmaaling_innmaaling_kobling'].append((measurement_id, point_id))
+
+        for _ in range(images):
+            image_id += 1
+            tables['vedlegg'].append(
+                (
+                    image_id,
+                    image_id,
+                    f'Bilde {image_id}',
+                    rng.random() * 360,
+                    f'bilde_{image_id}.jpg',
+                )
+            )
+            pictured = None
+            if point_id >= first_point_id:
+                pictured = rng.randrange(first_point_id, point_id + 1)
+            tables['ledningsmaaling_innmaaling_bilde'].append(
+                (
+                    image_id,
+                    pictured,
+                    image_id,
+                    f'SRID=25833;POINT({min_x + WORKING_AREA_SIZE / 2} '
+                    f'{min_y + WORKING_AREA_SIZE / 2})',
+                    from_date,
+                )
+            )
+
+    lons, lats = transform_points(point_xs, point_ys, 'EPSG:25833', WGS84)
+    for (row_id, measured, height), x, y, lon, lat in zip(
+        point_rows, point_xs, point_ys, lons, lats
+    ):
+        metadata = {'height': height, 'x': x, 'y': y, 'lat': float(lat), 'lon': float(lon)}
+        tables['ledningsmaaling_innmaaling_punkt'].append(
+            (
+                row_id,
+                f'Punkt {row_id}',
+                1,
+                f'SRID=4326;POINT({lon} {lat})',
+                f'SRID=25833;POINT({x} {y})',
+                0.05,
+                height,
+                measured,
+                json.dumps(metadata),
+            )
+        )
+    return tables
+
+
+def _copy(cursor, table, rows):
+    """Loads rows into a table with COPY."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        ['' if value is None else value for value in row] for row in rows
+    )
+    buffer.seek(0)
+    columns = ', '.join(TABLE_COLUMNS[table])
+    cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def load(connection, tables):
+    """Recreates the benchmark schema and loads generated rows into it.
+
+    Args:
+        connection (Connection): A connection to the database, in a transaction.
+        tables (dict): The rows per table, as returned by generate.
+    """
+    with open(SCHEMA_FILE, encoding='utf-8') as file:
+        connection.exec_driver_sql(file.read())
+    for view_file in VIEW_FILES:
+        with open(os.path.join(VIEWS_DIR, view_file), encoding='utf-8') as file:
+            connection.exec_driver_sql(file.read())
+
+    cursor = connection.connection.cursor()
+    for table, rows in tables.items():
+        _copy(cursor, table, rows)
+    for view in MATERIALIZED_VIEWS:
+        connection.exec_driver_sql(f'REFRESH MATERIALIZED VIEW "{view}"')
+    connection.exec_driver_sql('ANALYZE')
+
+
+def main():
+    """Parses the arguments, generates the data and loads it."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--inquiries', type=int, default=100)
+    parser.add_argument('--cables', type=int, default=10)
+    parser.add_argument('--points', type=int, default=50)
+    parser.add_argument('--standalone-points', type=int, default=2)
+    parser.add_argument('--images', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--region-size', type=float, default=REGION_SIZE)
+    args = parser.parse_args()
+
+    # Imported here, as the stand-in must be configured before connecting
+    use_standin_database()
+    from database import SCHEMA_PUBLIC, engines  # pylint: disable=import-outside-toplevel
+
+    start = time.perf_counter()
+    tables = generate(
+        args.inquiries,
+        args.cables,
+        args.points,
+        standalone_points=args.standalone_points,
+        images=args.images,
+        seed=args.seed,
+        region_size=args.region_size,
+    )
+    with engines[SCHEMA_PUBLIC].begin() as connection:
+        load(connection, tables)
+    counts = ', '.join(f'{len(rows)} {table}' for table, rows in tables.items())
+    print(f'Loaded {counts} in {time.perf_counter() - start:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
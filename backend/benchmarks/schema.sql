@@ -0,0 +1,154 @@
+/**
+ * Schema of the benchmark database, a stand-in for the geomelding-5 database holding
+ * the public tables read by the backend and the materialized views of the analytics
+ * schema built from them.
+ *
+ * The views of the analytics schema queried by the backend are created afterwards
+ * from the files in sql/views, see benchmarks/datagen.py.
+ **/
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+DROP SCHEMA IF EXISTS analytics_cable_measurement_inquiries CASCADE;
+
+DROP TABLE IF EXISTS
+    ledningsmaaling_innmaaling_bilde,
+    vedlegg,
+    ledningsmaaling_innmaaling_kobling,
+    ledningsmaaling_innmaaling_punkt,
+    ledningsmaaling_innmaaling,
+    henvendelse_ledningsmaaling,
+    geometri,
+    henvendelse,
+    kommune,
+    organisasjon CASCADE;
+
+CREATE TABLE organisasjon (
+    id integer PRIMARY KEY,
+    navn text NOT NULL
+);
+
+CREATE TABLE kommune (
+    id integer PRIMARY KEY,
+    navn text NOT NULL
+);
+
+CREATE TABLE henvendelse (
+    id integer PRIMARY KEY,
+    navn text,
+    beskrivelse text,
+    status integer,
+    fra_dato timestamp,
+    til_dato timestamp,
+    gateadresse text,
+    kommune_id integer REFERENCES kommune (id),
+    organisasjon_id integer REFERENCES organisasjon (id)
+);
+
+CREATE TABLE geometri (
+    id integer PRIMARY KEY,
+    henvendelse_id integer REFERENCES henvendelse (id),
+    geom geometry(Polygon, 25833)
+);
+
+CREATE TABLE henvendelse_ledningsmaaling (
+    id integer PRIMARY KEY,
+    henvendelse_id integer REFERENCES henvendelse (id)
+);
+
+CREATE TABLE ledningsmaaling_innmaaling (
+    id integer PRIMARY KEY,
+    henvendelse_ledningsmaaling_id integer REFERENCES henvendelse_ledningsmaaling (id),
+    navn text,
+    metadata json,
+    geojson text
+);
+
+CREATE TABLE ledningsmaaling_innmaaling_punkt (
+    id integer PRIMARY KEY,
+    navn text,
+    bruker_id integer,
+    geom geometry(Point, 4326),
+    survey_geom geometry(Point, 25833),
+    noyaktighet_z double precision,
+    hoyde double precision,
+    tidpunkt timestamp,
+    metadata json
+);
+
+CREATE TABLE ledningsmaaling_innmaaling_kobling (
+    ledningsmaaling_innmaaling_id integer REFERENCES ledningsmaaling_innmaaling (id),
+    ledningsmaaling_innmaaling_punkt_id integer REFERENCES ledningsmaaling_innmaaling_punkt (id),
+    PRIMARY KEY (ledningsmaaling_innmaaling_id, ledningsmaaling_innmaaling_punkt_id)
+);
+
+CREATE TABLE vedlegg (
+    id integer PRIMARY KEY,
+    bra_arkiv_id integer UNIQUE,
+    beskrivelse text,
+    bearing double precision,
+    filnavn text
+);
+
+CREATE TABLE ledningsmaaling_innmaaling_bilde (
+    id integer PRIMARY KEY,
+    ledningsmaaling_innmaaling_punkt_id integer REFERENCES ledningsmaaling_innmaaling_punkt (id),
+    bra_arkiv_id integer REFERENCES vedlegg (bra_arkiv_id),
+    geom geometry(Point, 25833),
+    tidspunkt timestamp
+);
+
+CREATE SCHEMA analytics_cable_measurement_inquiries;
+
+SET LOCAL search_path TO analytics_cable_measurement_inquiries, public;
+
+CREATE MATERIALIZED VIEW "Geometry" AS
+SELECT
+    id,
+    henvendelse_id AS inquiry_id,
+    geom
+FROM
+    public.geometri;
+
+CREATE MATERIALIZED VIEW "InquiryMeasurement" AS
+SELECT
+    id,
+    henvendelse_id AS inquiry_id
+FROM
+    public.henvendelse_ledningsmaaling;
+
+CREATE MATERIALIZED VIEW "Measurement" AS
+SELECT
+    id,
+    henvendelse_ledningsmaaling_id AS inquirymeasurement_id,
+    navn AS name
+FROM
+    public.ledningsmaaling_innmaaling;
+
+CREATE MATERIALIZED VIEW "Measurement_Point" AS
+SELECT
+    ledningsmaaling_innmaaling_id AS measurement_id,
+    ledningsmaaling_innmaaling_punkt_id AS point_id
+FROM
+    public.ledningsmaaling_innmaaling_kobling;
+
+CREATE MATERIALIZED VIEW "Municipality" AS
+SELECT
+    id,
+    navn AS name
+FROM
+    public.kommune;
+
+CREATE MATERIALIZED VIEW "Organization" AS
+SELECT
+    id,
+    navn AS name
+FROM
+    public.organisasjon;
+
+CREATE MATERIALIZED VIEW "Point" AS
+SELECT
+    id,
+    geom,
+    metadata
+FROM
+    public.ledningsmaaling_innmaaling_punkt;
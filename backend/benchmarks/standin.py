@@ -0,0 +1,27 @@
+"""
+Connection settings of the benchmark database, the PostGIS stand-in of
+benchmarks/docker-compose.yml.
+"""
+
+import os
+
+# Matches benchmarks/docker-compose.yml
+STANDIN_DATABASE = {
+    'DB_NAME': 'bench',
+    'DB_USER': 'bench',
+    'DB_PASSWORD': 'bench',
+    'DB_HOST': '127.0.0.1',
+    'DB_PORT': '55432',
+}
+
+
+def use_standin_database():
+    """Points the backend at the benchmark database instead of the one in .env.
+
+    The settings are overwritten rather than defaulted, so the data generator, which
+    drops and recreates the tables, never runs against the database of the backend.
+    Each setting can be changed with a BENCH_ prefixed variable, e.g. BENCH_DB_PORT.
+    Must be called before the database module is imported.
+    """
+    for key, default in STANDIN_DATABASE.items():
+        os.environ[key] = os.getenv(f'BENCH_{key}', default)
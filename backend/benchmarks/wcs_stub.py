@@ -0,0 +1,137 @@
+"""
+Local stand-in for the Geonorge WCS, serving synthetic terrain models.
+
+GetCoverage requests are answered with a float32 GeoTIFF in WGS84 of the requested size,
+covering the requested bounding box, like the real service with RESPONSE_CRS=EPSG:4326.
+The surface is a smooth function of the coordinates, so neighbouring and overlapping
+requests agree. Requires rasterio.
+
+Usage (from the backend directory):
+    python benchmarks/wcs_stub.py --port 8090 --delay 0.05
+    WCS_URL=http://127.0.0.1:8090/wcs uvicorn main:app
+"""
+# pylint: disable=import-error
+
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.projection import WGS84  # noqa: E402
+from terrain.mosaic import geographic_bounds  # noqa: E402
+
+try:
+    from rasterio.io import MemoryFile
+    from rasterio.transform import from_bounds
+except ImportError:  # pragma: no cover - optional dependency
+    MemoryFile = None
+
+
+def surface(lons, lats):
+    """Returns the synthetic terrain height in meters at the given coordinates."""
+    return (
+        300.0
+        + 120.0 * np.sin(lons * 40.0) * np.cos(lats * 60.0)
+        + 15.0 * np.sin(lons * 700.0 + lats * 500.0)
+    ).astype(np.float32)
+
+
+def render_coverage(params):
+    """Renders the GeoTIFF answering a GetCoverage request.
+
+    Args:
+        params (dict): The query parameters of the request.
+
+    Returns:
+        bytes: The GeoTIFF.
+
+    Raises:
+        RuntimeError: If rasterio is not installed.
+    """
+    if MemoryFile is None:
+        raise RuntimeError('rasterio is required for the WCS stand-in')
+    crs = params.get('CRS', WGS84)
+    if crs.upper() == WGS84:
+        west, south, east, north = (float(value) for value in params['BBOX'].split(','))
+    else:
+        west, south, east, north = geographic_bounds(params['BBOX'], crs)
+    width, height = int(params['WIDTH']), int(params['HEIGHT'])
+    lons = west + (np.arange(width) + 0.5) * (east - west) / width
+    lats = north - (np.arange(height) + 0.5) * (north - south) / height
+    with MemoryFile() as memory:
+        with memory.open(
+            driver='GTiff',
+            width=width,
+            height=height,
+            count=1,
+            dtype='float32',
+            crs=WGS84,
+            transform=from_bounds(west, south, east, north, width, height),
+        ) as dataset:
+            dataset.write(surface(lons[None, :], lats[:, None]), 1)
+        return memory.read()
+
+
+def serve(host='127.0.0.1', port=0, delay=0.0):
+    """Runs the WCS stand-in on a background thread.
+
+    Args:
+        host (str, optional): The interface to listen on. Defaults to 127.0.0.1.
+        port (int, optional): The port, 0 for any free port. Defaults to 0.
+        delay (float, optional): Seconds added to every response, simulating the
+            latency of the real service. Defaults to 0.
+
+    Returns:
+        tuple: The URL of the service and the server, to be stopped with shutdown().
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        """Request handler rendering coverages."""
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            """Answers a GetCoverage request."""
+            query = parse_qs(urlparse(self.path).query)
+            params = {key: values[0] for key, values in query.items()}
+            time.sleep(delay)
+            try:
+                status_code, body = 200, render_coverage(params)
+            except (KeyError, ValueError) as e:
+                status_code, body = 400, f'Invalid GetCoverage request: {e}'.encode()
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'image/tiff')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            """Silences request logging."""
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='wcs-stub', daemon=True).start()
+    return f'http://{host}:{server.server_port}/wcs', server
+
+
+def main():
+    """Parses the arguments and serves until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--delay', type=float, default=0.0)
+    args = parser.parse_args()
+    url, server = serve(args.host, args.port, args.delay)
+    print(f'Serving synthetic terrain at {url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+"""
+This module provides in-memory caches for query results.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+_MISSING = object()
+
+
+def _expiry(ttl):
+    """Returns the monotonic time a value stored now with the TTL expires, or None."""
+    return None if ttl is None else time.monotonic() + ttl
+
+
+def _json_size(value):
+    """Estimates the memory footprint of a value by the size of its JSON encoding.
+
+    Args:
+        value: The value to measure.
+
+    Returns:
+        int: The length of the JSON encoded value.
+    """
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    return len(json.dumps(value, default=str))
+
+
+class LRUCache:
+    """Thread-safe least recently used cache bounded by entry count and total size.
+
+    Entries may expire, for values which change without the cache being told.
+
+    Args:
+        max_entries (int): The maximum number of entries kept in the cache.
+        max_bytes (int): The maximum total estimated size of the cached values.
+        sizeof (callable, optional): Function estimating the size of a value.
+            Defaults to the length of its JSON encoding.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, sizeof=_json_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._lookup(key) is not _MISSING
+
+    def get(self, key, default=None):
+        """Returns the cached value for the key and marks it as recently used.
+
+        Args:
+            key: The cache key.
+            default: Value returned when the key is not cached.
+
+        Returns:
+            The cached value, or the default.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Stores a value, evicting the least recently used entries when over budget.
+
+        Values larger than the whole byte budget are not cached.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            ttl (float, optional): Seconds after which the value expires. Defaults to
+                None, never.
+        """
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._store(key, value, size, _expiry(ttl))
+
+    def pop(self, key):
+        """Removes a key from the cache.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            bool: True if the key was cached.
+        """
+        with self._lock:
+            return self._remove(key)
+
+    def evict(self, predicate):
+        """Removes all entries whose key matches the predicate.
+
+        Args:
+            predicate (callable): Function returning True for keys to remove.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Returns the cache counters.
+
+        Returns:
+            dict: Hits, misses, evictions and current occupancy of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _lookup(self, key):
+        """Returns the value of an entry, removing it if it expired. Requires the lock."""
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+        if entry[2] is not None and entry[2] <= time.monotonic():
+            self._remove(key)
+            return _MISSING
+        return entry[0]
+
+    def _store(self, key, value, size, expires=None):
+        self._remove(key)
+        self._entries[key] = (value, size, expires)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, _MISSING)
+        if entry is _MISSING:
+            return False
+        self._bytes -= entry[1]
+        return True
+
+
+class InquiryResponseCache(LRUCache):
+    """LRU cache for per-inquiry query results, keyed by endpoint and inquiry ID.
+
+    Every inquiry has a generation counter which is bumped on eviction, so a result
+    computed from data read before an edit is not stored after the edit evicted it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._generations = {}
+
+    def generation(self, inquiry_id):
+        """Returns the current generation of an inquiry.
+
+        Args:
+            inquiry_id (int): The ID of the inquiry.
+
+        Returns:
+            int: The number of times the inquiry has been evicted.
+        """
+        return self._generations.get(inquiry_id, 0)
+
+    def cached(self, endpoint, ttl=None):
+        """Decorator caching a query function called as function(inquiry_id, connection).
+
+        Further arguments, such as a level of detail, are part of the key, so every
+        variant of the result of an inquiry is cached and evicted with it.
+
+        Args:
+            endpoint (str): Name of the endpoint, used as the first part of the key.
+            ttl (float, optional): Seconds after which results expire, for data which
+                is not only changed by the edits evicting it. Defaults to None, never.
+
+        Returns:
+            callable: The decorator.
+        """
+
+        def decorator(function):
+            @wraps(function)
+            def wrapper(inquiry_id, connection, *args, **kwargs):
+                key = (endpoint, inquiry_id, *args, *sorted(kwargs.items()))
+                result = self.get(key, _MISSING)
+                if result is not _MISSING:
+                    return result
+
+                generation = self.generation(inquiry_id)
+                result = function(inquiry_id, connection, *args, **kwargs)
+                size = self._sizeof(result)
+                if size > self.max_bytes:
+                    return result
+                with self._lock:
+                    if self.generation(inquiry_id) == generation:
+                        self._store(key, result, size, _expiry(ttl))
+                return result
+
+            def peek(inquiry_id, *args, **kwargs):
+                """Returns the cached result without calling the function, or None."""
+                key = (endpoint, inquiry_id, *args, *sorted(kwargs.items()))
+                with self._lock:
+                    result = self._lookup(key)
+                    if result is _MISSING:
+                        return None
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+
+            wrapper.uncached = function
+            wrapper.peek = peek
+            return wrapper
+
+        return decorator
+
+    def cached_many(self, endpoint, ttl=None):
+        """Decorator caching a query function called as function(inquiry_ids, connection).
+
+        The function returns the results of several inquiries at once, as a dictionary
+        keyed by inquiry ID. They are cached per inquiry under the same keys as the
+        function decorated with cached(endpoint), so both share their entries, and the
+        function is only called with the inquiries which are not cached.
+
+        Args:
+            endpoint (str): Name of the endpoint, used as the first part of the key.
+            ttl (float, optional): Seconds after which results expire, see cached.
+                Defaults to None, never.
+
+        Returns:
+            callable: The decorator.
+        """
+
+        def decorator(function):
+            @wraps(function)
+            def wrapper(inquiry_ids, connection):
+                results = {}
+                for inquiry_id in inquiry_ids:
+                    result = self.get((endpoint, inquiry_id), _MISSING)
+                    if result is not _MISSING:
+                        results[inquiry_id] = result
+                missing = [
+                    inquiry_id
+                    for inquiry_id in dict.fromkeys(inquiry_ids)
+                    if inquiry_id not in results
+                ]
+                if not missing:
+                    return results
+
+                generations = {inquiry_id: self.generation(inquiry_id) for inquiry_id in missing}
+                fetched = function(missing, connection)
+                for inquiry_id in missing:
+                    result = fetched[inquiry_id]
+                    results[inquiry_id] = result
+                    size = self._sizeof(result)
+                    if size > self.max_bytes:
+                        continue
+                    with self._lock:
+                        if self.generation(inquiry_id) == generations[inquiry_id]:
+                            self._store((endpoint, inquiry_id), result, size, _expiry(ttl))
+                return results
+
+            wrapper.uncached = function
+            return wrapper
+
+        return decorator
+
+    def evict_inquiries(self, inquiry_ids):
+        """Removes all cached results belonging to the given inquiries.
+
+        Args:
+            inquiry_ids (iterable): The IDs of the inquiries to evict.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        inquiry_ids = set(inquiry_ids)
+        if not inquiry_ids:
+            return 0
+        with self._lock:
+            for inquiry_id in inquiry_ids:
+                self._generations[inquiry_id] = self._generations.get(inquiry_id, 0) + 1
+        return self.evict(lambda key: key[1] in inquiry_ids)
+
+
+response_cache = InquiryResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '512')),
+    max_bytes=int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(128 * 1024 * 1024))),
+)
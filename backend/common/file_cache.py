@@ -0,0 +1,123 @@
+"""
+This module provides a size-bounded on-disk cache of generated or downloaded files.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class FileCache:
+    """Size-bounded LRU cache of files.
+
+    Files are named by their key, written atomically through a temporary file, and
+    evicted least recently used first once the directory exceeds `max_bytes`.
+    Concurrent requests for the same key share a single fetch.
+
+    Args:
+        directory (str): The directory holding the cached files.
+        max_bytes (int): The maximum total size of the cached files.
+        extension (str): The file extension of the cached files, including the dot.
+    """
+
+    def __init__(self, directory, max_bytes, extension):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self._lock = threading.Lock()
+        self._inflight = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        """Returns the path of the cached file with the given key."""
+        return os.path.join(self.directory, f'{key}{self.extension}')
+
+    def get_or_fetch(self, key, fetch):
+        """Returns the path of the cached file, fetching it on a miss.
+
+        Args:
+            key (str): The cache key, a valid file name.
+            fetch (callable): Function called as fetch(file_path) writing the file.
+
+        Returns:
+            str: The path of the cached file.
+
+        Raises:
+            Exception: Any error raised by fetch, in every request waiting for the key.
+        """
+        path = self.path(key)
+        with self._lock:
+            if os.path.exists(path):
+                os.utime(path)
+                return path
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            self._write(path, fetch)
+            future.set_result(path)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Removes the least recently used files until the cache fits its size.
+
+        Args:
+            keep (str, optional): Path of a file which is never removed. Defaults to None.
+
+        Returns:
+            int: The number of removed files.
+        """
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(self.extension):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logger.info('Evicted %d files from %s', removed, self.directory)
+        return removed
+
+    def _write(self, path, fetch):
+        """Fetches into a temporary file and moves it into place atomically."""
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, prefix='.fetch-', suffix='.part'
+        )
+        os.close(descriptor)
+        try:
+            fetch(temporary_path)
+            os.replace(temporary_path, path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
@@ -0,0 +1,235 @@
+"""
+This module provides conditional GET handling and cached compression of response bodies.
+"""
+
+import gzip
+import hashlib
+import os
+
+from common.cache import LRUCache
+from common.metrics import COMPRESS_DURATION, CONDITIONAL_RESPONSES, timed
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Supported content codings, most preferred first
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Suffixes appended to the tags of compressed variants, see ConditionalResponder
+_ENCODING_SUFFIXES = ('-br"', '-gzip"')
+
+# Headers of a rendered response which are set again when it is sent
+_REPLACED_HEADERS = ('content-length', 'content-encoding', 'etag', 'vary', 'cache-control')
+
+# Lets clients store responses, but makes them revalidate before every use
+CACHE_CONTROL = 'no-cache'
+
+
+def negotiate_encoding(accept_encoding, encodings=ENCODINGS):
+    """Returns the content coding an Accept-Encoding header prefers, or None for identity.
+
+    Args:
+        accept_encoding (str): The Accept-Encoding header, or None.
+        encodings (tuple, optional): The supported codings, most preferred first, which
+            decides between codings of equal quality. Defaults to ENCODINGS.
+
+    Returns:
+        str: The chosen coding, or None if no supported coding is accepted.
+    """
+    qualities = {}
+    for entry in (accept_encoding or '').split(','):
+        coding, *parameters = (part.strip() for part in entry.split(';'))
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+
+    chosen, chosen_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > chosen_quality:
+            chosen, chosen_quality = encoding, quality
+    return chosen
+
+
+def compress(body, encoding, gzip_level=6, brotli_quality=5):
+    """Compresses a body with a content coding.
+
+    Args:
+        body (bytes): The body.
+        encoding (str): 'gzip' or 'br'.
+        gzip_level (int, optional): The gzip compression level. Defaults to 6.
+        brotli_quality (int, optional): The brotli quality. Defaults to 5.
+
+    Returns:
+        bytes: The compressed body.
+
+    Raises:
+        ValueError: If the coding is not supported.
+    """
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(body, quality=brotli_quality)
+    raise ValueError(f'Unsupported content coding: {encoding}')
+
+
+def make_etag(*parts):
+    """Returns a strong entity tag identifying the given parts.
+
+    Returns:
+        str: The quoted tag.
+    """
+    digest = hashlib.sha256('\0'.join(str(part) for part in parts).encode('utf-8'))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def base_etag(tag):
+    """Returns a tag without its weak prefix and the suffix of its content coding.
+
+    Args:
+        tag (str): The quoted tag.
+
+    Returns:
+        str: The tag shared by every content coding of the representation.
+    """
+    tag = tag.strip().removeprefix('W/')
+    for suffix in _ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return f'{tag[: -len(suffix)]}"'
+    return tag
+
+
+def etag_matches(if_none_match, etags):
+    """Returns the tag of an If-None-Match header matching one of the given tags.
+
+    Tags are compared weakly, as If-None-Match requires, and by their base tag, so a
+    tag sent with any content coding matches every coding of the same representation.
+
+    Args:
+        if_none_match (str): The If-None-Match header, or None.
+        etags (iterable): The current tags of the resource.
+
+    Returns:
+        str: The matching tag, or None.
+    """
+    if not if_none_match:
+        return None
+    etags = list(etags)
+    if if_none_match.strip() == '*':
+        return etags[0]
+    candidates = {base_etag(tag) for tag in if_none_match.split(',')}
+    return next((etag for etag in etags if base_etag(etag) in candidates), None)
+
+
+class ConditionalResponder:
+    """Answers GET requests with strong ETags, 304 responses and cached compressed bodies.
+
+    The ETag of a response is derived from its path, query, representation and the
+    version of the data it is built from, so it is known before the response is
+    rendered. Compressed bodies are tagged with the coding appended to it. Requests
+    whose If-None-Match header holds the tag of any coding get a 304 without rendering,
+    tagged like the body the request would get.
+    Rendered bodies are compressed with the coding the client prefers and cached by
+    tag, so repeated requests for unchanged data are answered from memory.
+
+    Data without a version shared by every API worker, such as data written by other
+    systems, is tagged by the digest of its rendered body. It is rendered for every
+    request, which only saves sending and compressing unchanged bodies.
+
+    Args:
+        min_size (int, optional): Bodies smaller than this many bytes are not compressed.
+            Defaults to 1024.
+        max_entries (int, optional): The maximum number of cached bodies. Defaults to 512.
+        max_bytes (int, optional): The maximum total size of the cached bodies.
+            Defaults to 64 MiB.
+    """
+
+    def __init__(self, min_size=1024, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self.min_size = min_size
+        self.bodies = LRUCache(max_entries, max_bytes, sizeof=lambda entry: len(entry[0]))
+
+    async def respond(self, request, version, render, variant=(), vary=()):
+        """Answers a request conditionally.
+
+        Args:
+            request (Request): The request.
+            version (str): Token which changes whenever the data of the response may
+                change, or None to tag the response by the digest of its rendered
+                body.
+            render (callable): Coroutine function returning the response when it has to
+                be rendered.
+            variant (tuple, optional): Values besides the path and query which select
+                the representation, e.g. the negotiated media type. Defaults to ().
+            vary (tuple, optional): The request headers the variant is negotiated from,
+                besides Accept-Encoding. Defaults to ().
+
+        Returns:
+            Response: A 304 response, or the rendered response with an ETag, compressed
+            when accepted and large enough.
+        """
+        encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+        response = None
+        if version is None:
+            response = await render()
+            if response.status_code != 200:
+                return response
+            version = hashlib.sha256(response.body).hexdigest()
+        etag = make_etag(
+            request.url.path, sorted(request.query_params.multi_items()), *variant, version
+        )
+        etags = (etag, f'{etag[:-1]}-{encoding}"') if encoding else (etag,)
+        vary = ', '.join([*vary, 'Accept-Encoding'])
+
+        cached = self.bodies.get((etag, encoding))
+        if etag_matches(request.headers.get('if-none-match'), (etag,)) is not None:
+            CONDITIONAL_RESPONSES.labels('not_modified').inc()
+            current = cached[1]['ETag'] if cached is not None else etags[-1]
+            return Response(
+                status_code=304,
+                headers={'ETag': current, 'Vary': vary, 'Cache-Control': CACHE_CONTROL},
+            )
+
+        if cached is not None:
+            CONDITIONAL_RESPONSES.labels('cached').inc()
+            return Response(cached[0], headers=cached[1])
+
+        if response is None:
+            response = await render()
+            if response.status_code != 200:
+                return response
+        CONDITIONAL_RESPONSES.labels('rendered').inc()
+
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name not in _REPLACED_HEADERS
+        }
+        headers['Vary'] = vary
+        headers['Cache-Control'] = CACHE_CONTROL
+        body = response.body
+        if encoding and len(body) >= self.min_size:
+            with timed(COMPRESS_DURATION.labels(encoding), 'compress'):
+                body = compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+            headers['ETag'] = etags[1]
+        else:
+            headers['ETag'] = etag
+        self.bodies.set((etag, encoding), (body, headers))
+        return Response(body, headers=headers)
+
+
+conditional_responder = ConditionalResponder(
+    min_size=int(os.getenv('COMPRESSION_MIN_BYTES', '1024')),
+    max_entries=int(os.getenv('COMPRESSED_CACHE_MAX_ENTRIES', '512')),
+    max_bytes=int(os.getenv('COMPRESSED_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+)
@@ -0,0 +1,201 @@
+"""
+This module provides the Prometheus metrics of the backend and per-request profiling.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from common.serialization import dumps
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter, Gauge, Histogram
+
+PROFILE_HEADER = 'x-profile'
+
+# Buckets from 1 ms to 30 s, covering cached responses as well as terrain downloads
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+SIZE_BUCKETS = tuple(2**exponent for exponent in range(8, 28, 2))
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Time to answer a request, by route template.',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes',
+    'Size of the response bodies, by route template.',
+    ['method', 'route'],
+    buckets=SIZE_BUCKETS,
+)
+SQL_DURATION = Histogram(
+    'sql_statement_duration_seconds',
+    'Time to execute a SQL statement, by statement name or file path.',
+    ['statement'],
+    buckets=LATENCY_BUCKETS,
+)
+SQL_ROWS = Counter(
+    'sql_rows_returned_total',
+    'Rows converted into dictionaries, by statement name.',
+    ['statement'],
+)
+ROW_CONVERSION_DURATION = Histogram(
+    'sql_row_conversion_duration_seconds',
+    'Time to convert the rows of a result into dictionaries, by statement name.',
+    ['statement'],
+    buckets=LATENCY_BUCKETS,
+)
+SERIALIZE_DURATION = Histogram(
+    'json_serialize_duration_seconds',
+    'Time to encode JSON response bodies.',
+    buckets=LATENCY_BUCKETS,
+)
+COMPRESS_DURATION = Histogram(
+    'http_compress_duration_seconds',
+    'Time to compress response bodies, by content coding.',
+    ['encoding'],
+    buckets=LATENCY_BUCKETS,
+)
+CONDITIONAL_RESPONSES = Counter(
+    'http_conditional_responses_total',
+    'Responses of endpoints supporting conditional requests, by whether they were not '
+    'modified, served from the compressed body cache or rendered.',
+    ['outcome'],
+)
+POOL_WAIT = Histogram(
+    'db_pool_wait_seconds',
+    'Time to check out a database connection, by pool.',
+    ['pool'],
+    buckets=LATENCY_BUCKETS,
+)
+POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    'Connections currently checked out of a pool.',
+    ['pool'],
+)
+TERRAIN_FETCH_DURATION = Histogram(
+    'terrain_fetch_duration_seconds',
+    'Time to download a terrain model from the WCS, by mode and outcome.',
+    ['mode', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+TERRAIN_TILE_DURATION = Histogram(
+    'terrain_tile_job_duration_seconds',
+    'Time to generate the tiles of a terrain tile job, by tiler and outcome.',
+    ['tiler', 'outcome'],
+    buckets=LATENCY_BUCKETS + (60.0, 120.0, 300.0, 600.0),
+)
+IMAGE_DERIVATIVE_DURATION = Histogram(
+    'image_derivative_duration_seconds',
+    'Time to generate a thumbnail or preview of an inquiry image, by size and outcome.',
+    ['size', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+EDIT_EVENT_SUBSCRIBERS = Gauge(
+    'edit_event_subscribers',
+    'Viewers currently subscribed to the point edits of an inquiry.',
+)
+
+# Seconds per phase of the current request, or None if it is not profiled
+_profile = ContextVar('profile', default=None)
+
+
+def record_phase(phase, seconds):
+    """Adds time to a phase of the current request's profile, if it is profiled."""
+    profile = _profile.get()
+    if profile is not None:
+        profile[phase] = profile.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed(histogram, phase=None):
+    """Context manager observing the time spent in its body.
+
+    Args:
+        histogram (Histogram): The histogram, with its labels applied.
+        phase (str, optional): The phase of the request profile the time is added to.
+            Defaults to None.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        histogram.observe(seconds)
+        if phase is not None:
+            record_phase(phase, seconds)
+
+
+def server_timing(profile, total):
+    """Formats a request profile as a Server-Timing header value in milliseconds."""
+    entries = [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in profile.items()]
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSON response encoding its body with common.serialization and recording the time.
+
+    Bytes are sent as they are, for bodies encoded by the database.
+    """
+
+    def render(self, content):
+        if isinstance(content, bytes):
+            return content
+        with timed(SERIALIZE_DURATION, 'serialize'):
+            return dumps(content)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency and response size of every request.
+
+    Requests sent with an `X-Profile: 1` header are profiled: the time spent waiting for
+    connections, executing SQL, converting rows and encoding JSON is returned in a
+    Server-Timing header.
+
+    Args:
+        app: The ASGI application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope['headers'])
+        profiled = headers.get(PROFILE_HEADER.encode(), b'').lower() in (b'1', b'true')
+        token = _profile.set({} if profiled else None)
+        profile = _profile.get()
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if profile is not None:
+                    value = server_timing(profile, time.perf_counter() - start)
+                    message['headers'] = [
+                        *message.get('headers', []),
+                        (b'server-timing', value.encode('latin-1')),
+                    ]
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _profile.reset(token)
+            # The route template keeps the label count bounded, unlike the raw path
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            REQUEST_DURATION.labels(scope['method'], route, str(status)).observe(
+                time.perf_counter() - start
+            )
+            RESPONSE_SIZE.labels(scope['method'], route).observe(size)
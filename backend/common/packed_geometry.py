@@ -0,0 +1,529 @@
+"""
+This module provides a compact binary encoding of GeoJSON features, the packed geometry
+format, and its reference decoder.
+
+A payload holds the coordinates of all features in one typed array, either float64 or
+int32 quantized with a per axis offset and scale, and the nesting of features,
+geometries, parts and coordinates as offset arrays. Properties and the rows around the
+features are kept in a JSON side table. Clients can view the arrays in place, e.g. as
+Float64Array, instead of parsing coordinates out of text.
+
+Layout, little-endian, every section starting at a multiple of 8 bytes:
+
+    header                 '<4s4B6I': magic, version, coordinate encoding, dimensions,
+                           reserved, then the number of collections, features,
+                           geometries, parts, coordinates and side table bytes
+    offset, scale          float64[dimensions] each, only for int32 coordinates
+    collection_offsets     uint32[collections + 1], into the features
+    geometry_types         uint8[features], see GEOMETRY_TYPES, 0x80 set for 2D features
+    geometry_offsets       uint32[features + 1], into the geometries
+    part_offsets           uint32[geometries + 1], into the parts (rings or lines)
+    coordinate_offsets     uint32[parts + 1], into the coordinates
+    coordinates            float64 or int32[coordinates * dimensions]
+    side table             UTF-8 JSON {'columns': [...], 'properties': [...],
+                           'document': ...}
+    property_columns       float64[columns * features]
+    property_indexes       uint32[features], into the side table properties
+
+Numeric properties, also one level down such as metadata.height, are stored as float64
+columns with NaN where a feature lacks them. The remaining properties are stored once
+per distinct value in the side table, and every feature points at its value. Missing coordinate values, e.g. a point without height, are
+NaN, or INT32_MISSING when quantized.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+MEDIA_TYPE = 'application/x-packed-geometry'
+MAGIC = b'PGEO'
+VERSION = 1
+HEADER = struct.Struct('<4s4B6I')
+
+FLOAT64 = 'float64'
+INT32 = 'int32'
+COORDINATE_ENCODINGS = (FLOAT64, INT32)
+INT32_MISSING = np.iinfo(np.int32).min
+
+# Precision of quantized coordinates: about 1 cm horizontally in degrees, 1 mm in height
+DEFAULT_PRECISION = (1e-7, 1e-7, 1e-3)
+
+GEOMETRY_TYPES = {
+    None: 0,
+    'Point': 1,
+    'LineString': 2,
+    'Polygon': 3,
+    'MultiPoint': 4,
+    'MultiLineString': 5,
+    'MultiPolygon': 6,
+}
+GEOMETRY_NAMES = {code: name for name, code in GEOMETRY_TYPES.items()}
+TWO_DIMENSIONAL = 0x80
+
+
+def negotiate(accept):
+    """Returns the coordinate encoding an Accept header asks for, or None for JSON.
+
+    The packed format is chosen when the header lists MEDIA_TYPE, optionally with a
+    coordinates parameter, e.g. `application/x-packed-geometry; coordinates=int32`.
+
+    Args:
+        accept (str): The Accept header, or None.
+
+    Returns:
+        str: 'float64' or 'int32', or None if the packed format is not accepted.
+    """
+    for media_range in (accept or '').split(','):
+        media_type, *parameters = (part.strip() for part in media_range.split(';'))
+        if media_type.lower() != MEDIA_TYPE:
+            continue
+        parameters = dict(
+            parameter.split('=', 1) for parameter in parameters if '=' in parameter
+        )
+        if parameters.get('q', '1').strip() in ('0', '0.0', '0.00', '0.000'):
+            return None
+        coordinates = parameters.get('coordinates', FLOAT64).strip().lower()
+        return coordinates if coordinates in COORDINATE_ENCODINGS else FLOAT64
+    return None
+
+
+def _padding(length):
+    """Returns the bytes aligning a section of the given length to 8 bytes."""
+    return b'\0' * (-length % 8)
+
+
+def split_geometry(geometry_type, coordinates):
+    """Splits the coordinates of a geometry into single geometries of lists of parts."""
+    if geometry_type == 'Point':
+        return [[[coordinates]]]
+    if geometry_type == 'LineString':
+        return [[coordinates]]
+    if geometry_type == 'Polygon':
+        return [coordinates]
+    if geometry_type == 'MultiPoint':
+        return [[[point]] for point in coordinates]
+    if geometry_type == 'MultiLineString':
+        return [[line] for line in coordinates]
+    return coordinates
+
+
+def nest_geometry(geometry_type, geometries):
+    """Rebuilds the coordinates of a geometry from its single geometries."""
+    if geometry_type == 'Point':
+        return geometries[0][0][0]
+    if geometry_type == 'LineString':
+        return geometries[0][0]
+    if geometry_type == 'Polygon':
+        return geometries[0]
+    if geometry_type == 'MultiPoint':
+        return [geometry[0][0] for geometry in geometries]
+    if geometry_type == 'MultiLineString':
+        return [geometry[0] for geometry in geometries]
+    return geometries
+
+
+def _flatten_rows(rows, key):
+    """Collects the feature collections of rows and describes where each came from.
+
+    The value under the key may be a Feature, a FeatureCollection, a list of
+    FeatureCollections or None.
+
+    Returns:
+        tuple: The FeatureCollections and the document, the rows with the value under
+        the key replaced by a reference to the collections.
+    """
+    collections = []
+    document = []
+    for row in rows:
+        value = row.get(key)
+        row = dict(row)
+        if value is None:
+            row[key] = None
+        elif isinstance(value, list):
+            row[key] = ['FeatureCollections', len(collections), len(collections) + len(value)]
+            collections.extend(value)
+        elif value.get('type') == 'Feature':
+            row[key] = ['Feature', len(collections)]
+            collections.append({'type': 'FeatureCollection', 'features': [value]})
+        else:
+            row[key] = ['FeatureCollection', len(collections)]
+            collections.append(value)
+        document.append(row)
+    return collections, document
+
+
+def pack_features(features):
+    """Splits GeoJSON features into offset arrays and one array of their coordinates.
+
+    Args:
+        features (iterable): The features. A geometry may also be given as JSON text.
+
+    Returns:
+        tuple: The geometry type code of every feature, see GEOMETRY_TYPES, and the
+        geometry, part and coordinate offsets, each a list starting with 0 and holding
+        the end of every entry. Then the coordinates as a float64 array of shape
+        (coordinates, dimensions), with NaN for missing values, and the properties of
+        every feature.
+
+    Raises:
+        ValueError: If a geometry type is not supported, e.g. GeometryCollection, or
+            coordinates have more than 3 dimensions.
+    """
+    types = []
+    geometry_offsets = [0]
+    part_offsets = [0]
+    coordinate_offsets = [0]
+    points = []
+    properties = []
+    dimensions = 2
+    for feature in features:
+        geometry = feature.get('geometry')
+        if isinstance(geometry, str):
+            geometry = json.loads(geometry)
+        geometry_type = geometry.get('type') if geometry else None
+        if geometry_type not in GEOMETRY_TYPES:
+            raise ValueError(f'Geometry type {geometry_type} cannot be packed')
+        feature_dimensions = 2
+        if geometry_type is not None:
+            for single in split_geometry(geometry_type, geometry['coordinates']):
+                for part in single:
+                    points.extend(part)
+                    feature_dimensions = max(
+                        feature_dimensions, max((len(point) for point in part), default=2)
+                    )
+                    coordinate_offsets.append(len(points))
+                part_offsets.append(len(coordinate_offsets) - 1)
+        geometry_offsets.append(len(part_offsets) - 1)
+        if feature_dimensions > 3:
+            raise ValueError('Coordinates with more than 3 dimensions cannot be packed')
+        dimensions = max(dimensions, feature_dimensions)
+        types.append(
+            GEOMETRY_TYPES[geometry_type] | (TWO_DIMENSIONAL if feature_dimensions == 2 else 0)
+        )
+        properties.append(feature.get('properties'))
+
+    try:
+        # None becomes NaN, which is also what pads 2D points in a 3D array
+        array = np.array(points, dtype=np.float64).reshape(len(points), -1)
+    except ValueError:
+        array = None
+    if array is None or array.shape[1] != dimensions:
+        array = np.full((len(points), dimensions), np.nan)
+        for index, point in enumerate(points):
+            array[index, : len(point)] = [np.nan if value is None else value for value in point]
+    return types, geometry_offsets, part_offsets, coordinate_offsets, array, properties
+
+
+# Types stored in numeric columns; bool is excluded as type(True) is bool
+NUMBER_TYPES = (int, float)
+
+
+def _split_properties(properties):
+    """Moves the numeric properties of features into columns.
+
+    Args:
+        properties (list): The properties of every feature, a dictionary or None.
+
+    Returns:
+        tuple: The column descriptions, the float64 columns as one array of shape
+        (columns, features), and the remaining properties of every feature.
+    """
+    # Per column path the features having it and their values
+    found = {}
+    floats = set()
+    rest = []
+    for index, entry in enumerate(properties):
+        if entry is None:
+            rest.append(None)
+            continue
+        remaining = {}
+        for key, value in entry.items():
+            if type(value) in NUMBER_TYPES:  # pylint: disable=unidiomatic-typecheck
+                path = (key,)
+            elif isinstance(value, dict):
+                nested = {}
+                for sub_key, sub_value in value.items():
+                    if type(sub_value) in NUMBER_TYPES:  # pylint: disable=unidiomatic-typecheck
+                        column = found.setdefault((key, sub_key), ([], []))
+                        column[0].append(index)
+                        column[1].append(sub_value)
+                        if type(sub_value) is float:
+                            floats.add((key, sub_key))
+                    else:
+                        nested[sub_key] = sub_value
+                remaining[key] = nested
+                continue
+            else:
+                remaining[key] = value
+                continue
+            column = found.setdefault(path, ([], []))
+            column[0].append(index)
+            column[1].append(value)
+            if type(value) is float:
+                floats.add(path)
+        rest.append(remaining)
+
+    columns = []
+    values = np.full((len(found), len(properties)), np.nan)
+    for column_index, (path, (indexes, column_values)) in enumerate(found.items()):
+        values[column_index, indexes] = column_values
+        integer = path not in floats and np.abs(values[column_index, indexes]).max() < 2**53
+        columns.append({'path': list(path), 'integer': bool(integer)})
+    return columns, values, rest
+
+
+def _deduplicate(entries):
+    """Returns the distinct entries and the index of every entry among them."""
+    distinct = {}
+    indexes = [
+        distinct.setdefault(json.dumps(entry, sort_keys=True, default=str), len(distinct))
+        for entry in entries
+    ]
+    return [json.loads(entry) for entry in distinct], indexes
+
+
+def _copy(entry):
+    """Copies properties down to the level numeric columns are taken from."""
+    if entry is None:
+        return None
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in entry.items()}
+
+
+def _merge_properties(columns, values, distinct, indexes):
+    """Puts the numeric columns back into the properties of every feature."""
+    rest = [_copy(distinct[index]) for index in indexes]
+    for column_index, column in enumerate(columns):
+        *parents, key = column['path']
+        present = np.flatnonzero(~np.isnan(values[column_index]))
+        column_values = values[column_index, present]
+        column_values = (
+            column_values.astype(np.int64) if column['integer'] else column_values
+        ).tolist()
+        for index, value in zip(present.tolist(), column_values):
+            container = rest[index]
+            if parents:
+                container = container.setdefault(parents[0], {})
+            container[key] = value
+    return rest
+
+
+def _quantize(coordinates, precision):
+    """Quantizes coordinates to int32 with a per axis offset and scale.
+
+    Raises:
+        ValueError: If the extent of an axis does not fit in int32 at its precision.
+    """
+    dimensions = coordinates.shape[1]
+    scale = np.asarray(precision[:dimensions], dtype=np.float64)
+    present = ~np.isnan(coordinates)
+    offset = np.array(
+        [
+            coordinates[present[:, axis], axis].min() if present[:, axis].any() else 0.0
+            for axis in range(dimensions)
+        ]
+    )
+    steps = np.round((np.where(present, coordinates, offset) - offset) / scale)
+    if steps.size and steps.max() >= np.iinfo(np.int32).max:
+        raise ValueError('Coordinates span too far to be quantized at this precision')
+    quantized = steps.astype(np.int32)
+    quantized[~present] = INT32_MISSING
+    return quantized, offset, scale
+
+
+def encode(rows, key='geojson', coordinates=FLOAT64, precision=DEFAULT_PRECISION):
+    """Encodes rows holding GeoJSON as a packed geometry payload.
+
+    Args:
+        rows (list): The rows, e.g. the result of a geometry query.
+        key (str, optional): The key of the GeoJSON in every row. Defaults to 'geojson'.
+        coordinates (str, optional): The coordinate encoding, 'float64' or 'int32'.
+            Defaults to 'float64'.
+        precision (tuple, optional): The step of quantized coordinates along x, y and z.
+            Defaults to DEFAULT_PRECISION.
+
+    Returns:
+        bytes: The payload.
+
+    Raises:
+        ValueError: If a geometry type is not supported, e.g. GeometryCollection, or
+            the coordinates cannot be quantized.
+    """
+    if coordinates not in COORDINATE_ENCODINGS:
+        raise ValueError(f'Unknown coordinate encoding {coordinates}')
+    collections, document = _flatten_rows(rows, key)
+
+    features = [
+        feature for collection in collections for feature in collection.get('features') or ()
+    ]
+    collection_offsets = np.cumsum(
+        [0] + [len(collection.get('features') or ()) for collection in collections]
+    )
+    types, geometry_offsets, part_offsets, coordinate_offsets, array, properties = (
+        pack_features(features)
+    )
+    dimensions = array.shape[1]
+
+    quantization = b''
+    if coordinates == INT32:
+        array, offset, scale = _quantize(array, precision)
+        quantization = offset.astype('<f8').tobytes() + scale.astype('<f8').tobytes()
+    else:
+        array = array.astype('<f8')
+    columns, column_values, properties = _split_properties(properties)
+    properties, property_indexes = _deduplicate(properties)
+    side_table = json.dumps(
+        {
+            'columns': columns,
+            'properties': properties,
+            'document': {'key': key, 'rows': document},
+        },
+        separators=(',', ':'),
+        default=str,
+    ).encode()
+
+    sections = [
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            COORDINATE_ENCODINGS.index(coordinates),
+            dimensions,
+            0,
+            len(collections),
+            len(types),
+            len(part_offsets) - 1,
+            len(coordinate_offsets) - 1,
+            len(array),
+            len(side_table),
+        ),
+        quantization,
+    ]
+    for section in (
+        np.asarray(collection_offsets, dtype='<u4').tobytes(),
+        np.asarray(types, dtype=np.uint8).tobytes(),
+        np.asarray(geometry_offsets, dtype='<u4').tobytes(),
+        np.asarray(part_offsets, dtype='<u4').tobytes(),
+        np.asarray(coordinate_offsets, dtype='<u4').tobytes(),
+        array.astype('<i4' if coordinates == INT32 else '<f8').tobytes(),
+        side_table,
+        column_values.astype('<f8').tobytes(),
+        np.asarray(property_indexes, dtype='<u4').tobytes(),
+    ):
+        sections.extend((section, _padding(len(section))))
+    return b''.join(sections)
+
+
+def _read(buffer, position, dtype, count):
+    """Reads a section of an array and returns it with the position of the next one."""
+    dtype = np.dtype(dtype)
+    array = np.frombuffer(buffer, dtype=dtype, count=count, offset=position)
+    length = dtype.itemsize * count
+    return array, position + length + (-length % 8)
+
+
+def decode(payload):
+    """Decodes a packed geometry payload into the rows it was encoded from.
+
+    Args:
+        payload (bytes): The payload.
+
+    Returns:
+        list: The rows, with GeoJSON under the key given when encoding. Coordinates
+        are floats, NaN or missing values are None.
+
+    Raises:
+        ValueError: If the payload is not a packed geometry payload of this version.
+    """
+    (
+        magic,
+        version,
+        encoding,
+        dimensions,
+        _,
+        collection_count,
+        feature_count,
+        geometry_count,
+        part_count,
+        coordinate_count,
+        side_table_length,
+    ) = HEADER.unpack_from(payload, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Not a packed geometry payload of a supported version')
+    position = HEADER.size
+    coordinates = COORDINATE_ENCODINGS[encoding]
+    if coordinates == INT32:
+        offset, position = _read(payload, position, '<f8', dimensions)
+        scale, position = _read(payload, position, '<f8', dimensions)
+    collection_offsets, position = _read(payload, position, '<u4', collection_count + 1)
+    types, position = _read(payload, position, np.uint8, feature_count)
+    geometry_offsets, position = _read(payload, position, '<u4', feature_count + 1)
+    part_offsets, position = _read(payload, position, '<u4', geometry_count + 1)
+    coordinate_offsets, position = _read(payload, position, '<u4', part_count + 1)
+    if coordinates == INT32:
+        quantized, position = _read(payload, position, '<i4', coordinate_count * dimensions)
+        quantized = quantized.reshape(coordinate_count, dimensions)
+        array = quantized * scale + offset
+        array[quantized == INT32_MISSING] = np.nan
+    else:
+        array, position = _read(payload, position, '<f8', coordinate_count * dimensions)
+        array = array.reshape(coordinate_count, dimensions)
+    side_table = json.loads(bytes(payload[position : position + side_table_length]))
+    position += side_table_length + (-side_table_length % 8)
+    columns = side_table['columns']
+    column_values, position = _read(payload, position, '<f8', len(columns) * feature_count)
+    property_indexes, position = _read(payload, position, '<u4', feature_count)
+    properties = _merge_properties(
+        columns,
+        column_values.reshape(len(columns), feature_count),
+        side_table['properties'],
+        property_indexes.tolist(),
+    )
+
+    values = array.astype(object)
+    values[np.isnan(array)] = None
+    values = values.tolist()
+    features = []
+    for index, code in enumerate(types.tolist()):
+        geometry_type = GEOMETRY_NAMES[code & ~TWO_DIMENSIONAL]
+        geometry = None
+        if geometry_type is not None:
+            width = 2 if code & TWO_DIMENSIONAL else dimensions
+            geometries = [
+                [
+                    [
+                        point[:width]
+                        for point in values[coordinate_offsets[part] : coordinate_offsets[part + 1]]
+                    ]
+                    for part in range(part_offsets[single], part_offsets[single + 1])
+                ]
+                for single in range(geometry_offsets[index], geometry_offsets[index + 1])
+            ]
+            geometry = {
+                'type': geometry_type,
+                'coordinates': nest_geometry(geometry_type, geometries),
+            }
+        features.append(
+            {
+                'type': 'Feature',
+                'properties': properties[index],
+                'geometry': geometry,
+            }
+        )
+
+    collections = [
+        {'type': 'FeatureCollection', 'features': features[start:end]}
+        for start, end in zip(collection_offsets[:-1].tolist(), collection_offsets[1:].tolist())
+    ]
+    key = side_table['document']['key']
+    rows = []
+    for row in side_table['document']['rows']:
+        reference = row[key]
+        if reference is not None:
+            if reference[0] == 'Feature':
+                row[key] = collections[reference[1]]['features'][0]
+            elif reference[0] == 'FeatureCollection':
+                row[key] = collections[reference[1]]
+            else:
+                row[key] = collections[reference[1] : reference[2]]
+        rows.append(row)
+    return rows
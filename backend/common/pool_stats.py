@@ -0,0 +1,87 @@
+"""
+This module provides monitoring of database connection pools.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from common.metrics import POOL_CHECKED_OUT, POOL_WAIT, record_phase
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+
+class PoolStats:
+    """Records how long connections take to be checked out of a pool.
+
+    The wait includes queueing for a free connection and, when the pool grows, opening
+    a new one, so it shows both an undersized pool and a slow database.
+
+    Args:
+        name (str): The name of the pool in the reported statistics.
+        pool (Pool): The SQLAlchemy pool reported on.
+    """
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._wait_histogram = POOL_WAIT.labels(name)
+        if hasattr(pool, 'checkedout'):
+            POOL_CHECKED_OUT.labels(name).set_function(pool.checkedout)
+
+    def record(self, seconds, timed_out=False):
+        """Records a single checkout.
+
+        Args:
+            seconds (float): The time spent waiting for the connection.
+            timed_out (bool, optional): Whether no connection was available in time.
+        """
+        self._wait_histogram.observe(seconds)
+        record_phase('pool', seconds)
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    @contextmanager
+    def measure(self):
+        """Context manager recording the time spent in its body as a checkout."""
+        start = time.perf_counter()
+        try:
+            yield
+        except PoolTimeoutError:
+            self.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.record(time.perf_counter() - start)
+
+    def stats(self):
+        """Returns the occupancy of the pool and the recorded checkout waits.
+
+        Returns:
+            dict: Pool size, connections checked out and in, overflow and wait times.
+        """
+        with self._lock:
+            checkouts = self.checkouts
+            stats = {
+                'pool': self.name,
+                'checkouts': checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_seconds': self.total_wait / checkouts if checkouts else 0.0,
+                'max_wait_seconds': self.max_wait,
+            }
+        # Pools without a fixed size, e.g. NullPool, do not report occupancy
+        for key, method in (
+            ('size', 'size'),
+            ('checked_out', 'checkedout'),
+            ('checked_in', 'checkedin'),
+            ('overflow', 'overflow'),
+        ):
+            stats[key] = getattr(self.pool, method)() if hasattr(self.pool, method) else None
+        return stats
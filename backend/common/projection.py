@@ -0,0 +1,73 @@
+"""
+This module provides coordinate transformations between the reference systems used by
+the backend, computed in-process instead of by PostGIS.
+"""
+
+import threading
+
+import numpy as np
+from pyproj import Transformer
+
+WGS84 = 'EPSG:4326'
+UTM_33N = 'EPSG:32633'
+
+# pyproj transformers are not thread-safe, so every thread keeps its own instances
+_local = threading.local()
+
+
+def get_transformer(source_crs=WGS84, target_crs=UTM_33N):
+    """Returns a cached transformer between two reference systems.
+
+    Creating a transformer parses the projection definitions, so instances are reused
+    for the lifetime of the thread. Coordinates are always in (x/lon, y/lat) order.
+
+    Args:
+        source_crs (str, optional): The source reference system. Defaults to WGS84.
+        target_crs (str, optional): The target reference system. Defaults to UTM zone 33N.
+
+    Returns:
+        Transformer: The transformer.
+    """
+    transformers = getattr(_local, 'transformers', None)
+    if transformers is None:
+        transformers = _local.transformers = {}
+    key = (source_crs, target_crs)
+    transformer = transformers.get(key)
+    if transformer is None:
+        transformer = transformers[key] = Transformer.from_crs(
+            source_crs, target_crs, always_xy=True
+        )
+    return transformer
+
+
+def transform_point(lon, lat, source_crs=WGS84, target_crs=UTM_33N):
+    """Transforms a single point, by default from WGS84 to UTM zone 33N.
+
+    Args:
+        lon (float): The longitude, or x in the source reference system.
+        lat (float): The latitude, or y in the source reference system.
+        source_crs (str, optional): The source reference system. Defaults to WGS84.
+        target_crs (str, optional): The target reference system. Defaults to UTM zone 33N.
+
+    Returns:
+        tuple: The (x, y) coordinates in the target reference system.
+    """
+    x, y = get_transformer(source_crs, target_crs).transform(lon, lat)
+    return float(x), float(y)
+
+
+def transform_points(lons, lats, source_crs=WGS84, target_crs=UTM_33N):
+    """Transforms many points in a single vectorized call.
+
+    Args:
+        lons (array_like): The longitudes, or x in the source reference system.
+        lats (array_like): The latitudes, or y in the source reference system.
+        source_crs (str, optional): The source reference system. Defaults to WGS84.
+        target_crs (str, optional): The target reference system. Defaults to UTM zone 33N.
+
+    Returns:
+        tuple: Arrays with the x and y coordinates in the target reference system.
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    return get_transformer(source_crs, target_crs).transform(lons, lats)
@@ -0,0 +1,78 @@
+"""
+This module encodes response bodies as JSON, with orjson when it is installed.
+"""
+
+import datetime
+import decimal
+import json
+import uuid
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+MEDIA_TYPE = 'application/json'
+
+
+def _default(value):
+    """Encodes the values returned by the database which JSON has no type for.
+
+    Raises:
+        TypeError: If the value cannot be encoded.
+    """
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(content):
+    """Encodes a value as compact UTF-8 JSON.
+
+    Dictionaries may have integer keys, and decimals, dates and UUIDs are encoded like
+    FastAPI's jsonable_encoder does, so Python-built responses need not be walked by
+    it first. orjson encodes NaN and infinity as null, json rejects them.
+
+    Args:
+        content: The value to encode.
+
+    Returns:
+        bytes: The JSON encoding.
+
+    Raises:
+        TypeError: If the value holds a type which cannot be encoded.
+        ValueError: If the value holds NaN or infinity and orjson is not installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(',', ':'),
+    ).encode('utf-8')
+
+
+def splice_object(members):
+    """Encodes a dictionary whose values may already be encoded JSON.
+
+    Values which are bytes are inserted into the body as they are, so JSON built by
+    the database is never decoded. Other values are encoded with dumps.
+
+    Args:
+        members (dict): String keys mapped to values or encoded JSON.
+
+    Returns:
+        bytes: The JSON encoding of the object.
+    """
+    return b'{' + b','.join(
+        dumps(str(key)) + b':' + (value if isinstance(value, bytes) else dumps(value))
+        for key, value in members.items()
+    ) + b'}'
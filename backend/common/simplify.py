@@ -0,0 +1,280 @@
+"""
+This module simplifies GeoJSON geometry for serving it at lower levels of detail.
+"""
+
+import numpy as np
+
+# Simplification tolerance in metres of every level of detail, level 0 is full resolution
+LOD_TOLERANCES = (0.0, 0.1, 0.5, 2.0, 10.0, 50.0)
+
+# Mean radius of the earth, for measuring distances between nearby WGS84 coordinates
+EARTH_RADIUS = 6371008.8
+
+
+def local_metres(coordinates):
+    """Projects WGS84 coordinates onto a plane in metres around their mean latitude.
+
+    The distortion is negligible over the extent of a cable, so distances between the
+    projected coordinates can be compared with a tolerance in metres.
+
+    Args:
+        coordinates (list): Longitude, latitude and optionally height of every vertex.
+
+    Returns:
+        ndarray: Array of shape (n, 2) of the projected coordinates.
+    """
+    lon_lat = np.array([coordinate[:2] for coordinate in coordinates], dtype=np.float64)
+    scale = np.radians(EARTH_RADIUS)
+    x = lon_lat[:, 0] * scale * np.cos(np.radians(lon_lat[:, 1].mean()))
+    return np.column_stack((x, lon_lat[:, 1] * scale))
+
+
+def _segment_distances(points, start, end):
+    """Returns the distance of every point to the segment from start to end."""
+    direction = end - start
+    length = direction @ direction
+    if length == 0:
+        return np.hypot(*(points - start).T)
+    t = np.clip((points - start) @ direction / length, 0.0, 1.0)
+    return np.hypot(*(points - start - t[:, None] * direction).T)
+
+
+def _split(points, keep, start, end, tolerance):
+    """Keeps the vertex farthest from the segment between two kept vertices if it is
+    more than the tolerance away.
+
+    Returns:
+        int: The index of the kept vertex, or None.
+    """
+    if end - start < 2:
+        return None
+    distances = _segment_distances(points[start + 1 : end], points[start], points[end])
+    index = int(np.argmax(distances))
+    if distances[index] <= tolerance:
+        return None
+    keep[start + 1 + index] = True
+    return start + 1 + index
+
+
+def _orientation(a, b, c):
+    """Returns the sign of the turn from a over b to c, for arrays of points."""
+    return np.sign(
+        (b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1])
+        - (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0])
+    )
+
+
+def crossing_segments(points):
+    """Finds the segments of a line which intersect a segment they are not adjacent to.
+
+    Args:
+        points (ndarray): Array of shape (n, 2) of the vertices of the line.
+
+    Returns:
+        set: The indexes of the intersecting segments, segment i running from vertex i
+        to vertex i + 1.
+    """
+    starts, ends = points[:-1], points[1:]
+    count = len(starts)
+    closed = count > 2 and np.array_equal(points[0], points[-1])
+    crossing = set()
+    for i in range(count - 2):
+        others = slice(i + 2, count - 1 if closed and i == 0 else count)
+        r, s = starts[others], ends[others]
+        p, q = starts[i], ends[i]
+        intersects = (
+            (_orientation(p, q, r) * _orientation(p, q, s) <= 0)
+            & (_orientation(r, s, p) * _orientation(r, s, q) <= 0)
+            & (np.minimum(r[:, 0], s[:, 0]) <= max(p[0], q[0]))
+            & (np.maximum(r[:, 0], s[:, 0]) >= min(p[0], q[0]))
+            & (np.minimum(r[:, 1], s[:, 1]) <= max(p[1], q[1]))
+            & (np.maximum(r[:, 1], s[:, 1]) >= min(p[1], q[1]))
+        )
+        hits = np.flatnonzero(intersects)
+        if len(hits):
+            crossing.add(i)
+            crossing.update((hits + i + 2).tolist())
+    return crossing
+
+
+def simplify_line(points, tolerance):
+    """Simplifies a line with the Douglas-Peucker algorithm without creating crossings.
+
+    Vertices are removed while the line stays within the tolerance of the original.
+    Segments of the result crossing another segment are split again at their farthest
+    removed vertex until no crossing remains, like ST_SimplifyPreserveTopology, so a
+    line which does not cross itself is never made to.
+
+    Args:
+        points (ndarray): Array of shape (n, 2) of the vertices in metres.
+        tolerance (float): The maximum distance in metres of a removed vertex from the
+            simplified line.
+
+    Returns:
+        ndarray: Boolean mask of the kept vertices. The first and last are always kept.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    if len(points) < 3 or tolerance <= 0:
+        keep[:] = True
+        return keep
+
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        split = _split(points, keep, start, end, tolerance)
+        if split is not None:
+            stack.extend(((start, split), (split, end)))
+
+    while True:
+        indexes = np.flatnonzero(keep)
+        crossing = crossing_segments(points[indexes])
+        splits = [
+            _split(points, keep, indexes[segment], indexes[segment + 1], -1.0)
+            for segment in crossing
+        ]
+        if all(split is None for split in splits):
+            return keep
+
+
+def thin_points(points, tolerance):
+    """Thins a set of points to at most one per grid cell the size of the tolerance.
+
+    Args:
+        points (ndarray): Array of shape (n, 2) of the points in metres.
+        tolerance (float): The size of the grid cells in metres.
+
+    Returns:
+        ndarray: Boolean mask of the kept points, the first point of every cell.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    if tolerance <= 0 or len(points) == 0:
+        keep[:] = True
+        return keep
+    cells = np.floor(points / tolerance).astype(np.int64)
+    _, first = np.unique(cells, axis=0, return_index=True)
+    keep[first] = True
+    return keep
+
+
+def _round(coordinate, precision):
+    """Rounds the longitude and latitude of a coordinate, keeping its height."""
+    if precision is None:
+        return list(coordinate)
+    return [round(coordinate[0], precision), round(coordinate[1], precision), *coordinate[2:]]
+
+
+def _simplify_coordinates(coordinates, tolerance, precision, minimum):
+    """Simplifies the coordinates of a line or ring, keeping the heights of the kept
+    vertices as they are.
+
+    Lines which would be left with fewer vertices than the minimum are not simplified.
+    """
+    if tolerance > 0 and len(coordinates) > minimum:
+        keep = simplify_line(local_metres(coordinates), tolerance)
+        if keep.sum() >= minimum:
+            coordinates = [coordinates[index] for index in np.flatnonzero(keep)]
+    return [_round(coordinate, precision) for coordinate in coordinates]
+
+
+def simplify_geometry(geometry, tolerance, precision=None):
+    """Simplifies a GeoJSON geometry.
+
+    Lines and polygon rings are simplified with simplify_line, points are kept. Heights
+    are never changed.
+
+    Args:
+        geometry (dict): The GeoJSON geometry, or None.
+        tolerance (float): The simplification tolerance in metres.
+        precision (int, optional): The number of decimals longitudes and latitudes are
+            rounded to. Defaults to None, not rounding.
+
+    Returns:
+        dict: The simplified geometry. The input is not modified.
+    """
+    if geometry is None:
+        return None
+    geometry_type = geometry.get('type')
+    coordinates = geometry.get('coordinates')
+    if geometry_type == 'Point':
+        coordinates = _round(coordinates, precision)
+    elif geometry_type == 'MultiPoint':
+        coordinates = [_round(coordinate, precision) for coordinate in coordinates]
+    elif geometry_type == 'LineString':
+        coordinates = _simplify_coordinates(coordinates, tolerance, precision, 2)
+    elif geometry_type in ('MultiLineString', 'Polygon'):
+        minimum = 2 if geometry_type == 'MultiLineString' else 4
+        coordinates = [
+            _simplify_coordinates(part, tolerance, precision, minimum) for part in coordinates
+        ]
+    elif geometry_type == 'MultiPolygon':
+        coordinates = [
+            [_simplify_coordinates(ring, tolerance, precision, 4) for ring in polygon]
+            for polygon in coordinates
+        ]
+    else:
+        return geometry
+    return {**geometry, 'coordinates': coordinates}
+
+
+def _simplify_feature(feature, tolerance, precision):
+    """Returns a copy of a feature with simplified geometry."""
+    return {**feature, 'geometry': simplify_geometry(feature.get('geometry'), tolerance, precision)}
+
+
+def _simplify_collection(collection, tolerance, precision, thin):
+    """Returns a copy of a feature collection with simplified geometry.
+
+    With thin set, the point features are thinned with thin_points.
+    """
+    features = collection.get('features') or []
+    if thin and tolerance > 0:
+        points = [
+            feature
+            for feature in features
+            if (feature.get('geometry') or {}).get('type') == 'Point'
+        ]
+        if len(points) > 1:
+            coordinates = [feature['geometry']['coordinates'] for feature in points]
+            keep = thin_points(local_metres(coordinates), tolerance)
+            dropped = {id(point) for point, kept in zip(points, keep) if not kept}
+            features = [feature for feature in features if id(feature) not in dropped]
+    return {
+        **collection,
+        'features': [_simplify_feature(feature, tolerance, precision) for feature in features],
+    }
+
+
+def _simplify_document(document, tolerance, precision, thin):
+    """Simplifies a Feature, a FeatureCollection or a list of either."""
+    if isinstance(document, list):
+        return [_simplify_document(item, tolerance, precision, thin) for item in document]
+    if not isinstance(document, dict):
+        return document
+    if document.get('type') == 'FeatureCollection':
+        return _simplify_collection(document, tolerance, precision, thin)
+    if document.get('type') == 'Feature':
+        return _simplify_feature(document, tolerance, precision)
+    return document
+
+
+def simplify_rows(rows, tolerance, precision=None, thin=False, key='geojson'):
+    """Simplifies the GeoJSON of the rows of a geometry endpoint.
+
+    Args:
+        rows (list): The rows, with a Feature, a FeatureCollection or a list of
+            FeatureCollections under the key.
+        tolerance (float): The simplification tolerance in metres.
+        precision (int, optional): The number of decimals longitudes and latitudes are
+            rounded to. Defaults to None, not rounding.
+        thin (bool, optional): Thin the points of every feature collection to at most one
+            per tolerance. Defaults to False, keeping every point.
+        key (str, optional): The key of the GeoJSON in the rows. Defaults to 'geojson'.
+
+    Returns:
+        list: Copies of the rows with simplified GeoJSON. The rows are not modified.
+    """
+    return [
+        {**row, key: _simplify_document(row.get(key), tolerance, precision, thin)}
+        for row in rows
+    ]
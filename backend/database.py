@@ -3,7 +3,9 @@ This module provides functionality for connecting to the database.
 """
 
 import os
+from contextlib import asynccontextmanager, contextmanager
 
+from common.pool_stats import PoolStats
 from dotenv import load_dotenv
 from sqlalchemy import (
     Column,
@@ -15,8 +17,8 @@ from sqlalchemy import (
     String,
     Table,
     create_engine,
-    text,
 )
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 # Load environment variables from .env file
@@ -32,11 +34,93 @@ db_port = os.getenv('DB_PORT')
 # Create connection to database
 DATABASE_URL = f'postgresql://{db_user}:{
     db_password}@{db_host}:{db_port}/{db_name}'
+ASYNC_DATABASE_URL = f'postgresql+asyncpg://{db_user}:{
+    db_password}@{db_host}:{db_port}/{db_name}'
 SCHEMA = 'analytics_cable_measurement_inquiries'
 SCHEMA_PUBLIC = 'public'
+SCHEMAS = (SCHEMA, SCHEMA_PUBLIC)
+
+# Settings of every connection pool, tunable per deployment
+POOL_SETTINGS = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+    'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    # Off by default, as it costs a round trip per checkout. Enable it behind proxies
+    # dropping idle connections sooner than pool_recycle
+    'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'false').lower() in ('1', 'true', 'yes'),
+}
+
+
+def create_schema_engine(schema):
+    """Creates a pooled engine whose connections search the given schema.
+
+    The search_path is sent as a startup option of every new connection, so checking out
+    a pooled connection costs no extra statement. SQL is logged through the
+    sqlalchemy.engine logger instead of echo.
+
+    Args:
+        schema (str): The schema to search.
+
+    Returns:
+        Engine: The engine.
+    """
+    return create_engine(
+        DATABASE_URL,
+        connect_args={'options': f'-csearch_path={schema}'},
+        **POOL_SETTINGS,
+    )
+
+
+def create_async_schema_engine(schema):
+    """Creates a pooled async engine whose connections search the given schema.
+
+    Args:
+        schema (str): The schema to search.
+
+    Returns:
+        AsyncEngine: The engine.
+    """
+    return create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args={'server_settings': {'search_path': schema}},
+        **POOL_SETTINGS,
+    )
+
 
-# Engine for executing queries
-engine = create_engine(DATABASE_URL, echo=True, future=True)
+# One pool per schema and driver, for executing queries from sync and async endpoints
+engines = {schema: create_schema_engine(schema) for schema in SCHEMAS}
+async_engines = {schema: create_async_schema_engine(schema) for schema in SCHEMAS}
+pool_stats = {
+    **{(schema, 'sync'): PoolStats(f'{schema}/sync', engines[schema].pool) for schema in SCHEMAS},
+    **{
+        (schema, 'async'): PoolStats(f'{schema}/async', async_engines[schema].sync_engine.pool)
+        for schema in SCHEMAS
+    },
+}
+
+# Engine for executing queries, searching the public schema like a plain connection
+engine = engines[SCHEMA_PUBLIC]
+
+# Engine for executing queries from async endpoints without blocking the event loop
+async_engine = async_engines[SCHEMA]
+
+
+@contextmanager
+def connect(schema=SCHEMA):
+    """Checks out a connection to the database within the given folder.
+
+    Args:
+        schema (str, optional): The schema to search. Defaults to
+            analytics_cable_measurement_inquiries.
+
+    Yields:
+        Connection: High-level API for interacting with the database.
+    """
+    with pool_stats[(schema, 'sync')].measure():
+        connection = engines[schema].connect()
+    with connection:
+        yield connection.execution_options(mapper=ResultProxy.mappings)
 
 
 def get_db():
@@ -45,9 +129,7 @@ def get_db():
     Yields:
         Connection: High-level API for interacting with the database.
     """
-    with engine.connect() as connection:
-        connection = connection.execution_options(mapper=ResultProxy.mappings)
-        connection.execute(text(f'SET search_path TO {SCHEMA}'))
+    with connect(SCHEMA) as connection:
         yield connection
 
 
@@ -57,12 +139,89 @@ def get_db_public():
     Yields:
         Connection: High-level API for interacting with the database.
     """
-    with engine.connect() as connection:
-        connection = connection.execution_options(mapper=ResultProxy.mappings)
-        connection.execute(text(f'SET search_path TO {SCHEMA_PUBLIC}'))
+    with connect(SCHEMA_PUBLIC) as connection:
+        yield connection
+
+
+@asynccontextmanager
+async def connect_async(schema=SCHEMA):
+    """Opens an async connection to the database within the given folder.
+
+    Args:
+        schema (str, optional): The schema to search. Defaults to
+            analytics_cable_measurement_inquiries.
+
+    Yields:
+        AsyncConnection: Async API for interacting with the database.
+    """
+    connection = async_engines[schema].connect()
+    with pool_stats[(schema, 'async')].measure():
+        await connection.start()
+    try:
+        yield connection
+    finally:
+        await connection.close()
+
+
+async def get_async_db():
+    """Establishes an async connection to the database within folder
+    analytics_cable_measurement_inquiries.
+
+    Yields:
+        AsyncConnection: Async API for interacting with the database.
+    """
+    async with connect_async(SCHEMA) as connection:
         yield connection
 
 
+async def get_async_db_public():
+    """Establishes an async connection to the database within folder public.
+
+    Yields:
+        AsyncConnection: Async API for interacting with the database.
+    """
+    async with connect_async(SCHEMA_PUBLIC) as connection:
+        yield connection
+
+
+def get_pool_stats():
+    """Returns the occupancy and checkout waits of every connection pool.
+
+    Returns:
+        list: One dictionary per pool, see PoolStats.stats.
+    """
+    return [stats.stats() for stats in pool_stats.values()]
+
+
+async def dispose_engines():
+    """Closes the pooled connections of every engine."""
+    for schema_engine in engines.values():
+        schema_engine.dispose()
+    for schema_engine in async_engines.values():
+        await schema_engine.dispose()
+
+
+async def run_query(connection, query, *args, **kwargs):
+    """Runs a query function written for sync connections on an async connection.
+
+    The query is called as query(*args, connection, **kwargs) and executes on the event
+    loop through the async driver, so the existing query functions can be reused as is.
+
+    Args:
+        connection (AsyncConnection): The async connection.
+        query (callable): The query function, taking the connection as last positional
+            argument.
+        *args: The arguments passed before the connection.
+        **kwargs: The keyword arguments passed to the query.
+
+    Returns:
+        The return value of the query function.
+    """
+    return await connection.run_sync(
+        lambda sync_connection: query(*args, sync_connection, **kwargs)
+    )
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 metadata = MetaData()
 metadata = MetaData()
@@ -0,0 +1,407 @@
+"""
+This module broadcasts point edits to the viewers of an inquiry through Postgres LISTEN/NOTIFY.
+"""
+
+import asyncio
+import json
+import logging
+
+import asyncpg
+from common.metrics import EDIT_EVENT_SUBSCRIBERS
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+# Channel of the notifications, shared by every API worker
+CHANNEL = 'point_edits'
+
+# Channel of the inquiries whose views were refreshed, so every worker evicts their cache
+REFRESH_CHANNEL = 'view_refreshes'
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+
+# Sent to a subscriber which may have missed edits, so it refetches the inquiry
+RESYNC_MESSAGE = 'event: resync\ndata: {}\n\n'
+
+
+def point_edit(point_id, lat, lon, height, x, y):
+    """Builds the event of an edited point.
+
+    Args:
+        point_id (int): The ID of the point.
+        lat (float): The new latitude.
+        lon (float): The new longitude.
+        height (float): The new height.
+        x (float): The new easting in UTM zone 33.
+        y (float): The new northing in UTM zone 33.
+
+    Returns:
+        dict: The event.
+    """
+    return {
+        'id': point_id,
+        'lat': lat,
+        'lon': lon,
+        'height': height,
+        'x': float(x),
+        'y': float(y),
+    }
+
+
+def encode_notifications(point_inquiries, edits, max_bytes=MAX_PAYLOAD_BYTES):
+    """Groups the edits of points by inquiry and splits them into NOTIFY payloads.
+
+    Every payload is a JSON object with an inquiry_id and the points edited in it,
+    shorter than max_bytes. An edit of a point shared by several inquiries is sent to
+    each of them.
+
+    Args:
+        point_inquiries (dict): The IDs of the inquiries owning every point, keyed by
+            point ID.
+        edits (list): The events of the edited points, see point_edit.
+        max_bytes (int, optional): The maximum size of a payload. Defaults to
+            MAX_PAYLOAD_BYTES.
+
+    Returns:
+        list: The payloads.
+    """
+    points_by_inquiry = {}
+    for edit in edits:
+        point = json.dumps(edit, separators=(',', ':'))
+        for inquiry_id in point_inquiries.get(edit['id'], ()):
+            points_by_inquiry.setdefault(inquiry_id, []).append(point)
+
+    payloads = []
+    for inquiry_id, points in points_by_inquiry.items():
+        prefix = f'{{"inquiry_id":{int(inquiry_id)},"points":['
+        chunk, size = [], len(prefix) + 2
+        for point in points:
+            if chunk and size + len(point) + 1 > max_bytes:
+                payloads.append(prefix + ','.join(chunk) + ']}')
+                chunk, size = [], len(prefix) + 2
+            chunk.append(point)
+            size += len(point) + 1
+        payloads.append(prefix + ','.join(chunk) + ']}')
+    return payloads
+
+
+def encode_refresh_notifications(inquiry_ids, max_bytes=MAX_PAYLOAD_BYTES):
+    """Splits the IDs of inquiries whose views were refreshed into NOTIFY payloads.
+
+    Every payload is a JSON object with a list of inquiry_ids, shorter than max_bytes.
+
+    Args:
+        inquiry_ids (iterable): The IDs of the inquiries.
+        max_bytes (int, optional): The maximum size of a payload. Defaults to
+            MAX_PAYLOAD_BYTES.
+
+    Returns:
+        list: The payloads.
+    """
+    prefix = '{"inquiry_ids":['
+    payloads, chunk, size = [], [], len(prefix) + 2
+    for inquiry_id in sorted(int(inquiry_id) for inquiry_id in inquiry_ids):
+        if chunk and size + len(str(inquiry_id)) + 1 > max_bytes:
+            payloads.append(prefix + ','.join(chunk) + ']}')
+            chunk, size = [], len(prefix) + 2
+        chunk.append(str(inquiry_id))
+        size += len(chunk[-1]) + 1
+    if chunk:
+        payloads.append(prefix + ','.join(chunk) + ']}')
+    return payloads
+
+
+def _notify(connection, channel, payloads):
+    """Sends every payload as a notification on the channel."""
+    connection.execute(
+        text(
+            'SELECT pg_notify(:channel, payload) '
+            'FROM unnest(CAST(:payloads AS text[])) AS payload'
+        ),
+        {'channel': channel, 'payloads': payloads},
+    )
+
+
+def publish_point_edits(connection, point_inquiries, edits):
+    """Notifies the listening API workers of edited points.
+
+    Must be called in the transaction of the edit: Postgres delivers the notifications
+    when it commits, and drops them when it is rolled back.
+
+    Args:
+        connection: The database connection of the edit.
+        point_inquiries (dict): The IDs of the inquiries owning every point, keyed by
+            point ID.
+        edits (list): The events of the edited points, see point_edit.
+
+    Returns:
+        int: The number of notifications sent.
+    """
+    payloads = encode_notifications(point_inquiries, edits)
+    if payloads:
+        _notify(connection, CHANNEL, payloads)
+    return len(payloads)
+
+
+def publish_views_refreshed(engine, inquiry_ids):
+    """Notifies the listening API workers that the views of inquiries were refreshed.
+
+    Failures are logged rather than raised, as the views are refreshed either way.
+
+    Args:
+        engine (Engine): The engine used for notifying.
+        inquiry_ids (iterable): The IDs of the inquiries.
+
+    Returns:
+        int: The number of notifications sent.
+    """
+    payloads = encode_refresh_notifications(inquiry_ids)
+    if not payloads:
+        return 0
+    try:
+        with engine.begin() as connection:
+            _notify(connection, REFRESH_CHANNEL, payloads)
+    except SQLAlchemyError as e:
+        logger.warning('Cannot notify the workers of refreshed views: %s', e)
+        return 0
+    return len(payloads)
+
+
+class Subscription:
+    """Server-sent events of the point edits of one inquiry.
+
+    Args:
+        broker (EditEventBroker): The broker the subscription is registered with.
+        inquiry_id (int): The ID of the inquiry.
+        queue_size (int): The maximum number of undelivered events.
+    """
+
+    def __init__(self, broker, inquiry_id, queue_size):
+        self.broker = broker
+        self.inquiry_id = inquiry_id
+        self.queue = asyncio.Queue(queue_size)
+
+    def put(self, message):
+        """Queues a message, replacing the backlog with a resync when the queue is full."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_MESSAGE)
+
+    async def get(self):
+        """Waits for the next message."""
+        return await self.queue.get()
+
+    def close(self):
+        """Unregisters the subscription."""
+        self.broker.unsubscribe(self)
+
+
+class EditEventBroker:
+    """Fans the point edits notified by any API worker out to the viewers of an inquiry.
+
+    Every worker holds one dedicated connection listening to CHANNEL, opened when the
+    application starts or the first viewer subscribes. Notifications are formatted as
+    server-sent events once and queued for every subscriber of their inquiry. When the
+    connection is lost, it is reopened and every subscriber is sent a resync event, as
+    edits may have been missed.
+
+    The same connection listens to REFRESH_CHANNEL, so the responses cached by every
+    worker are evicted once the views of an inquiry are refreshed by any of them.
+
+    Args:
+        dsn (str): The libpq connection string of the database.
+        channel (str, optional): The notification channel. Defaults to CHANNEL.
+        queue_size (int, optional): The maximum number of undelivered events of a
+            subscriber, before they are replaced by a resync event. Defaults to 256.
+        retry_seconds (float, optional): Time to wait before reconnecting. Defaults to 5.
+        on_refreshed (callable, optional): Called with the set of inquiry IDs whose views
+            were refreshed by any worker. Defaults to None.
+        on_reconnected (callable, optional): Called when the connection is reopened, as
+            refreshes may have been missed. Defaults to None.
+        refresh_channel (str, optional): The notification channel of refreshed views.
+            Defaults to REFRESH_CHANNEL.
+    """
+
+    def __init__(
+        self,
+        dsn,
+        channel=CHANNEL,
+        queue_size=256,
+        retry_seconds=5.0,
+        on_refreshed=None,
+        on_reconnected=None,
+        refresh_channel=REFRESH_CHANNEL,
+    ):
+        self.dsn = dsn
+        self.channel = channel
+        self.queue_size = queue_size
+        self.retry_seconds = retry_seconds
+        self.on_refreshed = on_refreshed
+        self.on_reconnected = on_reconnected
+        self.refresh_channel = refresh_channel
+        self._subscribers = {}
+        self._task = None
+
+    def subscribe(self, inquiry_id):
+        """Registers a subscriber to the point edits of an inquiry.
+
+        Args:
+            inquiry_id (int): The ID of the inquiry.
+
+        Returns:
+            Subscription: The subscription, to be closed when the viewer disconnects.
+        """
+        subscription = Subscription(self, inquiry_id, self.queue_size)
+        self._subscribers.setdefault(inquiry_id, set()).add(subscription)
+        EDIT_EVENT_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Unregisters a subscriber, see subscribe."""
+        subscribers = self._subscribers.get(subscription.inquiry_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.inquiry_id]
+        EDIT_EVENT_SUBSCRIBERS.dec()
+
+    def start(self):
+        """Starts listening in the background, unless it already does."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self):
+        """Stops listening and closes the connection."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def stream(self, inquiry_id, keepalive_seconds=15.0):
+        """Yields the server-sent events of the point edits of an inquiry.
+
+        A comment is sent when no event was sent for keepalive_seconds, so proxies
+        keep the connection open and disconnected viewers are noticed.
+
+        Args:
+            inquiry_id (int): The ID of the inquiry.
+            keepalive_seconds (float, optional): The maximum time between messages.
+                Defaults to 15.
+
+        Yields:
+            str: The messages of the event stream.
+        """
+        self.start()
+        subscription = self.subscribe(inquiry_id)
+        try:
+            yield f'retry: {int(self.retry_seconds * 1000)}\n\n'
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.get(), keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+        finally:
+            subscription.close()
+
+    def dispatch(self, payload):
+        """Queues a notification for the subscribers of its inquiry.
+
+        Args:
+            payload (str): The payload, see encode_notifications.
+
+        Returns:
+            int: The number of subscribers it was queued for.
+        """
+        try:
+            inquiry_id = json.loads(payload)['inquiry_id']
+        except (ValueError, KeyError, TypeError):
+            logger.warning('Ignoring malformed point edit notification: %.100s', payload)
+            return 0
+        subscribers = self._subscribers.get(inquiry_id, ())
+        if not subscribers:
+            return 0
+        message = f'event: points\ndata: {payload}\n\n'
+        for subscription in subscribers:
+            subscription.put(message)
+        return len(subscribers)
+
+    def dispatch_refresh(self, payload):
+        """Passes the inquiries of a notification of refreshed views to on_refreshed.
+
+        Args:
+            payload (str): The payload, see encode_refresh_notifications.
+
+        Returns:
+            set: The IDs of the inquiries.
+        """
+        try:
+            inquiry_ids = {int(inquiry_id) for inquiry_id in json.loads(payload)['inquiry_ids']}
+        except (ValueError, KeyError, TypeError):
+            logger.warning('Ignoring malformed view refresh notification: %.100s', payload)
+            return set()
+        if inquiry_ids and self.on_refreshed is not None:
+            self.on_refreshed(inquiry_ids)
+        return inquiry_ids
+
+    def resync(self):
+        """Sends a resync event to every subscriber."""
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                subscription.put(RESYNC_MESSAGE)
+
+    def _on_notification(self, _connection, _pid, _channel, payload):
+        self.dispatch(payload)
+
+    def _on_refresh_notification(self, _connection, _pid, _channel, payload):
+        self.dispatch_refresh(payload)
+
+    async def _listen(self):
+        """Listens to the channel, reconnecting until stopped.
+
+        Any error other than the cancellation by stop is logged and retried, and
+        notifications sent meanwhile are made up for by a resync once listening again.
+        """
+        missed = False
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                try:
+                    lost = asyncio.Event()
+                    connection.add_termination_listener(lambda _connection: lost.set())
+                    await connection.add_listener(self.channel, self._on_notification)
+                    await connection.add_listener(
+                        self.refresh_channel, self._on_refresh_notification
+                    )
+                    if missed:
+                        self.resync()
+                        if self.on_reconnected is not None:
+                            self.on_reconnected()
+                        missed = False
+                    await lost.wait()
+                    missed = True
+                    logger.warning('Lost the connection listening to point edits, reconnecting')
+                finally:
+                    if not connection.is_closed():
+                        await connection.close()
+            except (OSError, asyncpg.PostgresError) as e:
+                missed = True
+                logger.warning(
+                    'Cannot listen to point edits, retrying in %s s: %s', self.retry_seconds, e
+                )
+                await asyncio.sleep(self.retry_seconds)
+            except Exception:  # pylint: disable=broad-except
+                missed = True
+                logger.exception(
+                    'Failed listening to point edits, retrying in %s s', self.retry_seconds
+                )
+                await asyncio.sleep(self.retry_seconds)
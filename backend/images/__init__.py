@@ -0,0 +1,3 @@
+"""
+This package provides the originals of inquiry images and their thumbnails and previews.
+"""
@@ -0,0 +1,79 @@
+"""
+This module provides access to the original inquiry images in the image archive.
+"""
+
+import glob
+import os
+import re
+
+# Archive IDs are used in file names, so only plain IDs such as bra_arkiv_id are accepted
+ARCHIVE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class ImageNotFoundError(LookupError):
+    """Raised when the archive has no image with the requested ID.
+
+    Args:
+        archive_id (str): The ID of the image.
+    """
+
+    def __init__(self, archive_id):
+        super().__init__(f'No image with archive ID {archive_id}')
+        self.archive_id = archive_id
+
+
+def validate_archive_id(archive_id):
+    """Checks that an archive ID is safe to use in file names.
+
+    Args:
+        archive_id: The ID, e.g. the bra_arkiv_id of an image.
+
+    Returns:
+        str: The ID as a string.
+
+    Raises:
+        ValueError: If the ID contains anything but letters, digits, '-' and '_'.
+    """
+    archive_id = str(archive_id)
+    if not ARCHIVE_ID_PATTERN.match(archive_id):
+        raise ValueError(f'Invalid archive ID: {archive_id!r}')
+    return archive_id
+
+
+class DirectoryArchive:
+    """Image archive stand-in serving originals from a local directory.
+
+    An original is a file named by its archive ID, with any extension, e.g.
+    613a1528297e0ffcf6d9fa60.jpg.
+
+    Args:
+        directory (str): The directory holding the originals.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, archive_id):
+        """Returns the path of the original image with the given archive ID.
+
+        Args:
+            archive_id (str): The ID of the image.
+
+        Returns:
+            str: The path of the file.
+
+        Raises:
+            ValueError: If the ID is not a valid archive ID.
+            ImageNotFoundError: If the directory has no image with the ID.
+        """
+        archive_id = validate_archive_id(archive_id)
+        candidates = sorted(
+            glob.glob(os.path.join(glob.escape(self.directory), f'{archive_id}.*'))
+        )
+        exact = os.path.join(self.directory, archive_id)
+        if os.path.isfile(exact):
+            candidates.insert(0, exact)
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return candidate
+        raise ImageNotFoundError(archive_id)
@@ -0,0 +1,242 @@
+"""
+This module generates and caches thumbnails and previews of inquiry images.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from common.cache import LRUCache
+from common.file_cache import FileCache
+from common.metrics import IMAGE_DERIVATIVE_DURATION
+from images.archive import DirectoryArchive, ImageNotFoundError, validate_archive_id
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels of every derivative size
+DERIVATIVE_SIZES = {'thumbnail': 256, 'preview': 1600}
+JPEG_QUALITY = {'thumbnail': 80, 'preview': 85}
+DERIVATIVE_EXTENSION = '.jpg'
+DERIVATIVE_MEDIA_TYPE = 'image/jpeg'
+
+# Derivatives of an archive ID never change, so clients may keep them for a year
+DERIVATIVE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def derivative_key(archive_id, size):
+    """Builds the cache key of a derivative.
+
+    Args:
+        archive_id: The archive ID of the original image, e.g. its bra_arkiv_id.
+        size (str): The derivative size, a key of DERIVATIVE_SIZES.
+
+    Returns:
+        str: The key, usable as a file name.
+
+    Raises:
+        ValueError: If the archive ID or the size is not valid.
+    """
+    if size not in DERIVATIVE_SIZES:
+        raise ValueError(f'Unknown image size {size}. Choose from {list(DERIVATIVE_SIZES)}')
+    return f'{validate_archive_id(archive_id)}-{size}'
+
+
+def render_derivative(source, destination, max_pixels, quality):
+    """Scales an image down to fit a square and writes it as a JPEG.
+
+    Runs in the worker processes of ImageDerivatives. JPEG originals are decoded at
+    the smallest DCT scale still larger than the target, and the EXIF orientation of
+    field photos is applied, so derivatives are shown upright without it.
+
+    Args:
+        source (str): Path of the original image.
+        destination (str): Path the derivative is written to.
+        max_pixels (int): The maximum width and height of the derivative.
+        quality (int): The JPEG quality.
+
+    Raises:
+        RuntimeError: If Pillow is not installed.
+        OSError: If the original cannot be decoded.
+    """
+    if Image is None:
+        raise RuntimeError('Pillow is required to generate image derivatives')
+    with Image.open(source) as original:
+        original.draft('RGB', (max_pixels, max_pixels))
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((max_pixels, max_pixels), Image.Resampling.LANCZOS)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(destination, 'JPEG', quality=quality, optimize=True, progressive=True)
+
+
+class ImageDerivatives:
+    """Thumbnails and previews of archive images, generated once and cached on disk.
+
+    Derivatives are rendered in a pool of worker processes, so decoding and scaling
+    large photos neither blocks the event loop nor holds the GIL of the API process.
+    They are cached by archive ID and size in a FileCache, and concurrent requests for
+    the same derivative share one rendering.
+
+    Args:
+        archive (DirectoryArchive): The archive of the original images.
+        cache (FileCache): The cache of the derivatives.
+        processes (int, optional): Number of worker processes. Defaults to None, one
+            per CPU.
+        threads (int, optional): Number of derivatives fetched or rendered at once,
+            including prefetches. Defaults to 8.
+        failure_ttl (float, optional): Seconds a failed prefetch, e.g. of a missing
+            original, is not queued again. Defaults to 300.
+    """
+
+    def __init__(self, archive, cache, processes=None, threads=8, failure_ttl=300.0):
+        self.archive = archive
+        self.cache = cache
+        self.processes = processes
+        self.threads = threads
+        self.failure_ttl = failure_ttl
+        # Expiry of the failed prefetches by derivative key
+        self._failures = LRUCache(max_entries=10000)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._executor = None
+
+    def _process_pool(self):
+        """Returns the worker process pool, starting it on first use."""
+        with self._lock:
+            if self._pool is None:
+                # Workers are spawned, as forking the multi-threaded API process is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._pool
+
+    def _thread_pool(self):
+        """Returns the threads waiting for derivatives, starting them on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.threads, thread_name_prefix='image-derivatives'
+                )
+            return self._executor
+
+    def get(self, archive_id, size):
+        """Returns the path of a derivative, rendering it on a cache miss.
+
+        Blocks until the derivative is written, see get_async.
+
+        Args:
+            archive_id: The archive ID of the original image, e.g. its bra_arkiv_id.
+            size (str): The derivative size, a key of DERIVATIVE_SIZES.
+
+        Returns:
+            str: The path of the cached derivative.
+
+        Raises:
+            ValueError: If the archive ID or the size is not valid.
+            ImageNotFoundError: If the archive has no image with the ID.
+            RuntimeError: If Pillow is not installed.
+            OSError: If the original cannot be decoded.
+        """
+        key = derivative_key(archive_id, size)
+
+        def render(path):
+            if Image is None:
+                raise RuntimeError('Pillow is required to generate image derivatives')
+            source = self.archive.path(archive_id)
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                self._process_pool().submit(
+                    render_derivative, source, path, DERIVATIVE_SIZES[size], JPEG_QUALITY[size]
+                ).result()
+                outcome = 'ok'
+            finally:
+                IMAGE_DERIVATIVE_DURATION.labels(size, outcome).observe(
+                    time.perf_counter() - start
+                )
+
+        return self.cache.get_or_fetch(key, render)
+
+    async def get_async(self, archive_id, size):
+        """Returns the path of a derivative without blocking the event loop, see get."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._thread_pool(), self.get, archive_id, size)
+
+    def prefetch(self, archive_ids, size='thumbnail'):
+        """Queues the rendering of the derivatives which are not cached yet.
+
+        Failures are logged, as nobody waits for a prefetch, and the derivative is not
+        queued again for failure_ttl seconds, so opening an inquiry with missing
+        originals does not retry and log them every time.
+
+        Args:
+            archive_ids (iterable): The archive IDs of the original images.
+            size (str, optional): The derivative size. Defaults to 'thumbnail'.
+
+        Returns:
+            int: The number of queued derivatives.
+        """
+        queued = 0
+        now = time.monotonic()
+        for archive_id in dict.fromkeys(archive_ids):
+            try:
+                key = derivative_key(archive_id, size)
+            except ValueError as e:
+                logger.warning('Not prefetching image: %s', e)
+                continue
+            if os.path.exists(self.cache.path(key)) or self._failures.get(key, 0.0) > now:
+                continue
+            future = self._thread_pool().submit(self.get, archive_id, size)
+            future.add_done_callback(partial(self._prefetched, key))
+            queued += 1
+        return queued
+
+    def _prefetched(self, key, future):
+        """Logs the error of a failed prefetch and remembers it for failure_ttl seconds."""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            return
+        self._failures.set(key, time.monotonic() + self.failure_ttl)
+        if isinstance(error, ImageNotFoundError):
+            logger.info('Not prefetching image: %s', error)
+        else:
+            logger.error('Failed to prefetch image derivative: %s', error)
+
+    def shutdown(self):
+        """Cancels queued derivatives and stops the worker processes.
+
+        The pools are started again when the next derivative is requested.
+        """
+        with self._lock:
+            executors, self._executor, self._pool = (self._executor, self._pool), None, None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+
+image_derivatives = ImageDerivatives(
+    DirectoryArchive(os.getenv('IMAGE_ARCHIVE_DIR', 'images_archive')),
+    FileCache(
+        os.getenv('IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'image_cache')),
+        int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(1024 * 1024 * 1024))),
+        DERIVATIVE_EXTENSION,
+    ),
+    processes=int(os.getenv('IMAGE_PROCESSES', '0')) or None,
+    threads=int(os.getenv('IMAGE_THREADS', '8')),
+    failure_ttl=float(os.getenv('IMAGE_PREFETCH_FAILURE_TTL_SECONDS', '300')),
+)
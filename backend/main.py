@@ -2,28 +2,85 @@
 This module contains the main code for the backend of the 3D visualization of cable network project.
 """
 
+import asyncio
 import json
 import logging
 import os
 import sys
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
 
-from database import get_db, get_db_public, ledningsmaaling_innmaaling_punkt
-from fastapi import Depends, FastAPI, HTTPException
+from common.cache import response_cache
+from common.http_cache import conditional_responder
+from common.metrics import SERIALIZE_DURATION, MetricsMiddleware, TimedJSONResponse, timed
+from common.packed_geometry import MEDIA_TYPE as PACKED_GEOMETRY
+from common.packed_geometry import encode as encode_packed_geometry
+from common.packed_geometry import negotiate as negotiate_packed_geometry
+from common.projection import transform_point, transform_points
+from common.serialization import dumps, splice_object
+from common.simplify import LOD_TOLERANCES
+from database import (
+    DATABASE_URL,
+    SCHEMA,
+    connect_async,
+    dispose_engines,
+    engine,
+    get_async_db,
+    get_async_db_public,
+    get_db_public,
+    get_pool_stats,
+    ledningsmaaling_innmaaling_punkt,
+    run_query,
+)
+from edit_events import (
+    EditEventBroker,
+    point_edit,
+    publish_point_edits,
+    publish_views_refreshed,
+)
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
+from images.archive import ImageNotFoundError
+from images.derivatives import (
+    DERIVATIVE_CACHE_CONTROL,
+    DERIVATIVE_MEDIA_TYPE,
+    DERIVATIVE_SIZES,
+    image_derivatives,
+)
 from models.geojson_models import CoordinateUpdate
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from queries import (
     fetch_geotiff,
     process_geotiff,
     query_boundary_geometry_by_inquiry,
+    query_boundary_geometry_json_by_inquiry,
+    query_geometry_by_bbox,
+    query_image_manifests,
     query_images_by_inquiry_id,
     query_inquiries,
+    query_inquiries_by_points,
     query_measurement_geometry_by_inquiry,
+    query_measurement_geometry_json_by_inquiry,
+    query_measurement_geometry_lod_by_inquiry,
     query_points_of_cables_by_inquiry,
-    query_update_views,
+    query_points_of_cables_json_by_inquiry,
+    query_points_of_cables_lod_by_inquiry,
+    query_tile_job,
     query_working_area_geometry_by_inquiry,
+    query_working_area_geometry_json_by_inquiry,
+    stream_inquiries,
+)
+from sql.procedures.update_template import (
+    generate_batch_update_params,
+    generate_batch_update_sql,
 )
-from sqlalchemy import func, select, update
+from scene import SCENE_PARTS, parse_scene_parts, query_scene_by_inquiry
+from sqlalchemy import func, select, text, update
 from sqlalchemy.orm import Session
+from terrain.client import download_executor
+from terrain.jobs import tile_jobs
+from view_refresh import ViewRefreshScheduler
 
 # Add the project root directory to the system path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -36,9 +93,59 @@ logging.basicConfig(
     handlers=[logging.FileHandler('app.log'), logging.StreamHandler()],
 )
 logger = logging.getLogger(__name__)
+# SQL statements are logged at INFO, so they are only written with SQL_LOG_LEVEL=INFO
+logging.getLogger('sqlalchemy.engine').setLevel(os.getenv('SQL_LOG_LEVEL', 'WARNING'))
+
+
+def evict_refreshed_inquiries(inquiry_ids):
+    """Evicts the cached responses of inquiries whose views were refreshed in every worker.
+
+    Args:
+        inquiry_ids (set): The IDs of the inquiries.
+    """
+    # Evicted here too, in case the notification is not delivered to this worker
+    response_cache.evict_inquiries(inquiry_ids)
+    publish_views_refreshed(engine, inquiry_ids)
+
+
+# Refreshes the materialized views after edits, outside of the request
+view_refresh = ViewRefreshScheduler(
+    engine,
+    SCHEMA,
+    debounce_seconds=float(os.getenv('VIEW_REFRESH_DEBOUNCE_SECONDS', '2')),
+    max_delay_seconds=float(os.getenv('VIEW_REFRESH_MAX_DELAY_SECONDS', '30')),
+    on_refreshed=evict_refreshed_inquiries,
+)
+
+# Broadcasts point edits of any worker to the viewers of their inquiries
+edit_events = EditEventBroker(
+    DATABASE_URL,
+    queue_size=int(os.getenv('EDIT_EVENTS_QUEUE_SIZE', '256')),
+    on_refreshed=response_cache.evict_inquiries,
+    on_reconnected=response_cache.clear,
+)
+
+# Maximum time between two messages of an event stream
+EDIT_EVENTS_KEEPALIVE_SECONDS = float(os.getenv('EDIT_EVENTS_KEEPALIVE_SECONDS', '15'))
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    """Starts and stops the background services of the application."""
+    view_refresh.start()
+    # Listens from the start, so the cache is evicted of views refreshed by other workers
+    edit_events.start()
+    yield
+    view_refresh.stop()
+    await edit_events.stop()
+    download_executor.shutdown(wait=False, cancel_futures=True)
+    tile_jobs.shutdown()
+    image_derivatives.shutdown()
+    await dispose_engines()
+
 
 # FastAPI instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=TimedJSONResponse)
 
 # CORS configuration
 origins = ['http://localhost:4200']
@@ -48,10 +155,95 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=['X-Next-Cursor', 'Server-Timing', 'ETag'],
 )
+# Outermost, so the latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
 
 DEBUG = False
 
+# Maximum number of features of a page of /geometries/bbox
+BBOX_MAX_FEATURES = int(os.getenv('BBOX_MAX_FEATURES', '2000'))
+
+# Maximum number of inquiries of a request to /images/inquiries
+IMAGE_MANIFEST_MAX_INQUIRIES = int(os.getenv('IMAGE_MANIFEST_MAX_INQUIRIES', '500'))
+
+# Parts /geometries/bbox can include
+BBOX_PARTS = ('working_areas', 'measurements')
+
+# Send the GeoJSON built by the database without decoding it in Python
+JSON_PASSTHROUGH = os.getenv('JSON_PASSTHROUGH', 'true').lower() in ('1', 'true', 'yes')
+
+# Columns of the VALUES list used by the batch coordinate update
+BATCH_UPDATE_COLUMNS = {
+    'id': 'integer',
+    'hoyde': 'double precision',
+    'metadata': 'json',
+    'lon': 'double precision',
+    'lat': 'double precision',
+}
+BATCH_UPDATE_SET_EXPRESSIONS = {
+    'hoyde': 'v.hoyde',
+    'metadata': 'v.metadata',
+    'geom': 'public.ST_SetSRID(public.ST_MakePoint(v.lon, v.lat), 4326)',
+}
+# Keeps every statement well below the limit of 65535 bind parameters
+BATCH_UPDATE_CHUNK_SIZE = 1000
+
+
+async def geometry_response(
+    request, connection, inquiry_id, accept, query, json_query=None, **kwargs
+):
+    """Returns the rows of a geometry endpoint in the format asked for by the client.
+
+    Clients listing application/x-packed-geometry in the Accept header get the packed
+    binary encoding of common.packed_geometry, others get JSON. With JSON_PASSTHROUGH
+    the JSON is encoded by the database and sent without being decoded. The response
+    is tagged by the digest of its body, which every API worker computes alike from the
+    same data, so unchanged geometry is answered with a 304 or from the compressed body
+    cache by any of them.
+
+    Args:
+        request (Request): The request.
+        connection (AsyncConnection): The async database connection.
+        inquiry_id (int): The ID of the inquiry.
+        accept (str): The Accept header of the request, or None.
+        query (callable): The query function returning the rows, with GeoJSON under
+            the key geojson.
+        json_query (callable, optional): The query function returning the same rows as
+            JSON. Defaults to None, encoding the rows in Python.
+        **kwargs: The keyword arguments passed to the query function.
+
+    Returns:
+        Response: The encoded rows.
+    """
+    headers = {'Vary': 'Accept'}
+    coordinates = negotiate_packed_geometry(accept)
+    passthrough = coordinates is None and JSON_PASSTHROUGH and json_query is not None
+
+    async def render():
+        if passthrough:
+            body = await run_query(connection, json_query, inquiry_id)
+            return TimedJSONResponse(body, headers=headers)
+
+        result = await run_query(connection, query, inquiry_id, **kwargs)
+        if coordinates is not None:
+            try:
+                with timed(SERIALIZE_DURATION, 'serialize'):
+                    body = encode_packed_geometry(result, coordinates=coordinates)
+                return Response(body, media_type=PACKED_GEOMETRY, headers=headers)
+            except ValueError as e:
+                logger.warning('Sending geometry as JSON, as it cannot be packed: %s', e)
+        return TimedJSONResponse(result, headers=headers)
+
+    return await conditional_responder.respond(
+        request,
+        None,
+        render,
+        variant=(coordinates, passthrough),
+        vary=('Accept',),
+    )
+
 
 @app.get('/')
 def read_root():
@@ -65,103 +257,366 @@ def read_root():
 
 # * GET Requests
 @app.get('/inquiries')
-def get_inquiries(connection=Depends(get_db)):
-    """Endpoint which returns all inquiries with registered measurements.
+async def get_inquiries(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[int] = None,
+    status: Optional[int] = None,
+    municipality: Optional[str] = None,
+    organization: Optional[str] = None,
+    connection=Depends(get_async_db),
+):
+    """Endpoint which returns inquiries with registered measurements, newest first.
+
+    Without a limit all inquiries are returned. With a limit the response holds at most
+    that many inquiries, and the X-Next-Cursor header holds the cursor of the next page
+    if there may be more. Inquiries are written by the source system, so responses are
+    tagged by the digest of their body for conditional requests, and queried every time.
+
+    Args:
+        limit (int, optional): The maximum number of inquiries in the page.
+        cursor (int, optional): The X-Next-Cursor header of the previous page.
+        status (int, optional): Only return inquiries with this status code.
+        municipality (str, optional): Only return inquiries in this municipality.
+        organization (str, optional): Only return inquiries of this organization.
 
     Returns:
         list: Array containing JSON objects with the details
         of all inquiries with registered measurements.
     """
-    result = query_inquiries(connection)
-    return result
+
+    async def render():
+        result = await run_query(
+            connection,
+            query_inquiries,
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            municipality=municipality,
+            organization=organization,
+        )
+
+        headers = {}
+        inquiry_ids = {row['inquiry_id'] for row in result}
+        if limit is not None and len(inquiry_ids) == limit:
+            headers['X-Next-Cursor'] = str(min(inquiry_ids))
+        return TimedJSONResponse(result, headers=headers)
+
+    return await conditional_responder.respond(request, None, render)
+
+
+@app.get('/inquiries/stream')
+async def stream_inquiries_endpoint(
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[int] = None,
+    status: Optional[int] = None,
+    municipality: Optional[str] = None,
+    organization: Optional[str] = None,
+):
+    """Endpoint which streams inquiries as newline delimited JSON, newest first.
+
+    Rows are written as they are read from a server-side cursor, so the response starts
+    before the whole list is fetched. Takes the same filters as /inquiries.
+
+    Returns:
+        StreamingResponse: One JSON object per line with the details of an inquiry.
+    """
+
+    async def rows():
+        async with connect_async() as connection:
+            async for row in stream_inquiries(
+                connection,
+                limit=limit,
+                cursor=cursor,
+                status=status,
+                municipality=municipality,
+                organization=organization,
+            ):
+                yield dumps(row) + b'\n'
+
+    return StreamingResponse(rows(), media_type='application/x-ndjson')
 
 
 @app.get('/geometries/area/boundary/inquiry/{inquiry_id}')
-def get_area_geometry_by_inquiry(inquiry_id: int, connection=Depends(get_db)):
+async def get_area_geometry_by_inquiry(
+    request: Request,
+    inquiry_id: int,
+    connection=Depends(get_async_db),
+    accept: Optional[str] = Header(None),
+):
     """Endpoint for retrieving the boundary geometry by the given inquiry ID.
 
     Args:
         inquiry_id (int): The ID of the inquiry to sort by.
+        accept (str, optional): application/x-packed-geometry for the packed format.
 
     Returns:
         list: Array containing a JSON object with the area geometry for the inquiry.
     """
-    result = query_boundary_geometry_by_inquiry(inquiry_id, connection)
-    return result
+    return await geometry_response(
+        request,
+        connection,
+        inquiry_id,
+        accept,
+        query_boundary_geometry_by_inquiry,
+        query_boundary_geometry_json_by_inquiry,
+    )
 
 
 @app.get('/geometries/area/working_area/inquiry/{inquiry_id}')
-def get_working_area_geometry_by_inquiry(inquiry_id: int, connection=Depends(get_db)):
+async def get_working_area_geometry_by_inquiry(
+    request: Request,
+    inquiry_id: int,
+    connection=Depends(get_async_db),
+    accept: Optional[str] = Header(None),
+):
     """Endpoint for retrieving the working area geometry by the given inquiry ID.
 
     Args:
         inquiry_id (int): The ID of the inquiry to sort by.
+        accept (str, optional): application/x-packed-geometry for the packed format.
 
     Returns:
         list: Array containing a JSON object with the working area geometry for the inquiry.
     """
-    result = query_working_area_geometry_by_inquiry(inquiry_id, connection)
-    return result
+    return await geometry_response(
+        request,
+        connection,
+        inquiry_id,
+        accept,
+        query_working_area_geometry_by_inquiry,
+        query_working_area_geometry_json_by_inquiry,
+    )
 
 
 @app.get('/geometries/measurements/inquiry/{inquiry_id}')
-def get_geometry_by_inquiry(inquiry_id: int, connection=Depends(get_db)):
+async def get_geometry_by_inquiry(
+    request: Request,
+    inquiry_id: int,
+    lod: int = Query(0, ge=0, le=len(LOD_TOLERANCES) - 1),
+    precision: Optional[int] = Query(None, ge=0, le=15),
+    connection=Depends(get_async_db),
+    accept: Optional[str] = Header(None),
+):
     """Endpoint which returns all measurements related to a specified inquiry by its inquiry ID.
 
     Args:
         inquiry_id (int): The ID of the inquiry to filter by.
+        lod (int, optional): The level of detail. Cables are simplified to the tolerance
+            in metres of the level in LOD_TOLERANCES, keeping the heights of the kept
+            points. Defaults to 0, full resolution.
+        precision (int, optional): The number of decimals longitudes and latitudes are
+            rounded to. Defaults to full precision.
+        accept (str, optional): application/x-packed-geometry for the packed format.
 
     Returns:
         list: Array containing a JSON object with the geojson
         for all the geometry related to the inquiry.
     """
-
-    result = query_measurement_geometry_by_inquiry(inquiry_id, connection)
-
-    return result
+    if lod or precision is not None:
+        return await geometry_response(
+            request,
+            connection,
+            inquiry_id,
+            accept,
+            query_measurement_geometry_lod_by_inquiry,
+            lod=lod,
+            precision=precision,
+        )
+    return await geometry_response(
+        request,
+        connection,
+        inquiry_id,
+        accept,
+        query_measurement_geometry_by_inquiry,
+        query_measurement_geometry_json_by_inquiry,
+    )
 
 
 @app.get('/geometries/measurements/cable_points/inquiry/{inquiry_id}')
-def get_measurement_geometry_by_inquiry(inquiry_id: int, connection=Depends(get_db)):
+async def get_measurement_geometry_by_inquiry(
+    request: Request,
+    inquiry_id: int,
+    lod: int = Query(0, ge=0, le=len(LOD_TOLERANCES) - 1),
+    precision: Optional[int] = Query(None, ge=0, le=15),
+    connection=Depends(get_async_db),
+    accept: Optional[str] = Header(None),
+):
     """Endpoint for fetching the points cable measurements are made up of, by the given inquiry ID.
 
     Args:
         inquiry_id (int): The ID of the inquiry to filter by.
+        lod (int, optional): The level of detail. The points of every cable are thinned
+            to at most one per tolerance in metres of the level in LOD_TOLERANCES.
+            Defaults to 0, every point.
+        precision (int, optional): The number of decimals longitudes and latitudes are
+            rounded to. Defaults to full precision.
+        accept (str, optional): application/x-packed-geometry for the packed format.
 
     Returns:
         list: Array of JSON objects containing the geojson
         for each cable measurement as a FeatureCollection.
     """
-    result = query_points_of_cables_by_inquiry(inquiry_id, connection)
-    return result
+    if lod or precision is not None:
+        return await geometry_response(
+            request,
+            connection,
+            inquiry_id,
+            accept,
+            query_points_of_cables_lod_by_inquiry,
+            lod=lod,
+            precision=precision,
+        )
+    return await geometry_response(
+        request,
+        connection,
+        inquiry_id,
+        accept,
+        query_points_of_cables_by_inquiry,
+        query_points_of_cables_json_by_inquiry,
+    )
+
+
+@app.get('/geometries/bbox')
+async def get_geometry_by_bbox(
+    bbox: str,
+    limit: int = Query(500, ge=1, le=BBOX_MAX_FEATURES),
+    cursor: Optional[str] = None,
+    include: str = ','.join(BBOX_PARTS),
+    connection=Depends(get_async_db),
+):
+    """Endpoint for retrieving the geometry of all inquiries intersecting a viewport.
+
+    The features are ordered by inquiry. If the page is full, the X-Next-Cursor header
+    holds the cursor of the next page.
+
+    Args:
+        bbox (str): West, south, east and north edges of the viewport in degrees.
+        limit (int, optional): The maximum number of features in the page.
+        cursor (str, optional): The X-Next-Cursor header of the previous page.
+        include (str, optional): Comma separated parts to include, working_areas and
+            measurements. Defaults to both.
+
+    Returns:
+        list: Array of JSON objects with the inquiry ID, kind (working_area, cable or
+        point), ID and GeoJSON Feature of each feature.
+    """
+    parts = {part.strip() for part in include.split(',') if part.strip()}
+    unknown = sorted(parts.difference(BBOX_PARTS))
+    if unknown or not parts:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Unknown parts: {unknown}. Choose from {list(BBOX_PARTS)}',
+        )
+
+    result, next_cursor = await run_query(
+        connection,
+        query_geometry_by_bbox,
+        bbox,
+        limit=limit,
+        cursor=cursor,
+        include_areas='working_areas' in parts,
+        include_measurements='measurements' in parts,
+    )
+    headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+    return TimedJSONResponse(result, headers=headers)
 
 
 @app.get('/fetch-geotiff')
-def fetch_geotiff_endpoint(bbox: str, width: float, height: float):
-    """Fetch GeoTIFF based on bounding box and dimensions."""
-    return fetch_geotiff(bbox, width, height, logger)
+async def fetch_geotiff_endpoint(bbox: str, width: float, height: float, mosaic: bool = False):
+    """Fetch GeoTIFF based on bounding box and dimensions.
+
+    Areas larger than the WCS limit are downsampled, unless `mosaic` is set, which
+    fetches them at full resolution as a mosaic of several requests.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        download_executor, fetch_geotiff, bbox, width, height, logger, mosaic
+    )
 
 
-@app.get('/process-geotiff')
-async def process_geotiff_endpoint(file_path: str):
-    """Process GeoTIFF to generate terrain tiles."""
-    return await process_geotiff(file_path, logger)
+@app.get('/process-geotiff', status_code=202)
+async def process_geotiff_endpoint(file_path: str, bbox: str = None):
+    """Queue the generation of terrain tiles from a GeoTIFF.
+
+    Args:
+        file_path (str): Path to the GeoTIFF file.
+        bbox (str, optional): West,south,east,north in degrees of a changed area. Only
+            the tiles intersecting it are regenerated.
+
+    Returns:
+        dict: The state of the tiling job, to be polled at
+        /process-geotiff/jobs/{job_id} until its status is done or failed.
+    """
+    result = await process_geotiff(file_path, logger, bbox)
+    result['status_url'] = app.url_path_for('get_tile_job', job_id=result['job_id'])
+    return result
+
+
+@app.get('/process-geotiff/jobs/{job_id}')
+def get_tile_job(job_id: str):
+    """Endpoint for polling the status and progress of a terrain tile job.
+
+    Args:
+        job_id (str): The ID returned by /process-geotiff.
+
+    Returns:
+        dict: The status, stage and progress of the job, and its tileSetUrl once done.
+    """
+    result = query_tile_job(job_id)
+    result['status_url'] = app.url_path_for('get_tile_job', job_id=job_id)
+    return result
+
+
+def with_image_urls(images, prefetch=True):
+    """Adds the URLs of the derivatives of every image and prefetches the thumbnails.
+
+    Args:
+        images (list): The images of an inquiry, with their bra_arkiv_id.
+        prefetch (bool, optional): Queue the thumbnails which are not cached yet.
+            Defaults to True.
+
+    Returns:
+        list: The images, each with a thumbnail_url and a preview_url.
+    """
+    if prefetch:
+        image_derivatives.prefetch(
+            image['bra_arkiv_id'] for image in images if image.get('bra_arkiv_id') is not None
+        )
+    return [
+        {
+            **image,
+            **{
+                f'{size}_url': app.url_path_for(
+                    'get_image_derivative', archive_id=str(image['bra_arkiv_id']), size=size
+                )
+                for size in DERIVATIVE_SIZES
+            },
+        }
+        if image.get('bra_arkiv_id') is not None
+        else image
+        for image in images
+    ]
 
 
 @app.get('/images/inquiry/{inquiry_id}')
-def get_images_by_inquiry(inquiry_id: int, connection=Depends(get_db_public)):
+async def get_images_by_inquiry(inquiry_id: int, connection=Depends(get_async_db_public)):
     """Endpoint for retrieving images by the given inquiry ID.
 
+    The thumbnails of the images are generated in the background, so they are cached
+    by the time the viewer requests them.
+
     Args:
         inquiry_id (int): The ID of the inquiry to filter by.
 
     Returns:
-        list: Array containing a JSON object with image details for the inquiry.
+        list: Array containing a JSON object with image details for the inquiry, and
+        the URLs of its thumbnail and preview.
     """
     try:
-        result = query_images_by_inquiry_id(inquiry_id, logger, connection)
+        result = await run_query(connection, query_images_by_inquiry_id, inquiry_id, logger)
         logger.info('API call to fetch images for inquiry %s', inquiry_id)  # Log API call
-        return result
+        return TimedJSONResponse(with_image_urls(result))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -169,6 +624,181 @@ def get_images_by_inquiry(inquiry_id: int, connection=Depends(get_db_public)):
         raise HTTPException(status_code=500, detail='Internal Server Error') from e
 
 
+@app.get('/images/inquiries')
+async def get_image_manifests(ids: str, connection=Depends(get_async_db_public)):
+    """Endpoint for retrieving the images of many inquiries in one request.
+
+    The inquiries which are not cached are fetched with a single query, and their
+    manifests are cached per inquiry.
+
+    Args:
+        ids (str): Comma separated IDs of the inquiries.
+
+    Returns:
+        list: Per inquiry, in the requested order, a JSON object with its inquiry_id and
+        its images as returned by /images/inquiry/{inquiry_id}.
+    """
+    try:
+        inquiry_ids = list(dict.fromkeys(int(value) for value in ids.split(',') if value.strip()))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f'Invalid inquiry IDs: {ids}') from e
+    if not inquiry_ids or len(inquiry_ids) > IMAGE_MANIFEST_MAX_INQUIRIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Give between 1 and {IMAGE_MANIFEST_MAX_INQUIRIES} inquiry IDs',
+        )
+
+    try:
+        manifests = await run_query(connection, query_image_manifests, inquiry_ids)
+    except Exception as e:
+        logger.error('Unexpected error fetching image manifests: %s', e)
+        raise HTTPException(status_code=500, detail='Internal Server Error') from e
+    logger.info('API call to fetch images for %d inquiries', len(inquiry_ids))
+    return TimedJSONResponse(
+        [
+            {
+                'inquiry_id': inquiry_id,
+                'images': with_image_urls(manifests[inquiry_id], prefetch=False),
+            }
+            for inquiry_id in inquiry_ids
+        ]
+    )
+
+
+@app.get('/images/archive/{archive_id}/{size}')
+async def get_image_derivative(archive_id: str, size: str):
+    """Endpoint for retrieving a thumbnail or preview of an archive image.
+
+    Derivatives are generated on first request and cached on disk. They never change
+    for an archive ID, so they are sent with a long-lived Cache-Control header.
+
+    Args:
+        archive_id (str): The bra_arkiv_id of the image.
+        size (str): thumbnail, at most 256 pixels wide and high, or preview, at most
+            1600 pixels.
+
+    Returns:
+        FileResponse: The JPEG.
+    """
+    try:
+        path = await image_derivatives.get_async(archive_id, size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except ImageNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except RuntimeError as e:
+        logger.error('Cannot generate image derivatives: %s', e)
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except OSError as e:
+        logger.error('Failed to generate %s of image %s: %s', size, archive_id, e)
+        raise HTTPException(status_code=500, detail='Failed to generate image') from e
+    return FileResponse(
+        path,
+        media_type=DERIVATIVE_MEDIA_TYPE,
+        headers={'Cache-Control': DERIVATIVE_CACHE_CONTROL},
+    )
+
+
+@app.get('/scene/inquiry/{inquiry_id}')
+async def get_scene_by_inquiry(inquiry_id: int, include: str = ','.join(SCENE_PARTS)):
+    """Endpoint for retrieving everything needed to render the scene of an inquiry at once.
+
+    The parts are queried concurrently on separate pooled connections.
+
+    Args:
+        inquiry_id (int): The ID of the inquiry.
+        include (str, optional): Comma separated parts to include, any of boundary,
+            working_area, measurements, cable_points and images. Defaults to all.
+
+    Returns:
+        dict: The response of the corresponding endpoint for every included part.
+    """
+    try:
+        parts = parse_scene_parts(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    try:
+        result = await query_scene_by_inquiry(inquiry_id, parts, logger, JSON_PASSTHROUGH)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error('Unexpected error fetching scene for inquiry %s: %s', inquiry_id, e)
+        raise HTTPException(status_code=500, detail='Internal Server Error') from e
+    if 'images' in result:
+        result['images'] = with_image_urls(result['images'])
+    result['inquiry_id'] = inquiry_id
+    # Geometry encoded by the database is spliced into the body as it is
+    with timed(SERIALIZE_DURATION, 'serialize'):
+        body = splice_object(result)
+    return TimedJSONResponse(body)
+
+
+@app.get('/metrics')
+def get_metrics():
+    """Endpoint exposing the metrics of the backend in the Prometheus text format.
+
+    Returns:
+        Response: Request latencies, SQL execution times, row and byte counts,
+        connection pool waits and terrain durations.
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get('/cache/stats')
+def get_cache_stats():
+    """Endpoint for retrieving the counters of the geometry response cache.
+
+    Returns:
+        dict: Hits, misses, evictions and occupancy of the cache.
+    """
+    return response_cache.stats()
+
+
+@app.get('/db/pool/stats')
+def get_db_pool_stats():
+    """Endpoint for monitoring the database connection pools.
+
+    Returns:
+        list: Array containing a JSON object per pool with its size, checked out
+        connections, overflow and the average and maximum checkout wait.
+    """
+    return get_pool_stats()
+
+
+@app.get('/views/status')
+def get_view_status():
+    """Endpoint for retrieving the staleness of the materialized views.
+
+    Returns:
+        list: Array containing a JSON object per materialized view with whether it is
+        stale, since when, and when it was last refreshed.
+    """
+    return view_refresh.status()
+
+
+@app.get('/events/inquiry/{inquiry_id}')
+async def stream_point_edits(inquiry_id: int):
+    """Endpoint for following the edits of the points of an inquiry as server-sent events.
+
+    Every 'points' event carries the inquiry_id and a list of points with their id, new
+    lat, lon and height, and UTM x and y, as soon as an edit by any worker is committed.
+    A 'resync' event means edits may have been missed, and the inquiry should be
+    refetched.
+
+    Args:
+        inquiry_id (int): The ID of the inquiry.
+
+    Returns:
+        StreamingResponse: The text/event-stream of the edits.
+    """
+    return StreamingResponse(
+        edit_events.stream(inquiry_id, EDIT_EVENTS_KEEPALIVE_SECONDS),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 @app.put('/update-coordinates/{edited_point_id}')
 def update_coordinates(
     edited_point_id: int,
@@ -221,13 +851,8 @@ def update_coordinates(
             func.ST_MakePoint(coordinate_update.lon, coordinate_update.lat), 4326
         )
 
-        # Extract x and y from new_geom
-        x_expr = func.ST_X(func.ST_Transform(new_geom, 32633))  # Transform to UTM Zone 33
-        y_expr = func.ST_Y(func.ST_Transform(new_geom, 32633))  # Transform to UTM Zone 33
-
-        # Execute the expressions to get actual values
-        x = db.execute(x_expr).scalar()
-        y = db.execute(y_expr).scalar()
+        # Transform the new coordinates to UTM Zone 33
+        x, y = transform_point(coordinate_update.lon, coordinate_update.lat)
 
         # Update the metadata with x and y values
         metadata_dict['x'] = x
@@ -245,12 +870,33 @@ def update_coordinates(
 
         # Execute the update statement
         result = db.execute(stmt)
-        query_update_views(db)
-        db.commit()
-
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail='Item not found')
 
+        point_inquiries = query_inquiries_by_points([edited_point_id], db)
+        affected_inquiries = point_inquiries.get(edited_point_id, [])
+
+        # Viewers of the inquiries are notified when the edit is committed
+        publish_point_edits(
+            db,
+            point_inquiries,
+            [
+                point_edit(
+                    edited_point_id,
+                    coordinate_update.lat,
+                    coordinate_update.lon,
+                    coordinate_update.hoyde,
+                    x,
+                    y,
+                )
+            ],
+        )
+        db.commit()
+
+        # Refresh the views built from the points in the background. Cached geometry of
+        # the inquiries owning the point is evicted once the refresh makes the edit visible
+        view_refresh.request_refresh(['ledningsmaaling_innmaaling_punkt'], affected_inquiries)
+
         return {
             'message': 'Height, coordinates, and metadata updated successfully',
             'id': edited_point_id,
@@ -267,3 +913,141 @@ def update_coordinates(
         raise HTTPException(
             status_code=500, detail='An error occurred while updating the metadata'
         ) from e
+
+
+@app.put('/update-coordinates')
+def update_coordinates_batch(
+    coordinate_updates: Dict[int, CoordinateUpdate],
+    db: Session = Depends(get_db_public),
+):
+    """
+    Update the height, coordinates (lat, lon), and metadata of many points in one transaction.
+
+    Args:
+        coordinate_updates (Dict[int, CoordinateUpdate]): The new values keyed by point ID.
+
+    Raises:
+        HTTPException: If no updates are given, or the update fails.
+
+    Returns:
+        dict: A dictionary containing a summary message and the result of every point,
+            with status 'updated' or 'not_found'.
+    """
+    if not coordinate_updates:
+        raise HTTPException(status_code=400, detail='No coordinate updates given')
+
+    point_ids = list(coordinate_updates)
+    try:
+        # Fetch the current metadata of all points at once
+        stmt = select(
+            ledningsmaaling_innmaaling_punkt.c.id, ledningsmaaling_innmaaling_punkt.c.metadata
+        ).where(ledningsmaaling_innmaaling_punkt.c.id.in_(point_ids))
+        current_metadata = dict(db.execute(stmt).fetchall())
+        found_ids = [point_id for point_id in point_ids if point_id in current_metadata]
+
+        # Transform the new coordinates of all points to UTM Zone 33 in one call
+        xs, ys = transform_points(
+            [coordinate_updates[point_id].lon for point_id in found_ids],
+            [coordinate_updates[point_id].lat for point_id in found_ids],
+        )
+
+        rows = []
+        edits = []
+        for point_id, x, y in zip(found_ids, xs, ys):
+            coordinate_update = coordinate_updates[point_id]
+            metadata = current_metadata[point_id]
+            if isinstance(metadata, dict):
+                metadata_dict = metadata
+            else:
+                metadata_dict = json.loads(metadata) if metadata else {}
+
+            metadata_dict['height'] = coordinate_update.hoyde
+            metadata_dict['lat'] = coordinate_update.lat
+            metadata_dict['lon'] = coordinate_update.lon
+            metadata_dict['edited'] = True
+            metadata_dict['x'] = float(x)
+            metadata_dict['y'] = float(y)
+
+            rows.append(
+                {
+                    'id': point_id,
+                    'hoyde': coordinate_update.hoyde,
+                    'metadata': json.dumps(metadata_dict),
+                    'lon': coordinate_update.lon,
+                    'lat': coordinate_update.lat,
+                }
+            )
+            edits.append(
+                point_edit(
+                    point_id,
+                    coordinate_update.lat,
+                    coordinate_update.lon,
+                    coordinate_update.hoyde,
+                    x,
+                    y,
+                )
+            )
+
+        updated_ids = set()
+        for start in range(0, len(rows), BATCH_UPDATE_CHUNK_SIZE):
+            chunk = rows[start : start + BATCH_UPDATE_CHUNK_SIZE]
+            stmt = generate_batch_update_sql(
+                'ledningsmaaling_innmaaling_punkt',
+                'id',
+                BATCH_UPDATE_COLUMNS,
+                len(chunk),
+                set_expressions=BATCH_UPDATE_SET_EXPRESSIONS,
+            )
+            result = db.execute(
+                text(stmt), generate_batch_update_params(chunk, BATCH_UPDATE_COLUMNS)
+            )
+            updated_ids.update(row[0] for row in result)
+
+        affected_inquiries = []
+        if updated_ids:
+            point_inquiries = query_inquiries_by_points(updated_ids, db)
+            affected_inquiries = list(
+                {
+                    inquiry_id
+                    for inquiry_ids in point_inquiries.values()
+                    for inquiry_id in inquiry_ids
+                }
+            )
+            # One notification per inquiry and chunk, delivered when the batch is committed
+            publish_point_edits(
+                db,
+                point_inquiries,
+                [edit for edit in edits if edit['id'] in updated_ids],
+            )
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500, detail='An error occurred while updating the metadata'
+        ) from e
+
+    # A single background refresh covers every point of the batch
+    if updated_ids:
+        view_refresh.request_refresh(['ledningsmaaling_innmaaling_punkt'], affected_inquiries)
+
+    results = []
+    for point_id in point_ids:
+        coordinate_update = coordinate_updates[point_id]
+        if point_id in updated_ids:
+            results.append(
+                {
+                    'id': point_id,
+                    'status': 'updated',
+                    'new_height': coordinate_update.hoyde,
+                    'new_lat': coordinate_update.lat,
+                    'new_lon': coordinate_update.lon,
+                }
+            )
+        else:
+            results.append({'id': point_id, 'status': 'not_found'})
+
+    return {
+        'message': f'Updated {len(updated_ids)} of {len(point_ids)} points',
+        'results': results,
+    }
@@ -0,0 +1,251 @@
+"""
+This module provides lightweight, read-only GeoJSON feature collections for large
+amounts of geometry.
+
+The pydantic models in geojson_models validate small inputs such as CoordinateUpdate.
+Holding a collection of many features in them costs a model object and a list of
+float objects per coordinate. A CompactFeatureCollection instead keeps the coordinates
+of all features in one float64 array and their nesting in offset arrays, laid out as in
+the packed geometry format, and builds GeoJSON only when it is asked for.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Imports the root directory to the path in order to import project modules
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+# pylint: disable=wrong-import-position
+from common.packed_geometry import (  # noqa: E402
+    GEOMETRY_NAMES,
+    TWO_DIMENSIONAL,
+    nest_geometry,
+    pack_features,
+)
+from common.serialization import dumps  # noqa: E402
+
+
+class CompactFeature:
+    """
+    Represents a feature of a CompactFeatureCollection, as a view into its arrays.
+    """
+
+    __slots__ = ("collection", "index")
+
+    def __init__(self, collection, index):
+        self.collection = collection
+        self.index = index
+
+    @property
+    def geometry_type(self):
+        """str: The GeoJSON geometry type, or None for a feature without geometry."""
+        return GEOMETRY_NAMES[int(self.collection.types[self.index]) & ~TWO_DIMENSIONAL]
+
+    @property
+    def coordinates(self):
+        """ndarray: The coordinates of the feature, a view of shape (n, dimensions)."""
+        collection = self.collection
+        geometries = collection.geometry_offsets[self.index : self.index + 2]
+        start, end = collection.coordinate_offsets[
+            collection.part_offsets[geometries]
+        ].tolist()
+        width = 2 if collection.types[self.index] & TWO_DIMENSIONAL else None
+        return collection.coordinates[start:end, :width]
+
+    @property
+    def properties(self):
+        """dict: The properties of the feature, or None."""
+        return self.collection.properties[self.index]
+
+    @property
+    def __geo_interface__(self):
+        return self.collection.feature_geo_interface(self.index)
+
+
+class CompactFeatureCollection:
+    """
+    Represents a collection of GeoJSON features with their coordinates in one array.
+
+    Args:
+        types (ndarray): uint8 geometry type code of every feature, see GEOMETRY_TYPES
+            in common.packed_geometry.
+        geometry_offsets (ndarray): uint32 end of the geometries of every feature,
+            after a leading 0.
+        part_offsets (ndarray): uint32 end of the parts of every geometry.
+        coordinate_offsets (ndarray): uint32 end of the coordinates of every part.
+        coordinates (ndarray): float64 array of shape (coordinates, dimensions), NaN
+            where a value is missing.
+        properties (list): The properties of every feature, a dictionary or None.
+    """
+
+    __slots__ = (
+        "types",
+        "geometry_offsets",
+        "part_offsets",
+        "coordinate_offsets",
+        "coordinates",
+        "properties",
+    )
+
+    def __init__(
+        self, types, geometry_offsets, part_offsets, coordinate_offsets, coordinates, properties
+    ):
+        self.types = types
+        self.geometry_offsets = geometry_offsets
+        self.part_offsets = part_offsets
+        self.coordinate_offsets = coordinate_offsets
+        self.coordinates = coordinates
+        self.properties = properties
+
+    @classmethod
+    def from_geojson(cls, collection):
+        """Builds a collection from a GeoJSON FeatureCollection.
+
+        Args:
+            collection (dict): The FeatureCollection, or a list of features.
+
+        Returns:
+            CompactFeatureCollection: The collection.
+
+        Raises:
+            ValueError: If a geometry type is not supported, e.g. GeometryCollection.
+        """
+        features = collection if isinstance(collection, list) else collection["features"]
+        types, geometry_offsets, part_offsets, coordinate_offsets, coordinates, properties = (
+            pack_features(features)
+        )
+        return cls(
+            np.asarray(types, dtype=np.uint8),
+            np.asarray(geometry_offsets, dtype=np.uint32),
+            np.asarray(part_offsets, dtype=np.uint32),
+            np.asarray(coordinate_offsets, dtype=np.uint32),
+            coordinates,
+            properties,
+        )
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError("feature index out of range")
+        return CompactFeature(self, index % len(self))
+
+    def __iter__(self):
+        return (CompactFeature(self, index) for index in range(len(self)))
+
+    @property
+    def nbytes(self):
+        """int: The size of the arrays in bytes, without the properties."""
+        return sum(
+            array.nbytes
+            for array in (
+                self.types,
+                self.geometry_offsets,
+                self.part_offsets,
+                self.coordinate_offsets,
+                self.coordinates,
+            )
+        )
+
+    @staticmethod
+    def _values(coordinates):
+        """Returns coordinates as nested lists, with None for missing values."""
+        missing = np.isnan(coordinates)
+        if missing.any():
+            coordinates = coordinates.astype(object)
+            coordinates[missing] = None
+        return coordinates.tolist()
+
+    def _nest(self, index, points):
+        """Nests the coordinates of a feature with several parts, e.g. a Polygon.
+
+        Args:
+            index (int): The index of the feature.
+            points (list): The coordinates of the feature as nested lists.
+        """
+        geometries = self.geometry_offsets[index : index + 2].tolist()
+        parts = self.part_offsets[geometries[0] : geometries[1] + 1]
+        coordinates = self.coordinate_offsets[parts[0] : parts[-1] + 1]
+        coordinates = (coordinates - coordinates[0]).tolist()
+        parts = (parts - parts[0]).tolist()
+        return [
+            [
+                points[coordinates[part] : coordinates[part + 1]]
+                for part in range(parts[single], parts[single + 1])
+            ]
+            for single in range(len(parts) - 1)
+        ]
+
+    def _features(self, start, end, values):
+        """Builds the GeoJSON of the features from start to end.
+
+        Args:
+            start (int): The index of the first feature.
+            end (int): The index after the last feature.
+            values (list): The coordinates of the features as nested lists, from the
+                first coordinate of the first feature, with None for missing values.
+        """
+        # The offset of the first coordinate of every feature and the end of the last
+        bounds = self.coordinate_offsets[
+            self.part_offsets[self.geometry_offsets[start : end + 1]]
+        ]
+        bounds = (bounds - bounds[0]).tolist() if len(bounds) else bounds
+        trim = self.coordinates.shape[1] > 2
+
+        features = []
+        for index, code in enumerate(self.types[start:end].tolist()):
+            geometry_type = GEOMETRY_NAMES[code & ~TWO_DIMENSIONAL]
+            geometry = None
+            if geometry_type is not None:
+                points = values[bounds[index] : bounds[index + 1]]
+                if trim and code & TWO_DIMENSIONAL:
+                    points = [point[:2] for point in points]
+                if geometry_type == "Point":
+                    coordinates = points[0]
+                elif geometry_type in ("LineString", "MultiPoint"):
+                    coordinates = points
+                else:
+                    coordinates = nest_geometry(
+                        geometry_type, self._nest(start + index, points)
+                    )
+                geometry = {"type": geometry_type, "coordinates": coordinates}
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": geometry,
+                    "properties": self.properties[start + index] or {},
+                }
+            )
+        return features
+
+    def feature_geo_interface(self, index):
+        """Builds the GeoJSON of one feature.
+
+        Args:
+            index (int): The index of the feature.
+
+        Returns:
+            dict: The Feature.
+        """
+        geometries = self.geometry_offsets[index : index + 2]
+        start, end = self.coordinate_offsets[self.part_offsets[geometries]].tolist()
+        return self._features(index, index + 1, self._values(self.coordinates[start:end]))[0]
+
+    @property
+    def __geo_interface__(self):
+        return {
+            "type": "FeatureCollection",
+            "features": self._features(0, len(self), self._values(self.coordinates)),
+        }
+
+    def to_json(self):
+        """Encodes the collection as a GeoJSON FeatureCollection.
+
+        Returns:
+            bytes: The UTF-8 JSON, as common.serialization.dumps encodes it.
+        """
+        return dumps(self.__geo_interface__)
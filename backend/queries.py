@@ -3,46 +3,100 @@ This module contains functions for querying the database.
 """
 
 import os
-import tempfile
+import time
 
-import docker
 import requests
+from common.cache import response_cache
+from common.metrics import TERRAIN_FETCH_DURATION
+from common.simplify import LOD_TOLERANCES, simplify_rows
 from common.status_codes import henvendelse_status_dict
 from fastapi import HTTPException
-from sql_executer import execute_sql
+from sql_executer import execute_json_statement, execute_statement, fetch_dicts, statements
+from terrain.cache import terrain_cache, terrain_key
+from terrain.client import WCSError, wcs_client
+from terrain.jobs import tile_jobs
+from terrain.mosaic import fetch_mosaic, geographic_bounds
 
+# Kept for modules still executing queries by file path
 QUERY_PATH = './sql/queries/'
 
+WCS_URL = os.getenv('WCS_URL', 'https://wcs.geonorge.no/skwms1/wcs.hoyde-dtm-nhm-25833')
+WCS_COVERAGE = 'nhm_dtm_topo_25833'
+WCS_CRS = 'EPSG:25833'
+WCS_MAX_SIZE = 2850
+WCS_MOSAIC_CONCURRENCY = int(os.getenv('TERRAIN_MOSAIC_CONCURRENCY', '4'))
+
+# Images are uploaded by the source system without evicting the cache, so the cached
+# images of an inquiry expire after this many seconds
+IMAGE_LIST_CACHE_TTL = float(os.getenv('IMAGE_LIST_CACHE_TTL_SECONDS', '60'))
+
+
+def _inquiry_params(limit, cursor, status, municipality, organization):
+    """Builds the parameters of the inquiry page statement."""
+    return {
+        'limit': limit,
+        'cursor': cursor,
+        'status': status,
+        'municipality': municipality,
+        'organization': organization,
+    }
+
+
+def _with_status_name(row):
+    """Adds the name of the inquiry status to a row of inquiry attributes."""
+    row['status_name'] = henvendelse_status_dict.get(row['status'], 'Unknown')
+    return row
 
-def query_inquiries(connection):
-    """Query inquiries.
+
+def query_inquiries(
+    connection, limit=None, cursor=None, status=None, municipality=None, organization=None
+):
+    """Query inquiries, newest first.
 
     Args:
         connection: The database connection.
+        limit (int, optional): The maximum number of inquiries. Defaults to all.
+        cursor (int, optional): Only return inquiries with a lower ID, i.e. the last
+            inquiry ID of the previous page. Defaults to None.
+        status (int, optional): Only return inquiries with this status. Defaults to None.
+        municipality (str, optional): Only return inquiries in this municipality.
+            Defaults to None.
+        organization (str, optional): Only return inquiries of this organization.
+            Defaults to None.
 
     Returns:
         list: List of inquiries and their attributes.
     """
-    result = execute_sql(
+    result = execute_statement(
         connection=connection,
-        # TODO Refactor file path system to a more flexible approach
-        main_file_path=f'{QUERY_PATH}/inquiry/fetch_inquiries.sql',
-        placeholders={
-            '/*cable_measurements*/': f'{QUERY_PATH}/inquiry/fetch_number_of_measurements_per_inquiry.sql'
-        },
+        name='inquiry/fetch_inquiries_page',
+        params=_inquiry_params(limit, cursor, status, municipality, organization),
     )
 
-    result = [dict(row) for row in result.mappings()]
+    return [_with_status_name(row) for row in fetch_dicts(result, 'inquiry/fetch_inquiries_page')]
 
-    for row in result:
-        try:
-            row['status_name'] = henvendelse_status_dict[row['status']]
-        except KeyError:
-            row['status_name'] = 'Unknown'
 
-    return result
+async def stream_inquiries(
+    connection, limit=None, cursor=None, status=None, municipality=None, organization=None
+):
+    """Stream inquiries from a server-side cursor, newest first.
+
+    Args:
+        connection (AsyncConnection): The async database connection.
+        limit, cursor, status, municipality, organization: See query_inquiries.
+
+    Yields:
+        dict: The attributes of an inquiry measurement, as returned by query_inquiries.
+    """
+    result = await connection.stream(
+        statements.get('inquiry/fetch_inquiries_page'),
+        _inquiry_params(limit, cursor, status, municipality, organization),
+    )
+    async for row in result.mappings():
+        yield _with_status_name(dict(row))
 
 
+@response_cache.cached('boundary')
 def query_boundary_geometry_by_inquiry(inquiry_id, connection):
     """Query boundary geometry by inquiry.
 
@@ -53,16 +107,34 @@ def query_boundary_geometry_by_inquiry(inquiry_id, connection):
     Returns:
         list: List of boundary geometry related to the inquiry.
     """
-    result = execute_sql(
+    result = execute_statement(
         connection=connection,
-        main_file_path=f'{
-            QUERY_PATH}/geometry/fetch_boundary_geometry_by_inquiry.sql',
+        name='geometry/fetch_boundary_geometry_by_inquiry',
         params={'inquiry_id': inquiry_id},
     )
 
-    return [dict(row) for row in result.mappings()]
+    return fetch_dicts(result, 'geometry/fetch_boundary_geometry_by_inquiry')
 
 
+@response_cache.cached('boundary_json')
+def query_boundary_geometry_json_by_inquiry(inquiry_id, connection):
+    """Query the boundary geometry of an inquiry, encoded as JSON by the database.
+
+    Args:
+        inquiry_id (int): The ID of the inquiry.
+        connection: The database connection.
+
+    Returns:
+        bytes: JSON array of the rows returned by query_boundary_geometry_by_inquiry.
+    """
+    return execute_json_statement(
+        connection=connection,
+        name='geometry/fetch_boundary_geometry_by_inquiry',
+        params={'inquiry_id': inquiry_id},
+    )
+
+
+@response_cache.cached('working_area')
 def query_working_area_geometry_by_inquiry(inquiry_id, connection):
     """Query working area geometry by inquiry.
 
@@ -73,16 +145,34 @@ def query_working_area_geometry_by_inquiry(inquiry_id, connection):
     Returns:
         list: List of working area geometry related to the inquiry.
     """
-    result = execute_sql(
+    result = execute_statement(
         connection=connection,
-        main_file_path=f'{
-            QUERY_PATH}/geometry/fetch_working_area_by_inquiry.sql',
+        name='geometry/fetch_working_area_by_inquiry',
         params={'inquiry_id': inquiry_id},
     )
 
-    return [dict(row) for row in result.mappings()]
+    return fetch_dicts(result, 'geometry/fetch_working_area_by_inquiry')
+
 
+@response_cache.cached('working_area_json')
+def query_working_area_geometry_json_by_inquiry(inquiry_id, connection):
+    """Query the working area geometry of an inquiry, encoded as JSON by the database.
+
+    Args:
+        inquiry_id (int): The ID of the inquiry.
+        connection: The database connection.
 
+    Returns:
+        bytes: JSON array of the rows returned by query_working_area_geometry_by_inquiry.
+    """
+    return execute_json_statement(
+        connection=connection,
+        name='geometry/fetch_working_area_by_inquiry',
+        params={'inquiry_id': inquiry_id},
+    )
+
+
+@response_cache.cached('measurements')
 def query_measurement_geometry_by_inquiry(inquiry_id, connection):
     """Query measurement geometry by inquiry.
 
@@ -93,16 +183,34 @@ def query_measurement_geometry_by_inquiry(inquiry_id, connection):
     Returns:
         list: List of measurement geometry related to the inquiry.
     """
-    result = execute_sql(
+    result = execute_statement(
         connection=connection,
-        main_file_path=f'{
-            QUERY_PATH}/geometry/fetch_measurement_geometry_by_inquiry.sql',
+        name='geometry/fetch_measurement_geometry_by_inquiry',
         params={'inquiry_id': inquiry_id},
     )
 
-    return [dict(row) for row in result.mappings()]
+    return fetch_dicts(result, 'geometry/fetch_measurement_geometry_by_inquiry')
+
+
+@response_cache.cached('measurements_json')
+def query_measurement_geometry_json_by_inquiry(inquiry_id, connection):
+    """Query the measurement geometry of an inquiry, encoded as JSON by the database.
+
+    Args:
+        inquiry_id (int): The ID of the inquiry.
+        connection: The database connection.
+
+    Returns:
+        bytes: JSON array of the rows returned by query_measurement_geometry_by_inquiry.
+    """
+    return execute_json_statement(
+        connection=connection,
+        name='geometry/fetch_measurement_geometry_by_inquiry',
+        params={'inquiry_id': inquiry_id},
+    )
 
 
+@response_cache.cached('cable_points')
 def query_points_of_cables_by_inquiry(inquiry_id, connection):
     """Query the points of cables associated with a specific inquiry.
 
@@ -113,123 +221,322 @@ def query_points_of_cables_by_inquiry(inquiry_id, connection):
     Returns:
         list: List of points of cables.
     """
-    result = execute_sql(
+    result = execute_statement(
         connection=connection,
-        main_file_path=f'{
-            QUERY_PATH}/geometry/fetch_points_of_cables_by_inquiry.sql',
+        name='geometry/fetch_points_of_cables_by_inquiry',
         params={'inquiry_id': inquiry_id},
     )
 
-    return [dict(row) for row in result.mappings()]
+    return fetch_dicts(result, 'geometry/fetch_points_of_cables_by_inquiry')
 
 
-def fetch_geotiff(bbox: str, width: float, height: float, logger) -> dict:
-    """Fetch a GeoTIFF file based on the bounding box and dimensions.
+@response_cache.cached('cable_points_json')
+def query_points_of_cables_json_by_inquiry(inquiry_id, connection):
+    """Query the points of cables of an inquiry, encoded as JSON by the database.
 
     Args:
-        bbox (str): Bounding box coordinates.
-        width (float): Width of the GeoTIFF.
-        height (float): Height of the GeoTIFF.
-        logger (Logger): Logger instance.
+        inquiry_id (int): The ID of the inquiry.
+        connection: The database connection.
 
     Returns:
-        dict: Dictionary containing the file path of the fetched GeoTIFF.
+        bytes: JSON array of the rows returned by query_points_of_cables_by_inquiry.
+    """
+    return execute_json_statement(
+        connection=connection,
+        name='geometry/fetch_points_of_cables_by_inquiry',
+        params={'inquiry_id': inquiry_id},
+    )
+
+
+@response_cache.cached('measurements_lod')
+def query_measurement_geometry_lod_by_inquiry(inquiry_id, connection, lod=0, precision=None):
+    """Query measurement geometry by inquiry at a level of detail.
+
+    The levels are simplified from the cached full resolution geometry and cached
+    themselves, so switching between them does not query the database again.
+
+    Args:
+        inquiry_id (int): The ID of the inquiry.
+        connection: The database connection.
+        lod (int, optional): The level of detail, an index into LOD_TOLERANCES.
+            Defaults to 0, full resolution.
+        precision (int, optional): The number of decimals of longitudes and latitudes.
+            Defaults to None, not rounding.
+
+    Returns:
+        list: List of measurement geometry related to the inquiry, with simplified cables.
+    """
+    rows = query_measurement_geometry_by_inquiry(inquiry_id, connection)
+    return simplify_rows(rows, LOD_TOLERANCES[lod], precision)
+
+
+@response_cache.cached('cable_points_lod')
+def query_points_of_cables_lod_by_inquiry(inquiry_id, connection, lod=0, precision=None):
+    """Query the points of the cables of an inquiry at a level of detail.
+
+    Args:
+        inquiry_id (int): The ID of the inquiry.
+        connection: The database connection.
+        lod (int, optional): The level of detail, an index into LOD_TOLERANCES.
+            Defaults to 0, full resolution.
+        precision (int, optional): The number of decimals of longitudes and latitudes.
+            Defaults to None, not rounding.
+
+    Returns:
+        list: List of points of cables, thinned to at most one per tolerance of the level.
+    """
+    rows = query_points_of_cables_by_inquiry(inquiry_id, connection)
+    return simplify_rows(rows, LOD_TOLERANCES[lod], precision, thin=True)
+
+
+def _parse_bbox_cursor(cursor):
+    """Parses the cursor of a page of /geometries/bbox, as made by query_geometry_by_bbox."""
+    try:
+        inquiry_id, kind, feature_id = (int(value) for value in cursor.split('.'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail='Invalid cursor') from e
+    return {'cursor_inquiry': inquiry_id, 'cursor_kind': kind, 'cursor_id': feature_id}
+
+
+def query_geometry_by_bbox(
+    bbox, connection, limit, cursor=None, include_areas=True, include_measurements=True
+):
+    """Query the working areas and measurements of all inquiries intersecting a viewport.
+
+    Args:
+        bbox (str): West, south, east and north edges of the viewport in degrees.
+        connection: The database connection.
+        limit (int): The maximum number of features.
+        cursor (str, optional): The cursor returned with the previous page. Defaults to
+            None, the first page.
+        include_areas (bool, optional): Include working areas. Defaults to True.
+        include_measurements (bool, optional): Include cables and single point
+            measurements. Defaults to True.
+
+    Returns:
+        tuple: The features, with the inquiry, kind, ID and GeoJSON of each, ordered by
+        inquiry, and the cursor of the next page, or None if this is the last page.
 
     Raises:
-        HTTPException: If the GeoTIFF fetch fails.
+        HTTPException: If the bbox or cursor is invalid.
     """
-    wcs_url = 'https://wcs.geonorge.no/skwms1/wcs.hoyde-dtm-nhm-25833'
+    west, south, east, north = _parse_bbox(bbox)
     params = {
+        'west': west,
+        'south': south,
+        'east': east,
+        'north': north,
+        'include_areas': include_areas,
+        'include_measurements': include_measurements,
+        'limit': limit,
+        'cursor_inquiry': None,
+        'cursor_kind': None,
+        'cursor_id': None,
+    }
+    if cursor:
+        params.update(_parse_bbox_cursor(cursor))
+    result = execute_statement(
+        connection=connection,
+        name='geometry/fetch_geometry_by_bbox',
+        params=params,
+    )
+
+    rows = fetch_dicts(result, 'geometry/fetch_geometry_by_bbox')
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = f'{last["inquiry_id"]}.{last["kind_rank"]}.{last["id"]}'
+    for row in rows:
+        del row['kind_rank']
+    return rows, next_cursor
+
+
+def query_inquiries_by_points(point_ids, connection):
+    """Query the inquiries which own the given points.
+
+    Args:
+        point_ids (list): The IDs of the points.
+        connection: The database connection.
+
+    Returns:
+        dict: IDs of the inquiries every point belongs to, keyed by point ID. Points
+        without an inquiry are left out.
+    """
+    result = execute_statement(
+        connection=connection,
+        name='inquiry/fetch_inquiries_by_points',
+        params={'point_ids': list(point_ids)},
+    )
+
+    point_inquiries = {}
+    for row in result.mappings():
+        point_inquiries.setdefault(row['point_id'], []).append(row['inquiry_id'])
+    return point_inquiries
+
+
+def _coverage_params(bbox: str, width: int, height: int, crs: str = WCS_CRS) -> dict:
+    """Builds the parameters of a GetCoverage request returning WGS84 coordinates."""
+    return {
         'SERVICE': 'WCS',
         'VERSION': '1.0.0',
         'REQUEST': 'GetCoverage',
         'FORMAT': 'GeoTIFF',
-        'COVERAGE': 'nhm_dtm_topo_25833',
+        'COVERAGE': WCS_COVERAGE,
         'BBOX': bbox,
-        'CRS': 'EPSG:25833',
+        'CRS': crs,
         'RESPONSE_CRS': 'EPSG:4326',
-        'WIDTH': min(width, 2850),  # Hardcoded max due to limits on API
-        'HEIGHT': min(height, 2850),  # Hardcoded max due to limits on API
+        'WIDTH': width,
+        'HEIGHT': height,
     }
-    response = requests.get(wcs_url, params=params, timeout=10)
-    if response.status_code == 200:
-        file_path = os.path.join(tempfile.gettempdir(), 'terrain_model.tif')
-        with open(file_path, 'wb') as file:
-            file.write(response.content)
-        return {'file_path': file_path}
-
-    logger.error(f'Failed to fetch terrain model: {response.text}')
-    raise HTTPException(
-        status_code=500, detail=f'Failed to fetch terrain model: {response.text}'
-    )
 
 
-async def process_geotiff(file_path: str, logger) -> dict:
-    """Process a GeoTIFF file to generate terrain tiles using Docker.
+def fetch_geotiff(bbox: str, width: float, height: float, logger, mosaic: bool = False) -> dict:
+    """Fetch a GeoTIFF file based on the bounding box and dimensions.
+
+    Terrain models are cached on disk by their normalized request, so repeated and
+    concurrent requests for the same area share one download. Downloads are streamed
+    to disk through a pooled client, which blocks, so async callers should run this
+    on terrain.client.download_executor.
+
+    The WCS returns at most WCS_MAX_SIZE pixels along each side. Larger requests are
+    downsampled to that size, unless `mosaic` is set: then the area is fetched as a
+    grid of pieces within the limit, which are mosaicked into one tiled GeoTIFF.
 
     Args:
-        file_path (str): Path to the GeoTIFF file.
+        bbox (str): Bounding box coordinates.
+        width (float): Width of the GeoTIFF.
+        height (float): Height of the GeoTIFF.
         logger (Logger): Logger instance.
+        mosaic (bool, optional): Fetch oversized areas at full resolution as a mosaic.
+            Defaults to False.
 
     Returns:
-        dict: Dictionary containing the URL to access the generated tiles.
+        dict: Dictionary containing the file path of the fetched GeoTIFF.
 
     Raises:
-        HTTPException: If the GeoTIFF processing fails.
+        HTTPException: If the GeoTIFF fetch fails.
     """
-    try:
-        if not os.path.exists(file_path):
-            logger.error(f'GeoTIFF file not found at: {file_path}')
-            raise HTTPException(status_code=404, detail='GeoTIFF file not found')
-
-        output_dir = 'C:/docker/terrain/output'
-        os.makedirs(output_dir, exist_ok=True)
-
-        client = docker.from_env()
-
-        # Running the terrain creation command
-        container1 = client.containers.run(
-            'cesium-terrain-builder',
-            f'ctb-tile -f Mesh -C -N -o /data/output /data/input/{
-                os.path.basename(file_path)}',
-            volumes={
-                os.path.dirname(file_path): {'bind': '/data/input', 'mode': 'rw'},
-                output_dir: {'bind': '/data/output', 'mode': 'rw'},
-            },
-            detach=True,
+    oversized = width > WCS_MAX_SIZE or height > WCS_MAX_SIZE
+    mosaic = mosaic and oversized
+    if oversized and not mosaic:
+        logger.warning(
+            f'Terrain model of {width}x{height} pixels downsampled to the WCS limit of '
+            f'{WCS_MAX_SIZE}, request a mosaic for full resolution'
         )
-        result1 = container1.wait()
-        logs1 = container1.logs().decode('utf-8')
-        logger.info(f'Docker logs (terrain creation): {logs1}')
-        if result1['StatusCode'] != 0:
-            logger.error(f'Docker container exited with code {result1}')
-            raise HTTPException(status_code=500, detail='Error during terrain tile generation')
-
-        # Running the layer.json creation command
-        container2 = client.containers.run(
-            'cesium-terrain-builder',
-            f'ctb-tile -f Mesh -C -N -l -o /data/output /data/input/{
-                os.path.basename(file_path)}',
-            volumes={
-                os.path.dirname(file_path): {'bind': '/data/input', 'mode': 'rw'},
-                output_dir: {'bind': '/data/output', 'mode': 'rw'},
-            },
-            detach=True,
+        width = min(width, WCS_MAX_SIZE)  # Hardcoded max due to limits on API
+        height = min(height, WCS_MAX_SIZE)  # Hardcoded max due to limits on API
+    width, height = int(round(width)), int(round(height))
+    try:
+        key = terrain_key(bbox, width, height, WCS_COVERAGE)
+        bounds = geographic_bounds(bbox, WCS_CRS) if mosaic else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    def download_piece(piece_bbox, piece_width, piece_height, file_path):
+        params = _coverage_params(
+            ','.join(str(value) for value in piece_bbox), piece_width, piece_height, 'EPSG:4326'
         )
-        result2 = container2.wait()
-        if result2['StatusCode'] != 0:
-            logger.error(f'Docker container exited with code {result2}')
-            raise HTTPException(status_code=500, detail='Error during layer.json generation')
+        wcs_client.download(WCS_URL, params, file_path)
 
-        tile_path = os.path.join(output_dir, 'layer.json')
-        if os.path.exists(tile_path):
-            return {'tileSetUrl': 'http://localhost:8080/tilesets/output'}
-        logger.error('Failed to generate terrain tiles: layer.json not found.')
-        raise HTTPException(status_code=500, detail='Failed to generate terrain tiles')
+    def download(file_path):
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            if mosaic:
+                fetch_mosaic(
+                    download_piece,
+                    bounds,
+                    width,
+                    height,
+                    file_path,
+                    WCS_MAX_SIZE,
+                    WCS_MOSAIC_CONCURRENCY,
+                )
+            else:
+                wcs_client.download(WCS_URL, _coverage_params(bbox, width, height), file_path)
+            outcome = 'ok'
+        except (WCSError, requests.RequestException, RuntimeError, ValueError) as e:
+            logger.error(f'Failed to fetch terrain model: {e}')
+            raise HTTPException(
+                status_code=500, detail=f'Failed to fetch terrain model: {e}'
+            ) from e
+        finally:
+            TERRAIN_FETCH_DURATION.labels('mosaic' if mosaic else 'single', outcome).observe(
+                time.perf_counter() - start
+            )
+
+    file_path = terrain_cache.get_or_fetch(key, download)
+    return {'file_path': file_path}
+
+
+def _parse_bbox(bbox: str) -> tuple:
+    """Parses a west,south,east,north bounding box in degrees."""
+    try:
+        west, south, east, north = (float(value) for value in bbox.split(','))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400, detail='bbox must be west,south,east,north in degrees'
+        ) from e
+    if west >= east or south >= north:
+        raise HTTPException(status_code=400, detail='bbox must have a positive area')
+    return west, south, east, north
 
-    except Exception as e:
-        logger.error(f'Error during terrain tile generation: {e}')
-        raise HTTPException(status_code=500, detail=f'Error processing GeoTIFF: {e}') from e
+
+async def process_geotiff(file_path: str, logger, bbox: str = None) -> dict:
+    """Queue the generation of terrain tiles from a GeoTIFF file.
+
+    The tiles are generated by a background job, so the request returns immediately.
+    Submitting a file which is already being or has been tiled returns the existing job.
+
+    Args:
+        file_path (str): Path to the GeoTIFF file.
+        logger (Logger): Logger instance.
+        bbox (str, optional): West, south, east and north edges in degrees of a changed
+            area. Only the tiles intersecting it are regenerated. Defaults to None.
+
+    Returns:
+        dict: Dictionary containing the state of the job, including the tileSetUrl once
+        it is done.
+
+    Raises:
+        HTTPException: If the GeoTIFF file does not exist or the bbox is invalid.
+    """
+    if not os.path.exists(file_path):
+        logger.error(f'GeoTIFF file not found at: {file_path}')
+        raise HTTPException(status_code=404, detail='GeoTIFF file not found')
+
+    job = tile_jobs.submit(file_path, _parse_bbox(bbox) if bbox else None)
+    logger.info(f'Terrain tile job {job.job_id} for {file_path} is {job.status}')
+    return job.to_dict()
+
+
+def query_tile_job(job_id: str) -> dict:
+    """Query the state of a terrain tile job.
+
+    Args:
+        job_id (str): The ID of the job.
+
+    Returns:
+        dict: Dictionary containing the state of the job.
+
+    Raises:
+        HTTPException: If no job with the ID exists.
+    """
+    job = tile_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='Terrain tile job not found')
+    return job.to_dict()
+
+
+@response_cache.cached('images', ttl=IMAGE_LIST_CACHE_TTL)
+def _query_images(inquiry_id, connection):
+    """Query the images of an inquiry, cached per inquiry."""
+    result = execute_statement(
+        connection=connection,
+        name='fetch_images_by_inquiry_id',
+        params={'inquiry_id': inquiry_id},
+    )
+    return fetch_dicts(result, 'fetch_images_by_inquiry_id')
 
 
 def query_images_by_inquiry_id(inquiry_id, logger, connection):
@@ -243,16 +550,8 @@ def query_images_by_inquiry_id(inquiry_id, logger, connection):
         list: List of images related to the inquiry.
     """
     try:
-        result = execute_sql(
-            connection=connection,
-            main_file_path=f'{QUERY_PATH}/fetch_images_by_inquiry_id.sql',
-            params={'inquiry_id': inquiry_id},
-        )
-        logger.info(f'main file path: {
-                    QUERY_PATH}/fetch_images_by_inquiry_id.sql')
-        images = [dict(row) for row in result.mappings()]
-        logger.info(f'Fetched images for inquiry {inquiry_id}: {
-                    images}')  # Log fetched images
+        images = _query_images(inquiry_id, connection)
+        logger.info('Fetched %d images for inquiry %s', len(images), inquiry_id)
         return images
     except Exception as e:
         logger.error(f'Error querying images for inquiry {inquiry_id}: {e}')
@@ -262,20 +561,29 @@ def query_images_by_inquiry_id(inquiry_id, logger, connection):
         ) from e
 
 
-def query_update_views(connection):
-    """Query measurement geometry by inquiry.
+# Cached images are returned without checking out a connection, see scene._query_part
+query_images_by_inquiry_id.peek = _query_images.peek
+
+
+@response_cache.cached_many('images', ttl=IMAGE_LIST_CACHE_TTL)
+def query_image_manifests(inquiry_ids, connection):
+    """Query the images of several inquiries in one statement.
+
+    The manifests are cached per inquiry, shared with query_images_by_inquiry_id.
 
     Args:
-        inquiry_id (int): The ID of the inquiry.
+        inquiry_ids (list): The IDs of the inquiries.
         connection: The database connection.
 
     Returns:
-        list: List of measurement geometry related to the inquiry.
+        dict: The images of every inquiry, an empty list for inquiries without images.
     """
-    result = execute_sql(
+    result = execute_statement(
         connection=connection,
-        main_file_path=f'{
-            QUERY_PATH}update_queries/refresh_materialized_views.sql',
-        params={},
+        name='fetch_image_manifests',
+        params={'inquiry_ids': list(inquiry_ids)},
     )
-    return result
+    manifests = {inquiry_id: [] for inquiry_id in inquiry_ids}
+    for image in fetch_dicts(result, 'fetch_image_manifests'):
+        manifests[image.pop('inquiry_id')].append(image)
+    return manifests
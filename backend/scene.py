@@ -0,0 +1,107 @@
+"""
+This module provides the combined scene document of an inquiry.
+"""
+
+import asyncio
+
+from database import SCHEMA, SCHEMA_PUBLIC, connect_async, run_query
+from queries import (
+    query_boundary_geometry_by_inquiry,
+    query_boundary_geometry_json_by_inquiry,
+    query_images_by_inquiry_id,
+    query_measurement_geometry_by_inquiry,
+    query_measurement_geometry_json_by_inquiry,
+    query_points_of_cables_by_inquiry,
+    query_points_of_cables_json_by_inquiry,
+    query_working_area_geometry_by_inquiry,
+    query_working_area_geometry_json_by_inquiry,
+)
+
+# Parts of a scene, with the schema and the query function fetching them
+SCENE_PARTS = {
+    'boundary': (SCHEMA, query_boundary_geometry_by_inquiry),
+    'working_area': (SCHEMA, query_working_area_geometry_by_inquiry),
+    'measurements': (SCHEMA, query_measurement_geometry_by_inquiry),
+    'cable_points': (SCHEMA, query_points_of_cables_by_inquiry),
+    'images': (SCHEMA_PUBLIC, query_images_by_inquiry_id),
+}
+
+# Query functions returning the parts encoded as JSON by the database
+SCENE_JSON_QUERIES = {
+    'boundary': query_boundary_geometry_json_by_inquiry,
+    'working_area': query_working_area_geometry_json_by_inquiry,
+    'measurements': query_measurement_geometry_json_by_inquiry,
+    'cable_points': query_points_of_cables_json_by_inquiry,
+}
+
+
+def parse_scene_parts(include):
+    """Parses the comma separated parts of a scene request.
+
+    Args:
+        include (str): Comma separated names of parts, keys of SCENE_PARTS.
+
+    Returns:
+        list: The names of the parts, without duplicates, in the given order.
+
+    Raises:
+        ValueError: If no part or an unknown part is given.
+    """
+    parts = list(dict.fromkeys(part.strip() for part in include.split(',') if part.strip()))
+    unknown = [part for part in parts if part not in SCENE_PARTS]
+    if unknown or not parts:
+        raise ValueError(f'Unknown scene parts: {unknown}. Choose from {list(SCENE_PARTS)}')
+    return parts
+
+
+async def _query_part(part, inquiry_id, logger, passthrough):
+    """Fetches a single part of the scene on its own pooled connection.
+
+    Cached parts are returned without checking out a connection.
+
+    Returns:
+        list: The result of the query function of the part, or its JSON encoding if
+        passthrough is set and the database can encode it.
+    """
+    schema, query = SCENE_PARTS[part]
+    if passthrough:
+        query = SCENE_JSON_QUERIES.get(part, query)
+    peek = getattr(query, 'peek', None)
+    if peek is not None:
+        result = peek(inquiry_id)
+        if result is not None:
+            return result
+
+    args = (inquiry_id, logger) if part == 'images' else (inquiry_id,)
+    async with connect_async(schema) as connection:
+        return await run_query(connection, query, *args)
+
+
+async def query_scene_by_inquiry(inquiry_id, parts, logger, passthrough=False):
+    """Fetches the parts of the scene of an inquiry concurrently.
+
+    Every part runs its existing query on its own connection, so the scene takes about
+    as long as the slowest part. If a part fails, the remaining parts are cancelled.
+
+    Args:
+        inquiry_id (int): The ID of the inquiry.
+        parts (iterable): Names of the parts to include, keys of SCENE_PARTS.
+        logger (Logger): Logger instance.
+        passthrough (bool, optional): Return the geometry parts as JSON encoded by the
+            database, as bytes to be spliced into the response. Defaults to False.
+
+    Returns:
+        dict: The result of every requested part, keyed by part name.
+
+    Raises:
+        Exception: The first error raised by a part.
+    """
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = {
+                part: group.create_task(_query_part(part, inquiry_id, logger, passthrough))
+                for part in parts
+            }
+    except ExceptionGroup as errors:
+        raise errors.exceptions[0] from errors
+    return {part: task.result() for part, task in tasks.items()}
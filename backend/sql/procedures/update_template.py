@@ -34,3 +34,79 @@ def generate_update_sql(table_name, update_params, condition_params):
     sql_statement = f"UPDATE {table_name} SET {
         set_clause} WHERE {where_clause};"
     return sql_statement
+
+
+def generate_batch_update_sql(table_name, key_column, columns, row_count, set_expressions=None):
+    """
+    Generates a set-based SQL statement updating many rows from a VALUES list,
+    with parameter placeholders to prevent SQL injection.
+    This function should be used with the parameters from generate_batch_update_params.
+
+    The statement has the form
+    UPDATE table SET column = v.column FROM (VALUES (...), ...) AS v(...)
+    WHERE table.key = v.key RETURNING table.key, so the updated keys can be compared
+    with the requested ones.
+
+    Args:
+        table_name (str): The name of the database table.
+            Must be a valid table name and not user-controlled.
+        key_column (str): The column identifying the rows, which must be one of the columns.
+        columns (dict): Column names of the VALUES list mapped to their SQL type,
+            e.g. {"id": "integer", "hoyde": "double precision"}.
+            The keys should be valid column names and not user-controlled.
+        row_count (int): The number of rows in the VALUES list.
+        set_expressions (dict, optional): Column names of the table mapped to the SQL
+            expression assigned to them, referencing the values as v.<column>.
+            Defaults to assigning every column except the key from its value.
+
+    Returns:
+        str: An SQL update statement.
+
+    Raises:
+        ValueError: If any of the inputs are invalid or empty.
+    """
+    if not table_name or not columns or row_count < 1:
+        raise ValueError("Table name, columns and at least one row must be given.")
+    if key_column not in columns:
+        raise ValueError(f"Key column {key_column} must be one of the columns.")
+
+    if set_expressions is None:
+        set_expressions = {
+            column: f"v.{column}" for column in columns if column != key_column}
+    if not set_expressions:
+        raise ValueError("At least one column must be updated.")
+
+    set_clause = ", ".join(
+        [f"{column} = {expression}" for column, expression in set_expressions.items()])
+    values_clause = ", ".join(
+        "(" + ", ".join(
+            [f"CAST(:{column}_{index} AS {sql_type})" for column, sql_type in columns.items()]
+        ) + ")"
+        for index in range(row_count)
+    )
+    column_list = ", ".join(columns.keys())
+    sql_statement = (
+        f"UPDATE {table_name} SET {set_clause} "
+        f"FROM (VALUES {values_clause}) AS v({column_list}) "
+        f"WHERE {table_name}.{key_column} = v.{key_column} "
+        f"RETURNING {table_name}.{key_column};"
+    )
+    return sql_statement
+
+
+def generate_batch_update_params(rows, columns):
+    """
+    Flattens rows into the parameters of a statement from generate_batch_update_sql.
+
+    Args:
+        rows (list): Dictionaries with a value for every column.
+        columns (iterable): The column names, as passed to generate_batch_update_sql.
+
+    Returns:
+        dict: The parameters, named <column>_<row index>.
+    """
+    return {
+        f"{column}_{index}": row[column]
+        for index, row in enumerate(rows)
+        for column in columns
+    }
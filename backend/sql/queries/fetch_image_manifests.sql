@@ -0,0 +1,28 @@
+/**
+ * Fetches the images of the points measured for several inquiries at once.
+ *
+ * Same rows as fetch_images_by_inquiry_id, with the inquiry they belong to.
+ *
+ * @param inquiry_ids The IDs of the henvendelse rows.
+ **/
+SELECT DISTINCT ON (henvendelse_ledningsmaaling.henvendelse_id, bilde.id)
+    henvendelse_ledningsmaaling.henvendelse_id AS inquiry_id,
+    bilde.id,
+    ST_AsGeoJSON(ST_Transform(bilde.geom, 4326)) AS geom,
+    bilde.tidspunkt,
+    vedlegg.bra_arkiv_id,
+    vedlegg.beskrivelse,
+    vedlegg.bearing,
+    vedlegg.filnavn
+FROM
+    henvendelse_ledningsmaaling
+    INNER JOIN ledningsmaaling_innmaaling ON ledningsmaaling_innmaaling.henvendelse_ledningsmaaling_id = henvendelse_ledningsmaaling.id
+    INNER JOIN ledningsmaaling_innmaaling_kobling kobling ON kobling.ledningsmaaling_innmaaling_id = ledningsmaaling_innmaaling.id
+    INNER JOIN ledningsmaaling_innmaaling_bilde bilde ON bilde.ledningsmaaling_innmaaling_punkt_id = kobling.ledningsmaaling_innmaaling_punkt_id
+    INNER JOIN vedlegg ON vedlegg.bra_arkiv_id = bilde.bra_arkiv_id
+WHERE
+    henvendelse_ledningsmaaling.henvendelse_id = ANY(:inquiry_ids)
+    AND vedlegg.is_image
+ORDER BY
+    henvendelse_ledningsmaaling.henvendelse_id,
+    bilde.id
@@ -0,0 +1,121 @@
+/**
+ * Fetches a page of the working areas and measurements of all inquiries intersecting
+ * a viewport, ordered by inquiry, kind and ID.
+ * Working areas are found through the GiST index on their geometry in WGS84, single
+ * point measurements through the GiST index on their points, and cables through the
+ * GiST index on their lines in "Cable_Line", so a cable crossing the viewport is found
+ * even when none of its points are inside it.
+ *
+ * @param west, south, east, north The viewport in degrees.
+ * @param include_areas Whether to include working areas.
+ * @param include_measurements Whether to include cables and single point measurements.
+ * @param cursor_inquiry, cursor_kind, cursor_id The last row of the previous page,
+ *        NULL for the first page.
+ * @param limit The maximum number of features.
+ **/
+WITH viewport AS (
+    SELECT
+        public.ST_MakeEnvelope (:west, :south, :east, :north, 4326) AS envelope
+),
+area_keys AS (
+    SELECT
+        geometry.inquiry_id,
+        0 AS kind,
+        geometry.id
+    FROM
+        "Geometry" geometry
+    WHERE
+        CAST(:include_areas AS boolean)
+        AND public.ST_Intersects (
+            public.ST_Transform (geometry.geom, 4326),
+            (SELECT envelope FROM viewport)
+        )
+),
+measurement_keys AS (
+    SELECT DISTINCT
+        measurements.inquiry_id,
+        1 AS kind,
+        hits.measurement_id AS id
+    FROM
+        (
+            SELECT
+                link.measurement_id
+            FROM
+                "Point" point
+                INNER JOIN "Measurement_Point" link ON link.point_id = point.id
+            WHERE
+                point.geom && (SELECT envelope FROM viewport)
+            UNION
+            SELECT
+                line.measurement_id
+            FROM
+                "Cable_Line" line
+            WHERE
+                public.ST_Intersects (line.geom, (SELECT envelope FROM viewport))
+        ) hits
+        INNER JOIN "Measurements_by_Inquiry" measurements ON measurements.measurement_id = hits.measurement_id
+    WHERE
+        CAST(:include_measurements AS boolean)
+),
+page AS (
+    SELECT
+        keys.inquiry_id,
+        keys.kind,
+        keys.id
+    FROM
+        (
+            SELECT * FROM area_keys
+            UNION ALL
+            SELECT * FROM measurement_keys
+        ) keys
+    WHERE
+        CAST(:cursor_inquiry AS integer) IS NULL
+        OR (keys.inquiry_id, keys.kind, keys.id) > (
+            CAST(:cursor_inquiry AS integer),
+            CAST(:cursor_kind AS integer),
+            CAST(:cursor_id AS integer)
+        )
+    ORDER BY
+        keys.inquiry_id,
+        keys.kind,
+        keys.id
+    LIMIT CAST(:limit AS integer)
+)
+SELECT
+    page.inquiry_id,
+    page.kind AS kind_rank,
+    page.id,
+    CASE
+        WHEN page.kind = 0 THEN 'working_area'
+        WHEN measurement.geojson -> 'geometry' ->> 'type' = 'Point' THEN 'point'
+        ELSE 'cable'
+    END AS kind,
+    coalesce(area.geojson, measurement.geojson) AS geojson
+FROM
+    page
+    LEFT JOIN (
+        SELECT
+            geometry.id,
+            json_build_object(
+                'type', 'Feature', 'properties', json_build_object(
+                    'inquiry_id', geometry.inquiry_id, 'geometry_id', geometry.id
+                ), 'geometry', public.st_asgeojson (public.ST_Transform (geometry.geom, 4326))::jsonb
+            )::jsonb AS geojson
+        FROM
+            "Geometry" geometry
+        WHERE
+            geometry.id = ANY (ARRAY(SELECT id FROM page WHERE kind = 0))
+    ) area ON page.kind = 0 AND area.id = page.id
+    LEFT JOIN (
+        SELECT
+            measurement_id,
+            point_geojson AS geojson
+        FROM
+            "Measurements_as_GeoJSON_3D"
+        WHERE
+            measurement_id = ANY (ARRAY(SELECT id FROM page WHERE kind = 1))
+    ) measurement ON page.kind = 1 AND measurement.measurement_id = page.id
+ORDER BY
+    page.inquiry_id,
+    page.kind,
+    page.id
@@ -0,0 +1,14 @@
+/**
+ * Fetches the IDs of the inquiries which own the given points, one row per point and inquiry.
+ *
+ * @param point_ids The IDs of the ledningsmaaling_innmaaling_punkt rows.
+ **/
+SELECT DISTINCT
+    kobling.ledningsmaaling_innmaaling_punkt_id AS point_id,
+    henvendelse_ledningsmaaling.henvendelse_id AS inquiry_id
+FROM
+    ledningsmaaling_innmaaling_kobling kobling
+    INNER JOIN ledningsmaaling_innmaaling ON ledningsmaaling_innmaaling.id = kobling.ledningsmaaling_innmaaling_id
+    INNER JOIN henvendelse_ledningsmaaling ON henvendelse_ledningsmaaling.id = ledningsmaaling_innmaaling.henvendelse_ledningsmaaling_id
+WHERE
+    kobling.ledningsmaaling_innmaaling_punkt_id = ANY(:point_ids)
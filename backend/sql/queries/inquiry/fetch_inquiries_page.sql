@@ -0,0 +1,66 @@
+/**
+ * Fetches a page of inquiries with registered measurements, newest first.
+ * The page is selected on the inquiries before joining their inquiry measurements,
+ * so an inquiry is never split across pages.
+ *
+ * @param cursor Only inquiries with a lower ID are returned, NULL for the first page.
+ * @param limit The maximum number of inquiries, NULL for all.
+ * @param status Only inquiries with this status, NULL for all.
+ * @param municipality Only inquiries in the municipality with this name, NULL for all.
+ * @param organization Only inquiries of the organization with this name, NULL for all.
+ **/
+WITH page AS (
+    SELECT
+        inquiry.id
+    FROM
+        "Inquiry" inquiry
+        INNER JOIN "Organization" organization ON organization.id = inquiry.organization_id
+        INNER JOIN "Municipality" municipality ON municipality.id = inquiry.municipality_id
+    WHERE
+        (CAST(:cursor AS integer) IS NULL OR inquiry.id < CAST(:cursor AS integer))
+        AND (CAST(:status AS integer) IS NULL OR inquiry.status = CAST(:status AS integer))
+        AND (CAST(:municipality AS text) IS NULL OR municipality.name = CAST(:municipality AS text))
+        AND (CAST(:organization AS text) IS NULL OR organization.name = CAST(:organization AS text))
+        AND EXISTS (
+            SELECT 1 FROM "Geometry" geometry WHERE geometry.inquiry_id = inquiry.id
+        )
+        AND EXISTS (
+            SELECT 1 FROM "Measurements_by_Inquiry" measurements WHERE measurements.inquiry_id = inquiry.id
+        )
+    ORDER BY
+        inquiry.id DESC
+    LIMIT CAST(:limit AS integer)
+),
+cable_measurements AS (
+    SELECT
+        measurements.inquiry_id,
+        COUNT(measurements.measurement_id) AS number_of_measurements
+    FROM
+        "Measurements_by_Inquiry" measurements
+    WHERE
+        measurements.inquiry_id IN (SELECT id FROM page)
+    GROUP BY
+        measurements.inquiry_id
+)
+SELECT
+    inquiry.id AS inquiry_id,
+    inquiry_measurement.id AS inquiry_measurement_id,
+    inquiry.name AS name,
+    inquiry.description AS description,
+    organization.name AS organization,
+    municipality.name AS municipality,
+    inquiry.address AS address,
+    inquiry.status,
+    inquiry.start_date AS start_date,
+    inquiry.end_date AS end_date,
+    cable_measurements.number_of_measurements
+FROM
+    page
+    INNER JOIN "Inquiry" inquiry ON inquiry.id = page.id
+    INNER JOIN "InquiryMeasurement" inquiry_measurement ON inquiry_measurement.inquiry_id = inquiry.id
+    INNER JOIN cable_measurements ON cable_measurements.inquiry_id = inquiry.id
+    INNER JOIN "Organization" organization ON organization.id = inquiry.organization_id
+    INNER JOIN "Municipality" municipality ON municipality.id = inquiry.municipality_id
+ORDER BY
+    inquiry_id DESC,
+    inquiry_measurement_id
@@ -0,0 +1,18 @@
+/**
+ * Fetches the materialized views in a schema which can be refreshed concurrently,
+ * i.e. which have a unique index on plain columns covering all rows.
+ *
+ * @param schema The schema containing the materialized views.
+ **/
+SELECT DISTINCT
+    materialized_view.relname AS view_name
+FROM
+    pg_catalog.pg_class materialized_view
+    INNER JOIN pg_catalog.pg_namespace namespace ON namespace.oid = materialized_view.relnamespace
+    INNER JOIN pg_catalog.pg_index unique_index ON unique_index.indrelid = materialized_view.oid
+WHERE
+    materialized_view.relkind = 'm'
+    AND namespace.nspname = :schema
+    AND unique_index.indisunique
+    AND unique_index.indpred IS NULL
+    AND unique_index.indexprs IS NULL
@@ -13,4 +13,6 @@ refresh materialized view analytics_cable_measurement_inquiries."Organization";
 
 refresh materialized view analytics_cable_measurement_inquiries."Point";
 
-refresh materialized view analytics_cable_measurement_inquiries."Inquiry";
\ No newline at end of file
+refresh materialized view analytics_cable_measurement_inquiries."Inquiry";
+
+refresh materialized view analytics_cable_measurement_inquiries."Cable_Line";
\ No newline at end of file
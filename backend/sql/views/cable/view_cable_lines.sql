@@ -0,0 +1,23 @@
+/**
+ * Materialized lines of the cables in WGS84, so the viewport queries of /geometries/bbox
+ * find a cable crossing a viewport through the GiST index on its line, even when none
+ * of its points are inside the viewport.
+ * Like "Cables_by_Measurement", a cable is a measurement of more than one point. Its
+ * points are joined in the order of their IDs.
+ **/
+CREATE MATERIALIZED VIEW IF NOT EXISTS "Cable_Line" AS
+SELECT
+    link.ledningsmaaling_innmaaling_id AS measurement_id,
+    public.ST_MakeLine (point.geom ORDER BY point.id) AS geom
+FROM
+    public.ledningsmaaling_innmaaling_kobling link
+    INNER JOIN public.ledningsmaaling_innmaaling_punkt point ON point.id = link.ledningsmaaling_innmaaling_punkt_id
+GROUP BY
+    link.ledningsmaaling_innmaaling_id
+HAVING
+    COUNT(point.id) > 1;
+
+/* Allows the view to be refreshed concurrently */
+CREATE UNIQUE INDEX IF NOT EXISTS cable_line_measurement_id_unique ON "Cable_Line" (measurement_id);
+
+CREATE INDEX IF NOT EXISTS cable_line_geom_gist ON "Cable_Line" USING GIST (geom);
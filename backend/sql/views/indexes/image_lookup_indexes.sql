@@ -0,0 +1,20 @@
+/* Indexes of the join from an inquiry down to its images, see fetch_images_by_inquiry_id */
+CREATE INDEX IF NOT EXISTS henvendelse_ledningsmaaling_henvendelse_id ON public.henvendelse_ledningsmaaling (henvendelse_id);
+
+CREATE INDEX IF NOT EXISTS ledningsmaaling_innmaaling_henvendelse_ledningsmaaling_id ON public.ledningsmaaling_innmaaling (henvendelse_ledningsmaaling_id);
+
+CREATE INDEX IF NOT EXISTS ledningsmaaling_innmaaling_kobling_innmaaling_punkt ON public.ledningsmaaling_innmaaling_kobling (ledningsmaaling_innmaaling_id, ledningsmaaling_innmaaling_punkt_id);
+
+CREATE INDEX IF NOT EXISTS ledningsmaaling_innmaaling_bilde_punkt_id ON public.ledningsmaaling_innmaaling_bilde (ledningsmaaling_innmaaling_punkt_id);
+
+/* The image-type flag, computed once per attachment when it is written instead of by
+ * every lookup. Adding the column rewrites vedlegg once, locking it meanwhile */
+ALTER TABLE public.vedlegg
+ADD COLUMN IF NOT EXISTS is_image boolean GENERATED ALWAYS AS (filnavn ~* '\.(png|jpe?g)$') STORED;
+
+/* Replaced by the index of the flag, which the image queries filter on */
+DROP INDEX IF EXISTS public.vedlegg_image_bra_arkiv_id;
+
+CREATE INDEX IF NOT EXISTS vedlegg_is_image_bra_arkiv_id ON public.vedlegg (bra_arkiv_id)
+WHERE
+    is_image;
@@ -0,0 +1,8 @@
+/* Spatial indexes serving the viewport queries of /geometries/bbox */
+CREATE INDEX IF NOT EXISTS point_geom_gist ON "Point" USING GIST (geom);
+
+/* Working areas are stored in EPSG:25833 and queried in WGS84 */
+CREATE INDEX IF NOT EXISTS geometry_geom_4326_gist ON "Geometry" USING GIST (public.ST_Transform (geom, 4326));
+
+/* Finds the measurements of the points in the viewport */
+CREATE INDEX IF NOT EXISTS measurement_point_point_id ON "Measurement_Point" (point_id);
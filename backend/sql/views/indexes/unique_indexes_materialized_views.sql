@@ -0,0 +1,16 @@
+/* Unique indexes allowing the materialized views to be refreshed concurrently */
+CREATE UNIQUE INDEX IF NOT EXISTS geometry_id_unique ON "Geometry" (id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS inquiry_id_unique ON "Inquiry" (id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS inquiry_measurement_id_unique ON "InquiryMeasurement" (id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS measurement_id_unique ON "Measurement" (id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS measurement_point_unique ON "Measurement_Point" (measurement_id, point_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS municipality_id_unique ON "Municipality" (id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS organization_id_unique ON "Organization" (id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS point_id_unique ON "Point" (id);
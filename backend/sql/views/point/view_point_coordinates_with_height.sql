@@ -1,4 +1,4 @@
-CREATE CREATE
+CREATE
 OR REPLACE VIEW "Point_coordinates_with_height" AS
 SELECT
     point.id,
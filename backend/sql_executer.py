@@ -2,8 +2,31 @@
 This module provides functions for executing SQL queries.
 """
 
+import logging
+import os
+import threading
+
+from common.metrics import ROW_CONVERSION_DURATION, SQL_DURATION, SQL_ROWS, timed
 from sqlalchemy import text
 
+logger = logging.getLogger(__name__)
+
+QUERIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql', 'queries')
+SQL_EXTENSION = '.sql'
+
+# Wraps a statement so the database encodes all of its rows as one JSON array
+JSON_BODY_TEMPLATE = (
+    "SELECT coalesce(json_agg(statement_row), '[]')::text AS body\n"
+    'FROM (\n{statement}\n) AS statement_row'
+)
+
+# Placeholders expanded into statements when they are loaded, by statement name
+PLACEHOLDERS = {
+    'inquiry/fetch_inquiries': {
+        '/*cable_measurements*/': 'inquiry/fetch_number_of_measurements_per_inquiry',
+    },
+}
+
 
 def __load_sql__(path):
     """Loads a query from a file.
@@ -19,6 +42,208 @@ def __load_sql__(path):
     return query
 
 
+class StatementRegistry:
+    """Registry of the SQL statements in a directory, loaded and compiled once.
+
+    Statements are named by their path relative to the directory, without extension,
+    e.g. 'geometry/fetch_points_of_cables_by_inquiry'. Placeholders are expanded when
+    a statement is loaded, and every statement is compiled into a reusable TextClause.
+
+    Args:
+        root (str): The directory containing the SQL files.
+        placeholders (dict, optional): Statement name mapped to a dictionary of
+            placeholder and the name of the statement replacing it. Defaults to None.
+        reload (bool, optional): Reload statements whose files changed on disk when
+            they are looked up. Meant for development. Defaults to False.
+
+    Raises:
+        FileNotFoundError: If the directory or a placeholder file does not exist.
+    """
+
+    def __init__(self, root, placeholders=None, reload=False):
+        self.root = root
+        self.placeholders = placeholders or {}
+        self.reload = reload
+        self._lock = threading.Lock()
+        self._paths = {}
+        self._statements = {}
+        self._json_bodies = {}
+        self.load()
+
+    def load(self):
+        """Reads and compiles every SQL file below the root directory.
+
+        Raises:
+            FileNotFoundError: If the directory or a placeholder file does not exist.
+        """
+        if not os.path.isdir(self.root):
+            raise FileNotFoundError(f'SQL directory not found: {self.root}')
+
+        paths = {}
+        for directory, _, files in os.walk(self.root):
+            for file_name in files:
+                base, extension = os.path.splitext(file_name)
+                if extension.lower() != SQL_EXTENSION:
+                    continue
+                relative = os.path.relpath(os.path.join(directory, base), self.root)
+                paths[relative.replace(os.sep, '/')] = os.path.join(directory, file_name)
+
+        for name, statement_placeholders in self.placeholders.items():
+            for placeholder_name in (name, *statement_placeholders.values()):
+                if placeholder_name not in paths:
+                    raise FileNotFoundError(
+                        f'SQL statement {placeholder_name} not found in {self.root}'
+                    )
+
+        statements = {name: self._compile(name, paths) for name in paths}
+        with self._lock:
+            self._paths = paths
+            self._statements = statements
+        logger.info('Loaded %d SQL statements from %s', len(statements), self.root)
+
+    def get(self, name):
+        """Returns the compiled statement with the given name.
+
+        Args:
+            name (str): The name of the statement.
+
+        Returns:
+            TextClause: The compiled statement.
+
+        Raises:
+            KeyError: If no statement with the name exists.
+        """
+        if self.reload:
+            self._reload_if_changed(name)
+        try:
+            return self._statements[name][0]
+        except KeyError:
+            raise KeyError(f'Unknown SQL statement: {name}') from None
+
+    def json_body(self, name):
+        """Returns the statement with the given name, wrapped to return its rows as JSON.
+
+        The wrapped statement returns a single row with a single text column holding the
+        JSON array of the rows of the statement, so the rows are never decoded in Python.
+
+        Args:
+            name (str): The name of the statement.
+
+        Returns:
+            TextClause: The compiled wrapped statement.
+        """
+        statement = self.get(name)
+        entry = self._json_bodies.get(name)
+        if entry is None or entry[0] is not statement:
+            source = statement.text.strip().rstrip(';')
+            entry = (statement, text(JSON_BODY_TEMPLATE.format(statement=source)))
+            self._json_bodies[name] = entry
+        return entry[1]
+
+    def source(self, name):
+        """Returns the expanded SQL of the statement with the given name.
+
+        Args:
+            name (str): The name of the statement.
+
+        Returns:
+            str: The SQL with all placeholders expanded.
+        """
+        return self.get(name).text
+
+    def names(self):
+        """Returns the names of all registered statements.
+
+        Returns:
+            list: Sorted statement names.
+        """
+        return sorted(self._statements)
+
+    def _compile(self, name, paths):
+        """Reads a statement, expands its placeholders and compiles it.
+
+        Returns:
+            tuple: The TextClause and the modification times of the files it was built from.
+        """
+        files = [paths[name]]
+        statement = __load_sql__(paths[name])
+        for placeholder, placeholder_name in self.placeholders.get(name, {}).items():
+            files.append(paths[placeholder_name])
+            statement = statement.replace(placeholder, __load_sql__(paths[placeholder_name]))
+        mtimes = {path: os.path.getmtime(path) for path in files}
+        return text(statement), mtimes
+
+    def _reload_if_changed(self, name):
+        """Reloads all statements if the files of the given statement changed."""
+        entry = self._statements.get(name)
+        if entry is None:
+            self.load()
+            return
+        for path, mtime in entry[1].items():
+            if not os.path.exists(path) or os.path.getmtime(path) != mtime:
+                logger.info('SQL file %s changed, reloading statements', path)
+                self.load()
+                return
+
+
+statements = StatementRegistry(
+    QUERIES_DIR,
+    placeholders=PLACEHOLDERS,
+    reload=os.getenv('SQL_RELOAD', 'false').lower() in ('1', 'true', 'yes'),
+)
+
+
+def execute_statement(connection, name, params=None):
+    """Executes a registered statement with specified parameters.
+
+    Args:
+        connection (Connection): A connection to the database.
+        name (str): The name of the statement in the registry.
+        params (dict, optional): Dictionary containing the parameters and their name
+            to be injected into the statement. Defaults to None.
+
+    Returns:
+        ResultProxy: The result of the query execution.
+    """
+    statement = statements.get(name)
+    with timed(SQL_DURATION.labels(name), 'db'):
+        return connection.execute(statement, params)
+
+
+def execute_json_statement(connection, name, params=None):
+    """Executes a registered statement and returns its rows encoded by the database.
+
+    Args:
+        connection (Connection): A connection to the database.
+        name (str): The name of the statement in the registry.
+        params (dict, optional): Dictionary containing the parameters and their name
+            to be injected into the statement. Defaults to None.
+
+    Returns:
+        bytes: The JSON array of the rows, one object per row.
+    """
+    statement = statements.json_body(name)
+    with timed(SQL_DURATION.labels(f'{name}.json'), 'db'):
+        body = connection.execute(statement, params).scalar_one()
+    return body.encode('utf-8')
+
+
+def fetch_dicts(result, name):
+    """Converts every row of a result into a dictionary.
+
+    Args:
+        result (ResultProxy): The result of a statement.
+        name (str): The name of the statement, labelling the recorded row count and time.
+
+    Returns:
+        list: A dictionary per row.
+    """
+    with timed(ROW_CONVERSION_DURATION.labels(name), 'rows'):
+        rows = [dict(row) for row in result.mappings()]
+    SQL_ROWS.labels(name).inc(len(rows))
+    return rows
+
+
 def execute_sql(connection, main_file_path, placeholders=None, params=None):
     """Executes SQL from a file with specified parameters and placeholders.
 
@@ -39,4 +264,5 @@ def execute_sql(connection, main_file_path, placeholders=None, params=None):
             placeholder_statement = __load_sql__(placeholder_path)
             statement = statement.replace(placeholder, placeholder_statement)
 
-    return connection.execute(text(statement), params)
+    with timed(SQL_DURATION.labels(main_file_path), 'db'):
+        return connection.execute(text(statement), params)
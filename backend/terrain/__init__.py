@@ -0,0 +1,3 @@
+"""
+This package provides fetching, caching and tiling of terrain models.
+"""
@@ -0,0 +1,61 @@
+"""
+This module provides a content-addressed on-disk cache for downloaded terrain models.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from common.file_cache import FileCache
+
+TERRAIN_FILE_EXTENSION = '.tif'
+
+
+def terrain_key(bbox, width, height, coverage):
+    """Builds the cache key of a terrain model request.
+
+    The bounding box is normalized to millimetre precision and the dimensions to whole
+    pixels, so equivalent requests share a cache entry.
+
+    Args:
+        bbox (str): Comma separated bounding box coordinates.
+        width (float): Width of the GeoTIFF in pixels.
+        height (float): Height of the GeoTIFF in pixels.
+        coverage (str): The name of the WCS coverage.
+
+    Returns:
+        str: A hexadecimal digest identifying the request.
+
+    Raises:
+        ValueError: If the bounding box does not contain four numbers.
+    """
+    coordinates = [float(value) for value in bbox.split(',')]
+    if len(coordinates) != 4:
+        raise ValueError(f'Bounding box must contain four coordinates: {bbox}')
+    normalized = '|'.join(
+        [
+            coverage,
+            ','.join(f'{value:.3f}' for value in coordinates),
+            str(int(round(float(width)))),
+            str(int(round(float(height)))),
+        ]
+    )
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:32]
+
+
+class TerrainCache(FileCache):
+    """Size-bounded LRU cache of terrain model files, see FileCache.
+
+    Args:
+        directory (str): The directory holding the cached files.
+        max_bytes (int): The maximum total size of the cached files.
+    """
+
+    def __init__(self, directory, max_bytes):
+        super().__init__(directory, max_bytes, TERRAIN_FILE_EXTENSION)
+
+
+terrain_cache = TerrainCache(
+    os.getenv('TERRAIN_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'terrain_cache')),
+    int(os.getenv('TERRAIN_CACHE_MAX_BYTES', str(2 * 1024 * 1024 * 1024))),
+)
@@ -0,0 +1,131 @@
+"""
+This module provides a pooled HTTP client streaming terrain models from a WCS to disk.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying, as the service is overloaded or briefly unavailable
+TRANSIENT_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+TRANSIENT_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class WCSError(Exception):
+    """Raised when the WCS does not return a coverage.
+
+    Args:
+        status_code (int): The HTTP status code of the response.
+        message (str): The error message of the service.
+    """
+
+    def __init__(self, status_code, message):
+        super().__init__(f'WCS responded with {status_code}: {message}')
+        self.status_code = status_code
+        self.message = message
+
+
+class WCSClient:
+    """Keep-alive HTTP client downloading coverages in chunks.
+
+    Connections are pooled per host, so repeated downloads skip the TCP and TLS
+    handshakes. Bodies are written to disk as they arrive, so memory use does not grow
+    with the raster size. Transient failures, including connections dropped mid-body,
+    are retried with exponential backoff.
+
+    Args:
+        pool_size (int, optional): Maximum number of pooled connections per host.
+            Defaults to 16.
+        retries (int, optional): Number of retries after a transient failure. Defaults to 3.
+        backoff_seconds (float, optional): Delay before the first retry, doubled for
+            every following retry. Defaults to 0.5.
+        timeout (tuple, optional): Connect and read timeouts in seconds.
+            Defaults to (5, 60).
+        chunk_size (int, optional): Size of the chunks written to disk. Defaults to 1 MiB.
+    """
+
+    def __init__(
+        self,
+        pool_size=16,
+        retries=3,
+        backoff_seconds=0.5,
+        timeout=(5, 60),
+        chunk_size=1024 * 1024,
+    ):
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def download(self, url, params, file_path):
+        """Downloads a coverage to a file.
+
+        Args:
+            url (str): The URL of the WCS.
+            params (dict): The query parameters of the GetCoverage request.
+            file_path (str): The file the coverage is written to.
+
+        Returns:
+            int: The number of bytes written.
+
+        Raises:
+            WCSError: If the service answers with an error.
+            requests.RequestException: If the service stays unreachable.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return self._download_once(url, params, file_path)
+            except WCSError as e:
+                if e.status_code not in TRANSIENT_STATUS_CODES or attempt == self.retries:
+                    raise
+                error = e
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.retries:
+                    raise
+                error = e
+            delay = self.backoff_seconds * 2**attempt
+            logger.warning('Retrying WCS download in %.1f s after: %s', delay, error)
+            time.sleep(delay)
+        raise AssertionError('unreachable')
+
+    def _download_once(self, url, params, file_path):
+        """Streams a single GetCoverage response to the file."""
+        with self.session.get(url, params=params, stream=True, timeout=self.timeout) as response:
+            content_type = response.headers.get('Content-Type', '')
+            # The WCS reports some errors as XML service exceptions with status 200
+            if response.status_code != 200 or 'xml' in content_type:
+                raise WCSError(response.status_code, response.text[:1000])
+
+            written = 0
+            with open(file_path, 'wb') as file:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    file.write(chunk)
+                    written += len(chunk)
+            return written
+
+
+wcs_client = WCSClient(
+    pool_size=int(os.getenv('TERRAIN_HTTP_POOL_SIZE', '16')),
+    retries=int(os.getenv('TERRAIN_HTTP_RETRIES', '3')),
+)
+
+# Downloads run on their own threads, so they neither block the event loop nor use up
+# the threadpool serving the sync endpoints
+download_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('TERRAIN_DOWNLOAD_WORKERS', '16')),
+    thread_name_prefix='terrain-download',
+)
@@ -0,0 +1,139 @@
+"""
+This module compares two quantized-mesh tile sets, e.g. the in-process tiler against
+cesium-terrain-builder.
+
+Usage:
+    python -m terrain.compare <reference_dir> <candidate_dir>
+"""
+
+import argparse
+import gzip
+import json
+import os
+
+import numpy as np
+from terrain.quantized_mesh import decode_tile, dequantize_heights
+
+
+def read_tile(path):
+    """Reads and decodes a tile file, gzipped or not."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    return decode_tile(data)
+
+
+def list_tiles(tile_set_dir):
+    """Returns the (level, x, y) of every tile in a tile set directory."""
+    tiles = set()
+    for directory, _, files in os.walk(tile_set_dir):
+        for file_name in files:
+            if not file_name.endswith('.terrain'):
+                continue
+            relative = os.path.relpath(os.path.join(directory, file_name), tile_set_dir)
+            parts = relative.replace(os.sep, '/').split('/')
+            if len(parts) == 3 and all(part.isdigit() for part in parts[:2]):
+                tiles.add((int(parts[0]), int(parts[1]), int(parts[2][: -len('.terrain')])))
+    return tiles
+
+
+def interpolate(tile, u, v):
+    """Interpolates the heights of a tile's mesh at quantized positions.
+
+    Every position is located in the triangle containing it, so any triangulation,
+    regular or not, is interpolated exactly as rendered.
+
+    Args:
+        tile (dict): A decoded tile.
+        u, v (ndarray): Quantized horizontal positions.
+
+    Returns:
+        ndarray: The heights in meters, NaN where no triangle contains the position.
+    """
+    heights = dequantize_heights(tile)
+    corners = tile['triangles']
+    tu = tile['u'].astype(np.float64)[corners]
+    tv = tile['v'].astype(np.float64)[corners]
+    result = np.full(len(u), np.nan)
+    # Barycentric coordinates relative to the third corner of every triangle
+    du1, dv1 = tu[:, 0] - tu[:, 2], tv[:, 0] - tv[:, 2]
+    du2, dv2 = tu[:, 1] - tu[:, 2], tv[:, 1] - tv[:, 2]
+    denominator = du1 * dv2 - du2 * dv1
+    valid = denominator != 0
+    denominator = np.where(valid, denominator, 1.0)
+    for index, (pu, pv) in enumerate(zip(u.astype(np.float64), v.astype(np.float64))):
+        du, dv = pu - tu[:, 2], pv - tv[:, 2]
+        a = (du * dv2 - du2 * dv) / denominator
+        b = (du1 * dv - du * dv1) / denominator
+        c = 1 - a - b
+        epsilon = 1e-9
+        inside = valid & (a >= -epsilon) & (b >= -epsilon) & (c >= -epsilon)
+        if inside.any():
+            triangle = np.argmax(inside)
+            result[index] = (
+                a[triangle] * heights[corners[triangle, 0]]
+                + b[triangle] * heights[corners[triangle, 1]]
+                + c[triangle] * heights[corners[triangle, 2]]
+            )
+    return result
+
+
+def compare_tilesets(reference_dir, candidate_dir):
+    """Compares the tiles and surface heights of two tile sets.
+
+    The candidate mesh is interpolated at every vertex of the reference tile, so
+    meshes with different triangulations are compared by the surface they render.
+
+    Args:
+        reference_dir (str): The reference tile set, e.g. cesium-terrain-builder output.
+        candidate_dir (str): The tile set to check.
+
+    Returns:
+        dict: The number of compared, missing and extra tiles, and per level and overall
+        the maximum and mean absolute height difference in meters.
+    """
+    reference_tiles = list_tiles(reference_dir)
+    candidate_tiles = list_tiles(candidate_dir)
+    levels = {}
+    for level, x, y in sorted(reference_tiles & candidate_tiles):
+        reference = read_tile(os.path.join(reference_dir, str(level), str(x), f'{y}.terrain'))
+        candidate = read_tile(os.path.join(candidate_dir, str(level), str(x), f'{y}.terrain'))
+        expected = dequantize_heights(reference)
+        actual = interpolate(candidate, reference['u'], reference['v'])
+        errors = np.abs(actual - expected)
+        errors = errors[np.isfinite(errors)]
+        levels.setdefault(level, []).append(errors)
+
+    per_level = {}
+    all_errors = []
+    for level, errors in sorted(levels.items()):
+        errors = np.concatenate(errors)
+        all_errors.append(errors)
+        per_level[level] = {
+            'tiles': len(levels[level]),
+            'max_error': float(errors.max()) if errors.size else 0.0,
+            'mean_error': float(errors.mean()) if errors.size else 0.0,
+        }
+    all_errors = np.concatenate(all_errors) if all_errors else np.zeros(0)
+    return {
+        'tiles_compared': len(reference_tiles & candidate_tiles),
+        'missing_tiles': len(reference_tiles - candidate_tiles),
+        'extra_tiles': len(candidate_tiles - reference_tiles),
+        'max_error': float(all_errors.max()) if all_errors.size else 0.0,
+        'mean_error': float(all_errors.mean()) if all_errors.size else 0.0,
+        'levels': per_level,
+    }
+
+
+def main():
+    """Prints the comparison of two tile sets as JSON."""
+    parser = argparse.ArgumentParser(description='Compare two quantized-mesh tile sets.')
+    parser.add_argument('reference_dir', help='Reference tile set, e.g. ctb-tile output')
+    parser.add_argument('candidate_dir', help='Tile set to compare against the reference')
+    args = parser.parse_args()
+    print(json.dumps(compare_tilesets(args.reference_dir, args.candidate_dir), indent=2))
+
+
+if __name__ == '__main__':
+    main()
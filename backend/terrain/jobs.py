@@ -0,0 +1,320 @@
+"""
+This module provides a background job queue generating terrain tiles from GeoTIFF files.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import docker
+from common.metrics import TERRAIN_TILE_DURATION
+from terrain.tiler import LAYER_FILE, tile_geotiff
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+CTB_IMAGE = 'cesium-terrain-builder'
+# Processes of the in-process tiler per job, all CPUs if unset
+TILER_PROCESSES = int(os.getenv('TERRAIN_TILER_PROCESSES', '0')) or None
+
+# GDAL style progress written by ctb-tile, e.g. "0...10...20 ... 100 - done."
+_PROGRESS_PATTERN = re.compile(r'(\d+)(?:\.\.\.| - done)')
+
+
+def tile_set_id(file_path):
+    """Builds the ID of the tile set generated from a file, equal for the same path.
+
+    Args:
+        file_path (str): Path to the GeoTIFF file.
+
+    Returns:
+        str: A hexadecimal digest of the file path.
+    """
+    return hashlib.sha256(os.path.realpath(file_path).encode('utf-8')).hexdigest()[:32]
+
+
+def tile_job_id(file_path, bbox=None):
+    """Builds the ID of the job tiling a file, equal for identical input files.
+
+    Args:
+        file_path (str): Path to the GeoTIFF file.
+        bbox (tuple, optional): The area to regenerate. Defaults to the whole file.
+
+    Returns:
+        str: A hexadecimal digest of the file path, size, modification time and bbox.
+    """
+    stat = os.stat(file_path)
+    identity = f'{os.path.realpath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{bbox}'
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]
+
+
+class TileJob:
+    """State of a single tiling job.
+
+    Args:
+        job_id (str): The ID of the job.
+        file_path (str): Path to the GeoTIFF file.
+        output_dir (str): Directory the tiles are written to.
+        tile_set_url (str): URL the tiles are served from once done.
+        bbox (tuple, optional): West, south, east and north edges in degrees of the
+            area to regenerate. Defaults to None, tiling the whole file.
+    """
+
+    def __init__(self, job_id, file_path, output_dir, tile_set_url, bbox=None):
+        self.job_id = job_id
+        self.file_path = file_path
+        self.bbox = bbox
+        self.output_dir = output_dir
+        self.tile_set_url = tile_set_url
+        self.status = QUEUED
+        self.stage = None
+        self.progress = 0.0
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        """Returns the public state of the job.
+
+        Returns:
+            dict: The status, progress and, once done, the tileSetUrl of the job.
+        """
+        state = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'stage': self.stage,
+            'bbox': list(self.bbox) if self.bbox is not None else None,
+            'progress': round(self.progress, 3),
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.status == DONE:
+            state['tileSetUrl'] = self.tile_set_url
+        return state
+
+
+def run_ctb_tile(job, report_progress):
+    """Generates the terrain tiles and layer.json of a job with cesium-terrain-builder.
+
+    Both ctb-tile invocations run in a single container, so the container is only
+    started once per job. ctb-tile cannot regenerate part of a tile set, so the bbox
+    of the job is ignored.
+
+    Args:
+        job (TileJob): The job to run.
+        report_progress (callable): Called as report_progress(stage, fraction).
+
+    Raises:
+        RuntimeError: If the container exits with an error.
+    """
+    input_file = f'/data/input/{os.path.basename(job.file_path)}'
+    command = (
+        f'ctb-tile -f Mesh -C -N -o /data/output {input_file} && '
+        f'ctb-tile -f Mesh -C -N -l -o /data/output {input_file}'
+    )
+    client = docker.from_env()
+    container = client.containers.run(
+        CTB_IMAGE,
+        ['sh', '-c', command],
+        volumes={
+            os.path.dirname(os.path.abspath(job.file_path)): {
+                'bind': '/data/input',
+                'mode': 'rw',
+            },
+            job.output_dir: {'bind': '/data/output', 'mode': 'rw'},
+        },
+        detach=True,
+    )
+    try:
+        stage, stages = 'tiles', {'tiles': (0.0, 0.95), 'layer': (0.95, 1.0)}
+        for line in container.logs(stream=True, follow=True):
+            for match in _PROGRESS_PATTERN.finditer(line.decode('utf-8', errors='replace')):
+                start, end = stages[stage]
+                report_progress(stage, start + (end - start) * int(match.group(1)) / 100)
+                if match.group(0).endswith('done') and stage == 'tiles':
+                    stage = 'layer'
+
+        result = container.wait()
+        if result['StatusCode'] != 0:
+            logs = container.logs(tail=20).decode('utf-8', errors='replace')
+            raise RuntimeError(f'ctb-tile exited with code {result["StatusCode"]}: {logs}')
+    finally:
+        container.remove(force=True)
+
+
+def run_quantized_mesh_tiler(job, report_progress):
+    """Generates the terrain tiles and layer.json of a job in-process.
+
+    Args:
+        job (TileJob): The job to run.
+        report_progress (callable): Called as report_progress(stage, fraction).
+    """
+    tile_geotiff(
+        job.file_path,
+        job.output_dir,
+        bbox=job.bbox,
+        processes=TILER_PROCESSES,
+        progress=lambda fraction: report_progress('tiles', fraction),
+    )
+
+
+TILERS = {
+    'native': run_quantized_mesh_tiler,
+    'ctb': run_ctb_tile,
+}
+
+
+class TileJobManager:
+    """Runs tiling jobs on a bounded pool of workers.
+
+    Identical jobs are deduplicated: submitting a file which is queued, running or
+    already tiled returns the existing job instead of starting a new one. Every file
+    path has its own tile set directory, and jobs writing the same tile set run one
+    after another. Finished jobs are forgotten after `retention_seconds`, as every new
+    version of a file or bbox adds a job.
+
+    Args:
+        output_root (str): Directory containing one tile set directory per file.
+        tileset_base_url (str): URL the output root is served from.
+        max_workers (int, optional): Number of jobs running at the same time. Defaults to 2.
+        run_job (callable, optional): Function called as run_job(job, report_progress)
+            generating the tiles. Defaults to run_quantized_mesh_tiler.
+        retention_seconds (float, optional): Time a finished or failed job can still be
+            looked up. Defaults to 3600.
+    """
+
+    def __init__(
+        self,
+        output_root,
+        tileset_base_url,
+        max_workers=2,
+        run_job=run_quantized_mesh_tiler,
+        retention_seconds=3600.0,
+    ):
+        self.output_root = output_root
+        self.tileset_base_url = tileset_base_url.rstrip('/')
+        self.run_job = run_job
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='terrain-tiles'
+        )
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._tile_set_locks = {}
+
+    def submit(self, file_path, bbox=None):
+        """Queues the tiling of a GeoTIFF file.
+
+        Args:
+            file_path (str): Path to the GeoTIFF file.
+            bbox (tuple, optional): West, south, east and north edges in degrees. If
+                given, only the tiles intersecting it are regenerated. Defaults to None.
+
+        Returns:
+            TileJob: The new job, or the existing job for the same file and bbox.
+        """
+        job_id = tile_job_id(file_path, bbox)
+        set_id = tile_set_id(file_path)
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != FAILED:
+                return job
+
+            job = TileJob(
+                job_id,
+                file_path,
+                os.path.join(self.output_root, set_id),
+                f'{self.tileset_base_url}/{set_id}',
+                bbox,
+            )
+            self._jobs[job_id] = job
+            self._tile_set_locks.setdefault(job.output_dir, threading.Lock())
+
+            # Tiles generated from the current file before a restart are reused
+            layer_path = os.path.join(job.output_dir, LAYER_FILE)
+            if (
+                bbox is None
+                and os.path.exists(layer_path)
+                and os.path.getmtime(layer_path) >= os.path.getmtime(file_path)
+            ):
+                job.status, job.progress = DONE, 1.0
+                job.finished_at = job.created_at
+                return job
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """Returns the job with the given ID, or None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self):
+        """Stops accepting jobs and cancels the queued ones."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _prune(self):
+        """Forgets jobs finished longer than retention_seconds ago. Requires the lock."""
+        expired = time.time() - self.retention_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and job.finished_at <= expired:
+                del self._jobs[job_id]
+        # Queued and running jobs are kept, so no lock in use is removed
+        in_use = {job.output_dir for job in self._jobs.values()}
+        for output_dir in list(self._tile_set_locks):
+            if output_dir not in in_use:
+                del self._tile_set_locks[output_dir]
+
+    def _run(self, job):
+        """Runs a job on a worker thread and records its outcome."""
+
+        def report_progress(stage, progress):
+            job.stage = stage
+            job.progress = max(job.progress, progress)
+
+        with self._tile_set_locks[job.output_dir]:
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                os.makedirs(job.output_dir, exist_ok=True)
+                self.run_job(job, report_progress)
+                if not os.path.exists(os.path.join(job.output_dir, LAYER_FILE)):
+                    raise RuntimeError('layer.json not found after tiling')
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error('Terrain tile job %s failed: %s', job.job_id, e)
+                job.error = str(e)
+                job.status = FAILED
+            else:
+                logger.info(
+                    'Terrain tile job %s finished in %.1f s',
+                    job.job_id,
+                    time.time() - job.started_at,
+                )
+                job.progress = 1.0
+                job.status = DONE
+            finally:
+                job.finished_at = time.time()
+                TERRAIN_TILE_DURATION.labels(
+                    getattr(self.run_job, '__name__', 'custom'), job.status
+                ).observe(job.finished_at - job.started_at)
+
+
+tile_jobs = TileJobManager(
+    os.getenv('TERRAIN_OUTPUT_DIR', 'C:/docker/terrain/output'),
+    os.getenv('TILESET_BASE_URL', 'http://localhost:8080/tilesets/output'),
+    max_workers=int(os.getenv('TERRAIN_TILE_WORKERS', '2')),
+    run_job=TILERS[os.getenv('TERRAIN_TILER', 'native')],
+    retention_seconds=float(os.getenv('TERRAIN_JOB_RETENTION_SECONDS', '3600')),
+)
@@ -0,0 +1,201 @@
+"""
+This module fetches terrain areas larger than the WCS size limit as a grid of pieces and
+mosaics them into a single tiled GeoTIFF.
+"""
+
+import logging
+import math
+import os
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from common.projection import WGS84, get_transformer
+
+try:
+    import rasterio
+    from rasterio.enums import Resampling
+    from rasterio.transform import from_bounds
+    from rasterio.windows import Window
+except ImportError:  # pragma: no cover - optional dependency
+    rasterio = None
+
+logger = logging.getLogger(__name__)
+
+# Internal tile size of the mosaic, and the number of rows copied per window
+BLOCK_SIZE = 256
+OVERVIEW_FACTORS = (2, 4, 8, 16)
+
+MosaicPiece = namedtuple('MosaicPiece', ['bbox', 'col_off', 'row_off', 'width', 'height'])
+
+
+def geographic_bounds(bbox, source_crs):
+    """Returns the WGS84 bounds enclosing a bounding box in another reference system.
+
+    Args:
+        bbox (str): Comma separated min x, min y, max x and max y.
+        source_crs (str): The reference system of the bounding box.
+
+    Returns:
+        tuple: The west, south, east and north edges in degrees.
+    """
+    min_x, min_y, max_x, max_y = (float(value) for value in bbox.split(','))
+    return get_transformer(source_crs, WGS84).transform_bounds(
+        min_x, min_y, max_x, max_y, densify_pts=21
+    )
+
+
+def plan_mosaic(bounds, width, height, max_size):
+    """Splits a raster grid into pieces of at most max_size pixels along each side.
+
+    The pieces share the pixel grid of the whole raster, so they can be pasted into it
+    without resampling.
+
+    Args:
+        bounds (tuple): The west, south, east and north edges of the raster.
+        width (int): The width of the raster in pixels.
+        height (int): The height of the raster in pixels.
+        max_size (int): The maximum width and height of a piece.
+
+    Returns:
+        list: The MosaicPiece of every piece, row by row from the north-west.
+    """
+    west, south, east, north = bounds
+    pixel_width = (east - west) / width
+    pixel_height = (north - south) / height
+
+    def split(size):
+        count = math.ceil(size / max_size)
+        edges = [round(size * index / count) for index in range(count + 1)]
+        return list(zip(edges[:-1], edges[1:]))
+
+    pieces = []
+    for row_start, row_end in split(height):
+        for col_start, col_end in split(width):
+            piece_bbox = (
+                west + col_start * pixel_width,
+                north - row_end * pixel_height,
+                west + col_end * pixel_width,
+                north - row_start * pixel_height,
+            )
+            pieces.append(
+                MosaicPiece(
+                    piece_bbox, col_start, row_start, col_end - col_start, row_end - row_start
+                )
+            )
+    return pieces
+
+
+def _copy_piece(piece, piece_path, mosaic):
+    """Copies a downloaded piece into its window of the mosaic, a block of rows at a time."""
+    with rasterio.open(piece_path) as source:
+        if (source.width, source.height) != (piece.width, piece.height):
+            raise ValueError(
+                f'WCS returned {source.width}x{source.height} pixels '
+                f'instead of {piece.width}x{piece.height}'
+            )
+        for row in range(0, piece.height, BLOCK_SIZE):
+            rows = min(BLOCK_SIZE, piece.height - row)
+            data = source.read(1, window=Window(0, row, piece.width, rows))
+            mosaic.write(
+                data.astype(mosaic.dtypes[0], copy=False),
+                1,
+                window=Window(piece.col_off, piece.row_off + row, piece.width, rows),
+            )
+
+
+def fetch_mosaic(download, bounds, width, height, file_path, max_size, concurrency=4):
+    """Fetches a raster larger than the WCS limit and writes it as one tiled GeoTIFF.
+
+    The pieces are downloaded concurrently, at most `concurrency` at a time, and each is
+    pasted into the mosaic as soon as it arrives and then deleted. Only a block of rows
+    of one piece is held in memory at a time. The mosaic is tiled, compressed and gets
+    overviews, so windowed and decimated reads stay cheap.
+
+    Args:
+        download (callable): Called as download(bbox, width, height, file_path) writing
+            the GeoTIFF of a piece, with bbox as west, south, east and north in degrees.
+        bounds (tuple): The west, south, east and north edges of the mosaic in degrees.
+        width (int): The width of the mosaic in pixels.
+        height (int): The height of the mosaic in pixels.
+        file_path (str): The file the mosaic is written to.
+        max_size (int): The maximum width and height of a single request.
+        concurrency (int, optional): Maximum number of concurrent downloads. Defaults to 4.
+
+    Returns:
+        int: The number of pieces fetched.
+
+    Raises:
+        RuntimeError: If rasterio is not installed.
+        ValueError: If the WCS returns a piece of the wrong size.
+    """
+    if rasterio is None:
+        raise RuntimeError('rasterio is required for mosaicking terrain models')
+
+    pieces = plan_mosaic(bounds, width, height, max_size)
+    logger.info(
+        'Fetching %dx%d terrain model as %d pieces, %d at a time',
+        width,
+        height,
+        len(pieces),
+        concurrency,
+    )
+    mosaic = None
+    with tempfile.TemporaryDirectory(
+        dir=os.path.dirname(os.path.abspath(file_path)), prefix='.mosaic-'
+    ) as directory, ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix='terrain-mosaic'
+    ) as executor:
+        futures = {}
+        for index, piece in enumerate(pieces):
+            piece_path = os.path.join(directory, f'{index}.tif')
+            future = executor.submit(
+                download, piece.bbox, piece.width, piece.height, piece_path
+            )
+            futures[future] = (piece, piece_path)
+
+        try:
+            # Pieces are pasted on this thread only, as datasets are not thread-safe
+            for future in as_completed(futures):
+                future.result()
+                piece, piece_path = futures[future]
+                if mosaic is None:
+                    mosaic = _create_mosaic(piece_path, bounds, width, height, file_path)
+                _copy_piece(piece, piece_path, mosaic)
+                os.remove(piece_path)
+            mosaic.build_overviews(
+                [factor for factor in OVERVIEW_FACTORS if factor < max(width, height)],
+                Resampling.average,
+            )
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            if mosaic is not None:
+                mosaic.close()
+    return len(pieces)
+
+
+def _create_mosaic(template_path, bounds, width, height, file_path):
+    """Creates the tiled mosaic GeoTIFF with the data type and nodata of a piece."""
+    with rasterio.open(template_path) as template:
+        dtype = template.dtypes[0]
+        nodata = template.nodata
+    return rasterio.open(
+        file_path,
+        'w',
+        driver='GTiff',
+        width=width,
+        height=height,
+        count=1,
+        dtype=dtype,
+        nodata=nodata,
+        crs=WGS84,
+        transform=from_bounds(*bounds, width, height),
+        tiled=True,
+        blockxsize=BLOCK_SIZE,
+        blockysize=BLOCK_SIZE,
+        compress='deflate',
+        BIGTIFF='IF_SAFER',
+    )
@@ -0,0 +1,365 @@
+"""
+This module encodes and decodes terrain tiles in the Cesium quantized-mesh-1.0 format.
+"""
+
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+# WGS84 ellipsoid radii in meters
+WGS84_RADII = np.array([6378137.0, 6378137.0, 6356752.3142451793])
+WGS84_ECCENTRICITY_SQUARED = 0.00669437999014
+
+QUANTIZED_MAX = 32767
+OCT_VERTEX_NORMALS = 1
+OCCLUSION_FALLBACK = 1e6
+
+_HEADER = struct.Struct('<3d2f4d3d')
+
+
+def geodetic_to_ecef(lons, lats, heights):
+    """Converts geodetic WGS84 coordinates to earth-centered, earth-fixed coordinates.
+
+    Args:
+        lons (ndarray): Longitudes in degrees.
+        lats (ndarray): Latitudes in degrees.
+        heights (ndarray): Ellipsoidal heights in meters.
+
+    Returns:
+        ndarray: An (n, 3) array of ECEF coordinates in meters.
+    """
+    lon = np.radians(lons)
+    lat = np.radians(lats)
+    sin_lat = np.sin(lat)
+    normal_radius = WGS84_RADII[0] / np.sqrt(1 - WGS84_ECCENTRICITY_SQUARED * sin_lat**2)
+    return np.column_stack(
+        (
+            (normal_radius + heights) * np.cos(lat) * np.cos(lon),
+            (normal_radius + heights) * np.cos(lat) * np.sin(lon),
+            (normal_radius * (1 - WGS84_ECCENTRICITY_SQUARED) + heights) * sin_lat,
+        )
+    )
+
+
+def zigzag_delta_encode(values):
+    """Encodes values as zig-zag encoded differences to the previous value."""
+    deltas = np.diff(values.astype(np.int32), prepend=0)
+    return np.where(deltas >= 0, deltas * 2, -deltas * 2 - 1).astype(np.uint16)
+
+
+def zigzag_delta_decode(values):
+    """Decodes zig-zag encoded differences back into values."""
+    values = values.astype(np.int32)
+    deltas = (values >> 1) ^ -(values & 1)
+    return np.cumsum(deltas).astype(np.uint16)
+
+
+def high_water_mark_encode(indices):
+    """Encodes triangle indices relative to the highest index seen so far.
+
+    The vertices must be ordered by their first use in the index list, see
+    order_by_first_use.
+    """
+    indices = indices.astype(np.int64)
+    highest = np.concatenate(([0], np.maximum.accumulate(indices)[:-1] + 1))
+    return highest - indices
+
+
+def high_water_mark_decode(encoded):
+    """Decodes high water mark encoded triangle indices."""
+    encoded = encoded.astype(np.int64)
+    highest = np.concatenate(([0], np.cumsum(encoded == 0)[:-1]))
+    return highest - encoded
+
+
+def order_by_first_use(indices, vertex_count):
+    """Returns the vertex order in which every vertex is first used by the index list.
+
+    Args:
+        indices (ndarray): Flat triangle indices.
+        vertex_count (int): The number of vertices.
+
+    Returns:
+        ndarray: The old vertex index of every new vertex index.
+    """
+    _, first_use = np.unique(indices, return_index=True)
+    used = indices[np.sort(first_use)]
+    unused = np.setdiff1d(np.arange(vertex_count), used, assume_unique=True)
+    return np.concatenate((used, unused))
+
+
+def oct_encode(normals):
+    """Encodes unit vectors into two bytes each with the octahedron encoding.
+
+    Args:
+        normals (ndarray): An (n, 3) array of unit vectors.
+
+    Returns:
+        ndarray: An (n, 2) array of uint8.
+    """
+    projected = normals / np.abs(normals).sum(axis=1, keepdims=True)
+    x, y, z = projected[:, 0], projected[:, 1], projected[:, 2]
+    sign_x = np.where(x >= 0, 1.0, -1.0)
+    sign_y = np.where(y >= 0, 1.0, -1.0)
+    folded_x = np.where(z < 0, (1 - np.abs(y)) * sign_x, x)
+    folded_y = np.where(z < 0, (1 - np.abs(x)) * sign_y, y)
+    encoded = np.column_stack((folded_x, folded_y))
+    return np.round((np.clip(encoded, -1, 1) * 0.5 + 0.5) * 255).astype(np.uint8)
+
+
+def oct_decode(encoded):
+    """Decodes octahedron encoded normals into unit vectors."""
+    x = encoded[:, 0] / 255 * 2 - 1
+    y = encoded[:, 1] / 255 * 2 - 1
+    z = 1 - np.abs(x) - np.abs(y)
+    folded_x = np.where(z < 0, (1 - np.abs(y)) * np.where(x >= 0, 1.0, -1.0), x)
+    folded_y = np.where(z < 0, (1 - np.abs(x)) * np.where(y >= 0, 1.0, -1.0), y)
+    normals = np.column_stack((folded_x, folded_y, z))
+    return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+
+def horizon_occlusion_point(positions, center):
+    """Computes the horizon occlusion point of a tile in ellipsoid-scaled space.
+
+    Args:
+        positions (ndarray): An (n, 3) array of ECEF vertex positions.
+        center (ndarray): The ECEF center of the tile.
+
+    Returns:
+        ndarray: The occlusion point, scaled by the inverse ellipsoid radii.
+    """
+    direction = center / WGS84_RADII
+    direction /= np.linalg.norm(direction)
+    scaled = positions / WGS84_RADII
+    magnitude_squared = np.einsum('ij,ij->i', scaled, scaled)
+    magnitude = np.sqrt(magnitude_squared)
+    unit = scaled / magnitude[:, None]
+    magnitude_squared = np.maximum(magnitude_squared, 1.0)
+    magnitude = np.maximum(magnitude, 1.0)
+    cos_alpha = unit @ direction
+    sin_alpha = np.linalg.norm(np.cross(unit, direction), axis=1)
+    cos_beta = 1.0 / magnitude
+    sin_beta = np.sqrt(magnitude_squared - 1.0) * cos_beta
+    denominator = cos_alpha * cos_beta - sin_alpha * sin_beta
+    if np.any(denominator <= 0):
+        # Vertices beyond the horizon of the center, e.g. in the level 0 tiles: place
+        # the point far out, so the tile is never culled
+        return direction * OCCLUSION_FALLBACK
+    return direction * np.max(1.0 / denominator)
+
+
+def grid_triangles(grid_size):
+    """Returns the counter-clockwise triangles of a regular grid of vertices.
+
+    Vertices are numbered row by row from the south-west corner.
+
+    Args:
+        grid_size (int): The number of vertices along each side.
+
+    Returns:
+        ndarray: An (n, 3) array of vertex indices.
+    """
+    rows, cols = np.meshgrid(np.arange(grid_size - 1), np.arange(grid_size - 1), indexing='ij')
+    south_west = (rows * grid_size + cols).ravel()
+    south_east = south_west + 1
+    north_west = south_west + grid_size
+    north_east = north_west + 1
+    return np.column_stack(
+        (south_west, south_east, north_west, south_east, north_east, north_west)
+    ).reshape(-1, 3)
+
+
+def vertex_normals(positions, triangles):
+    """Computes area weighted vertex normals of a mesh.
+
+    Args:
+        positions (ndarray): An (n, 3) array of ECEF vertex positions.
+        triangles (ndarray): An (m, 3) array of vertex indices.
+
+    Returns:
+        ndarray: An (n, 3) array of unit normals.
+    """
+    corners = positions[triangles]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    vertex_index = triangles.ravel()
+    normals = np.column_stack(
+        [
+            np.bincount(vertex_index, np.repeat(face_normals[:, axis], 3), len(positions))
+            for axis in range(3)
+        ]
+    )
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    # Vertices without any triangle get the ellipsoid normal
+    fallback = positions / WGS84_RADII**2
+    normals = np.where(lengths > 0, normals / np.where(lengths > 0, lengths, 1), fallback)
+    return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+
+@lru_cache(maxsize=8)
+def grid_layout(grid_size):
+    """Returns the vertex order, triangles and edges shared by all tiles of a grid size.
+
+    Vertices are reordered by their first use in the triangles, as required by the
+    high water mark encoding.
+
+    Args:
+        grid_size (int): The number of vertices along each side.
+
+    Returns:
+        tuple: The grid index of every vertex, the u and v positions from 0 to 1, the
+        triangles and the west, south, east and north edge vertices.
+    """
+    steps = np.linspace(0, 1, grid_size)
+    v_grid, u_grid = np.meshgrid(steps, steps, indexing='ij')
+    triangles = grid_triangles(grid_size)
+
+    order = order_by_first_use(triangles.ravel(), grid_size * grid_size)
+    new_index = np.empty_like(order)
+    new_index[order] = np.arange(len(order))
+    grid_index = new_index.reshape(grid_size, grid_size)
+    edges = (
+        grid_index[:, 0],  # west
+        grid_index[0, :],  # south
+        grid_index[:, -1],  # east
+        grid_index[-1, :],  # north
+    )
+    layout = (order, u_grid.ravel()[order], v_grid.ravel()[order], new_index[triangles], edges)
+    for array in (*layout[:4], *edges):
+        array.flags.writeable = False
+    return layout
+
+
+def encode_grid_tile(heights, west, south, east, north, normals=True):
+    """Encodes a regular grid of heights as a quantized-mesh tile.
+
+    Args:
+        heights (ndarray): A square (n, n) array of heights in meters, with row 0 at
+            the southern edge and column 0 at the western edge.
+        west, south, east, north (float): The bounds of the tile in degrees.
+        normals (bool, optional): Add the oct-encoded vertex normals extension.
+            Defaults to True.
+
+    Returns:
+        bytes: The uncompressed tile.
+    """
+    order, u, v, triangles, edges = grid_layout(heights.shape[0])
+    heights = heights.ravel().astype(np.float64)[order]
+    positions = geodetic_to_ecef(
+        west + u * (east - west), south + v * (north - south), heights
+    )
+    normal_vectors = vertex_normals(positions, triangles) if normals else None
+    return encode_tile(u, v, heights, triangles, edges, positions, normal_vectors)
+
+
+def encode_tile(u, v, heights, triangles, edges, positions, normals=None):
+    """Encodes a mesh as a quantized-mesh tile.
+
+    Args:
+        u, v (ndarray): Horizontal vertex positions within the tile, from 0 to 1.
+        heights (ndarray): Vertex heights in meters.
+        triangles (ndarray): An (m, 3) array of vertex indices, ordered by first use.
+        edges (tuple): The vertex indices on the west, south, east and north edges.
+        positions (ndarray): An (n, 3) array of ECEF vertex positions.
+        normals (ndarray, optional): An (n, 3) array of unit vertex normals.
+
+    Returns:
+        bytes: The uncompressed tile.
+    """
+    min_height = float(heights.min())
+    max_height = float(heights.max())
+    height_range = max_height - min_height
+    if height_range > 0:
+        quantized_heights = np.round((heights - min_height) / height_range * QUANTIZED_MAX)
+    else:
+        quantized_heights = np.zeros_like(heights)
+
+    low = positions.min(axis=0)
+    high = positions.max(axis=0)
+    center = (low + high) / 2
+    radius = float(np.max(np.linalg.norm(positions - center, axis=1)))
+    occlusion = horizon_occlusion_point(positions, center)
+
+    vertex_count = len(u)
+    parts = [
+        _HEADER.pack(*center, min_height, max_height, *center, radius, *occlusion),
+        struct.pack('<I', vertex_count),
+    ]
+    for values in (u, v):
+        parts.append(zigzag_delta_encode(np.round(values * QUANTIZED_MAX)).tobytes())
+    parts.append(zigzag_delta_encode(quantized_heights).tobytes())
+
+    index_type = np.uint32 if vertex_count > 65536 else np.uint16
+    if index_type is np.uint32:
+        # 32 bit indices are aligned to four bytes
+        offset = sum(len(part) for part in parts)
+        parts.append(b'\0' * (-offset % 4))
+    parts.append(struct.pack('<I', len(triangles)))
+    parts.append(high_water_mark_encode(triangles.ravel()).astype(index_type).tobytes())
+    for edge in edges:
+        parts.append(struct.pack('<I', len(edge)))
+        parts.append(np.asarray(edge).astype(index_type).tobytes())
+
+    if normals is not None:
+        encoded_normals = oct_encode(normals).tobytes()
+        parts.append(struct.pack('<BI', OCT_VERTEX_NORMALS, len(encoded_normals)))
+        parts.append(encoded_normals)
+    return b''.join(parts)
+
+
+def decode_tile(data):
+    """Decodes a quantized-mesh tile.
+
+    Args:
+        data (bytes): The uncompressed tile.
+
+    Returns:
+        dict: The header values, the quantized u, v and height values, the triangle
+        indices, the edge indices and, if present, the vertex normals.
+    """
+    values = _HEADER.unpack_from(data, 0)
+    tile = {
+        'center': values[0:3],
+        'min_height': values[3],
+        'max_height': values[4],
+        'bounding_sphere_center': values[5:8],
+        'bounding_sphere_radius': values[8],
+        'horizon_occlusion_point': values[9:12],
+    }
+    offset = _HEADER.size
+    (vertex_count,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    for name in ('u', 'v', 'height'):
+        encoded = np.frombuffer(data, dtype=np.uint16, count=vertex_count, offset=offset)
+        tile[name] = zigzag_delta_decode(encoded)
+        offset += vertex_count * 2
+
+    index_type = np.uint32 if vertex_count > 65536 else np.uint16
+    index_size = np.dtype(index_type).itemsize
+    offset += -offset % index_size
+    (triangle_count,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    encoded = np.frombuffer(data, dtype=index_type, count=triangle_count * 3, offset=offset)
+    tile['triangles'] = high_water_mark_decode(encoded).reshape(-1, 3)
+    offset += triangle_count * 3 * index_size
+
+    for name in ('west', 'south', 'east', 'north'):
+        (count,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        tile[name] = np.frombuffer(data, dtype=index_type, count=count, offset=offset)
+        offset += count * index_size
+
+    while offset < len(data):
+        extension_id, length = struct.unpack_from('<BI', data, offset)
+        offset += 5
+        if extension_id == OCT_VERTEX_NORMALS:
+            encoded = np.frombuffer(data, dtype=np.uint8, count=length, offset=offset)
+            tile['normals'] = oct_decode(encoded.reshape(-1, 2))
+        offset += length
+    return tile
+
+
+def dequantize_heights(tile):
+    """Returns the heights of a decoded tile in meters."""
+    height_range = tile['max_height'] - tile['min_height']
+    return tile['min_height'] + tile['height'].astype(np.float64) / QUANTIZED_MAX * height_range
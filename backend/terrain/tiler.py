@@ -0,0 +1,350 @@
+"""
+This module generates Cesium quantized-mesh terrain tiles from GeoTIFF files in-process.
+"""
+
+import gzip
+import json
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from terrain.quantized_mesh import encode_grid_tile
+
+try:
+    import rasterio
+    from rasterio.enums import Resampling
+    from rasterio.windows import Window
+except ImportError:  # pragma: no cover - optional dependency
+    rasterio = None
+
+logger = logging.getLogger(__name__)
+
+# Vertices along each side of a tile, as used by cesium-terrain-builder
+GRID_SIZE = 65
+# Windows covering more pixels than this per tile vertex are read decimated
+MAX_PIXELS_PER_VERTEX = 4
+TILES_PER_TASK = 32
+
+LAYER_FILE = 'layer.json'
+
+
+class ArrayRaster:
+    """A single band raster held in memory, in geographic coordinates.
+
+    Args:
+        array (ndarray): The heights, with row 0 at the northern edge.
+        transform (tuple): The west and north edges of the raster and the width and
+            (negative) height of a pixel in degrees.
+        nodata (float, optional): The value of pixels without data. Defaults to None.
+    """
+
+    def __init__(self, array, transform, nodata=None):
+        self.array = np.asarray(array)
+        self.transform = transform
+        self.nodata = nodata
+        self.height, self.width = self.array.shape
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def read(self, row_off, col_off, rows, cols, out_shape=None):
+        """Reads a window of pixels, decimated to out_shape if given."""
+        window = self.array[row_off : row_off + rows, col_off : col_off + cols]
+        if out_shape is not None:
+            row_index = ((np.arange(out_shape[0]) + 0.5) * rows / out_shape[0]).astype(int)
+            col_index = ((np.arange(out_shape[1]) + 0.5) * cols / out_shape[1]).astype(int)
+            window = window[np.ix_(row_index, col_index)]
+        return window.astype(np.float64)
+
+
+class GeoTiffRaster:
+    """The first band of a GeoTIFF file in EPSG:4326, read window by window.
+
+    Args:
+        path (str): Path to the GeoTIFF file.
+
+    Raises:
+        RuntimeError: If rasterio is not installed.
+        ValueError: If the raster is not in geographic WGS84 coordinates.
+    """
+
+    def __init__(self, path):
+        if rasterio is None:
+            raise RuntimeError('rasterio is required for reading GeoTIFF files')
+        self._dataset = rasterio.open(path)
+        if self._dataset.crs is not None and self._dataset.crs.to_epsg() != 4326:
+            self._dataset.close()
+            raise ValueError(f'GeoTIFF {path} is not in EPSG:4326')
+        affine = self._dataset.transform
+        self.transform = (affine.c, affine.f, affine.a, affine.e)
+        self.nodata = self._dataset.nodata
+        self.width = self._dataset.width
+        self.height = self._dataset.height
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._dataset.close()
+        return False
+
+    def read(self, row_off, col_off, rows, cols, out_shape=None):
+        """Reads a window of pixels, resampled to out_shape if given."""
+        return self._dataset.read(
+            1,
+            window=Window(col_off, row_off, cols, rows),
+            out_shape=out_shape,
+            resampling=Resampling.bilinear,
+            out_dtype='float64',
+        )
+
+
+def open_raster(source):
+    """Opens a raster from a file path, or returns a raster object as is."""
+    if isinstance(source, str):
+        return GeoTiffRaster(source)
+    return source
+
+
+def raster_bounds(raster):
+    """Returns the west, south, east and north edges of a raster in degrees."""
+    west, north, pixel_width, pixel_height = raster.transform
+    east = west + pixel_width * raster.width
+    south = north + pixel_height * raster.height
+    return west, south, east, north
+
+
+def tile_bounds(level, x, y):
+    """Returns the bounds of a tile in the geographic TMS tiling scheme used by Cesium.
+
+    Level 0 consists of two tiles, and y counts from the south.
+    """
+    size = 180.0 / 2**level
+    west = -180.0 + x * size
+    south = -90.0 + y * size
+    return west, south, west + size, south + size
+
+
+def tile_range(level, bounds):
+    """Returns the first and last x and y of the tiles of a level intersecting the bounds."""
+    west, south, east, north = bounds
+    size = 180.0 / 2**level
+    columns, rows = 2 ** (level + 1), 2**level
+    start_x = min(max(math.floor((west + 180.0) / size), 0), columns - 1)
+    start_y = min(max(math.floor((south + 90.0) / size), 0), rows - 1)
+    end_x = min(max(math.ceil((east + 180.0) / size) - 1, start_x), columns - 1)
+    end_y = min(max(math.ceil((north + 90.0) / size) - 1, start_y), rows - 1)
+    return start_x, start_y, end_x, end_y
+
+
+def max_level_for(raster, grid_size=GRID_SIZE):
+    """Returns the deepest level whose tiles still have vertices at most a pixel apart."""
+    _, _, pixel_width, pixel_height = raster.transform
+    resolution = max(abs(pixel_width), abs(pixel_height))
+    return max(0, math.ceil(math.log2(180.0 / ((grid_size - 1) * resolution))))
+
+
+def sample_heights(raster, bounds, grid_size=GRID_SIZE):
+    """Samples a regular grid of heights over the bounds from a window of the raster.
+
+    Heights are bilinearly interpolated between pixel centers. Samples outside the
+    raster and pixels without data are at height 0.
+
+    Args:
+        raster: The raster to read from.
+        bounds (tuple): The west, south, east and north edges in degrees.
+        grid_size (int, optional): The number of samples along each side.
+
+    Returns:
+        ndarray: A (grid_size, grid_size) array, with row 0 at the southern edge.
+    """
+    west, south, east, north = bounds
+    origin_x, origin_y, pixel_width, pixel_height = raster.transform
+    cols = (np.linspace(west, east, grid_size) - origin_x) / pixel_width - 0.5
+    rows = (np.linspace(south, north, grid_size) - origin_y) / pixel_height - 0.5
+    inside = np.outer(
+        (rows >= -0.5) & (rows <= raster.height - 0.5),
+        (cols >= -0.5) & (cols <= raster.width - 0.5),
+    )
+    if not inside.any():
+        return np.zeros((grid_size, grid_size))
+
+    cols = np.clip(cols, 0, raster.width - 1)
+    rows = np.clip(rows, 0, raster.height - 1)
+    col_off, row_off = int(cols.min()), int(rows.min())
+    window_cols = min(int(cols.max()) + 2, raster.width) - col_off
+    window_rows = min(int(rows.max()) + 2, raster.height) - row_off
+
+    out_shape = None
+    max_pixels = MAX_PIXELS_PER_VERTEX * grid_size
+    if window_cols > max_pixels or window_rows > max_pixels:
+        out_shape = (min(window_rows, max_pixels), min(window_cols, max_pixels))
+    window = raster.read(row_off, col_off, window_rows, window_cols, out_shape)
+    if raster.nodata is not None:
+        window[window == raster.nodata] = 0.0
+    window[~np.isfinite(window)] = 0.0
+
+    # Pixel coordinates within the (possibly decimated) window
+    local_rows = (rows - row_off + 0.5) * window.shape[0] / window_rows - 0.5
+    local_cols = (cols - col_off + 0.5) * window.shape[1] / window_cols - 0.5
+    row0 = np.clip(np.floor(local_rows).astype(int), 0, max(window.shape[0] - 2, 0))
+    col0 = np.clip(np.floor(local_cols).astype(int), 0, max(window.shape[1] - 2, 0))
+    row1 = np.minimum(row0 + 1, window.shape[0] - 1)
+    col1 = np.minimum(col0 + 1, window.shape[1] - 1)
+    fy = np.clip(local_rows - row0, 0, 1)[:, None]
+    fx = np.clip(local_cols - col0, 0, 1)[None, :]
+
+    top = window[np.ix_(row0, col0)] * (1 - fx) + window[np.ix_(row0, col1)] * fx
+    bottom = window[np.ix_(row1, col0)] * (1 - fx) + window[np.ix_(row1, col1)] * fx
+    heights = top * (1 - fy) + bottom * fy
+    return np.where(inside, heights, 0.0)
+
+
+def tile_path(output_dir, level, x, y):
+    """Returns the path of a tile file."""
+    return os.path.join(output_dir, str(level), str(x), f'{y}.terrain')
+
+
+def _write_tiles(source, output_dir, tiles, grid_size, normals):
+    """Generates and writes a batch of tiles, run on a worker process.
+
+    Returns:
+        int: The number of tiles written.
+    """
+    with open_raster(source) as raster:
+        for level, x, y in tiles:
+            bounds = tile_bounds(level, x, y)
+            heights = sample_heights(raster, bounds, grid_size)
+            data = encode_grid_tile(heights, *bounds, normals=normals)
+            path = tile_path(output_dir, level, x, y)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary_path = f'{path}.{os.getpid()}.part'
+            # Tiles are gzipped, as served by cesium-terrain-builder tile sets
+            with gzip.open(temporary_path, 'wb', compresslevel=6) as file:
+                file.write(data)
+            os.replace(temporary_path, path)
+    return len(tiles)
+
+
+def write_layer(output_dir, available, bounds, normals=True):
+    """Writes the layer.json describing the tile set.
+
+    Args:
+        output_dir (str): The tile set directory.
+        available (list): Per level, the (start_x, start_y, end_x, end_y) tile range.
+        bounds (tuple): The west, south, east and north edges of the data in degrees.
+        normals (bool, optional): Whether the tiles contain vertex normals.
+    """
+    layer = {
+        'tilejson': '2.1.0',
+        'name': os.path.basename(os.path.normpath(output_dir)),
+        'version': '1.0.0',
+        'format': 'quantized-mesh-1.0',
+        'scheme': 'tms',
+        'tiles': ['{z}/{x}/{y}.terrain?v={version}'],
+        'minzoom': 0,
+        'maxzoom': len(available) - 1,
+        'bounds': list(bounds),
+        'projection': 'EPSG:4326',
+        'extensions': ['octvertexnormals'] if normals else [],
+        'available': [
+            [{'startX': start_x, 'startY': start_y, 'endX': end_x, 'endY': end_y}]
+            for start_x, start_y, end_x, end_y in available
+        ],
+    }
+    temporary_path = os.path.join(output_dir, f'{LAYER_FILE}.part')
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump(layer, file, indent=2)
+    os.replace(temporary_path, os.path.join(output_dir, LAYER_FILE))
+
+
+def _intersects(first, second):
+    """Returns whether two west, south, east, north bounds overlap."""
+    return (
+        first[0] < second[2]
+        and second[0] < first[2]
+        and first[1] < second[3]
+        and second[1] < first[3]
+    )
+
+
+def tile_geotiff(
+    source,
+    output_dir,
+    bbox=None,
+    max_level=None,
+    grid_size=GRID_SIZE,
+    normals=True,
+    processes=None,
+    progress=None,
+):
+    """Generates a quantized-mesh tile set and its layer.json from a raster.
+
+    Tiles of every level from 0 to max_level intersecting the raster are generated on
+    a pool of processes, each reading only the raster window of its tiles. Both level 0
+    tiles are always written, so Cesium finds its root tiles.
+
+    Args:
+        source (str or raster): Path to a GeoTIFF in EPSG:4326, or a raster object.
+        output_dir (str): The tile set directory.
+        bbox (tuple, optional): West, south, east and north edges in degrees. If given
+            and the tile set exists, only tiles intersecting the bbox are regenerated.
+            Defaults to None.
+        max_level (int, optional): The deepest level. Defaults to the level matching
+            the resolution of the raster.
+        grid_size (int, optional): Vertices along each side of a tile. Defaults to 65.
+        normals (bool, optional): Add oct-encoded vertex normals. Defaults to True.
+        processes (int, optional): Number of worker processes. Defaults to the number
+            of CPUs.
+        progress (callable, optional): Called with the fraction of tiles written.
+
+    Returns:
+        int: The number of tiles written.
+    """
+    with open_raster(source) as raster:
+        bounds = raster_bounds(raster)
+        if max_level is None:
+            max_level = max_level_for(raster, grid_size)
+
+    if bbox is not None and not os.path.exists(os.path.join(output_dir, LAYER_FILE)):
+        bbox = None
+
+    available = []
+    tiles = []
+    for level in range(max_level + 1):
+        start_x, start_y, end_x, end_y = (
+            (0, 0, 1, 0) if level == 0 else tile_range(level, bounds)
+        )
+        available.append((start_x, start_y, end_x, end_y))
+        for x in range(start_x, end_x + 1):
+            for y in range(start_y, end_y + 1):
+                if bbox is None or _intersects(tile_bounds(level, x, y), bbox):
+                    tiles.append((level, x, y))
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Deep levels first, they hold most of the tiles
+    tiles.reverse()
+    batches = [tiles[i : i + TILES_PER_TASK] for i in range(0, len(tiles), TILES_PER_TASK)]
+    written = 0
+    # Workers are spawned, as forking the multi-threaded API process is unsafe
+    with ProcessPoolExecutor(
+        max_workers=processes, mp_context=multiprocessing.get_context('spawn')
+    ) as executor:
+        futures = [
+            executor.submit(_write_tiles, source, output_dir, batch, grid_size, normals)
+            for batch in batches
+        ]
+        for future in as_completed(futures):
+            written += future.result()
+            if progress is not None:
+                progress(written / len(tiles))
+
+    write_layer(output_dir, available, bounds, normals)
+    logger.info('Wrote %d terrain tiles up to level %d to %s', written, max_level, output_dir)
+    return written
@@ -0,0 +1,79 @@
+"""
+This module contains shared fixtures for the backend tests.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+
+class WCSStub:
+    """Local stand-in for the Geonorge WCS, recording the requests it receives.
+
+    Args:
+        delay (float): Seconds to wait before answering each request.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+        self.status_code = 200
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def render(self, params):
+        """Returns the body served for a GetCoverage request."""
+        return f'coverage {params["BBOX"]} {params["WIDTH"]}x{params["HEIGHT"]}'.encode()
+
+    def handle(self, query):
+        """Records a request and returns the status code and body to answer with.
+
+        The first `failures` requests are answered with 503.
+        """
+        params = {key: values[0] for key, values in parse_qs(query).items()}
+        with self._lock:
+            self.requests.append(params)
+        time.sleep(self.delay)
+        with self._lock:
+            failing = self.failures > 0
+            self.failures -= failing
+        if failing:
+            return 503, b'Service unavailable'
+        if self.status_code != 200:
+            return self.status_code, b'Service unavailable'
+        return 200, self.render(params)
+
+
+@pytest.fixture
+def wcs_server():
+    """Runs a WCS stand-in on a local port.
+
+    Yields:
+        tuple: The URL of the service and the WCSStub answering requests.
+    """
+    stub = WCSStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        """Request handler forwarding to the stub."""
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            """Answers a GetCoverage request."""
+            status_code, body = stub.handle(urlparse(self.path).query)
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'image/tiff')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            """Silences request logging."""
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/wcs', stub
+    server.shutdown()
+    server.server_close()
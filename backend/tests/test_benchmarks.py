@@ -0,0 +1,99 @@
+"""
+This module contains unit tests for the benchmark suite.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_api import summarize
+from benchmarks.bench_models import run as run_models
+from benchmarks.compare import compare
+from benchmarks.datagen import TABLE_COLUMNS, generate
+
+
+def test_generate_scales_with_arguments():
+    """
+    Test case to check that the generated rows match the requested scale and link up.
+    """
+    tables = generate(inquiries=3, cables=4, points=5, standalone_points=2, images=1, seed=1)
+
+    assert len(tables['henvendelse']) == 3
+    assert len(tables['ledningsmaaling_innmaaling']) == 3 * (4 + 2)
+    assert len(tables['ledningsmaaling_innmaaling_punkt']) == 3 * (4 * 5 + 2)
+    assert len(tables['ledningsmaaling_innmaaling_kobling']) == 3 * (4 * 5 + 2)
+    for table, rows in tables.items():
+        assert all(len(row) == len(TABLE_COLUMNS[table]) for row in rows)
+    point_ids = {row[0] for row in tables['ledningsmaaling_innmaaling_punkt']}
+    assert {row[1] for row in tables['ledningsmaaling_innmaaling_bilde']} <= point_ids
+
+
+def test_generate_is_reproducible():
+    """
+    Test case to check that the same seed generates the same data.
+    """
+    assert generate(2, 2, 3, seed=7) == generate(2, 2, 3, seed=7)
+    assert generate(2, 2, 3, seed=7) != generate(2, 2, 3, seed=8)
+
+
+def test_generate_packs_inquiries_into_region():
+    """
+    Test case to check that a smaller region packs the working areas densely.
+    """
+    tables = generate(inquiries=20, cables=1, points=2, region_size=100.0)
+    corners = [
+        [float(value) for value in row[2].split('((')[1].split(',')[0].split()]
+        for row in tables['geometri']
+    ]
+    assert max(x for x, _ in corners) - min(x for x, _ in corners) <= 100.0
+    assert max(y for _, y in corners) - min(y for _, y in corners) <= 100.0
+
+
+def test_summarize_reports_percentiles_in_milliseconds():
+    """
+    Test case to check the latency percentiles of a run.
+    """
+    summary = summarize([i / 1000 for i in range(1, 101)])
+
+    assert summary['count'] == 100
+    assert summary['p50_ms'] == pytest.approx(50.5)
+    assert summary['p99_ms'] == pytest.approx(99.01)
+    assert summary['max_ms'] == pytest.approx(100)
+    assert summarize([0.002])['p95_ms'] == pytest.approx(2)
+
+
+def test_compare_flags_regressions_above_threshold():
+    """
+    Test case to check that only cases slower or larger beyond the threshold regress.
+    """
+
+    def report(p95, memory):
+        return {
+            'meta': {},
+            'results': {
+                'boundary': {
+                    'p50_ms': 1.0,
+                    'p95_ms': p95,
+                    'p99_ms': p95,
+                    'peak_memory_bytes': memory,
+                }
+            },
+        }
+
+    assert not compare(report(10.0, 1000), report(10.5, 1000), threshold=10)[0]['regressed']
+    assert compare(report(10.0, 1000), report(12.0, 1000), threshold=10)[0]['regressed']
+    assert compare(report(10.0, 1000), report(10.0, 2000), threshold=10)[0]['regressed']
+    assert compare(report(10.0, 1000), {'meta': {}, 'results': {}}) == []
+
+
+def test_model_benchmark_compares_both_models():
+    """
+    Test case to check that the model benchmark measures both models on the same data.
+    """
+    results = run_models(points=50, repeat=1)
+
+    assert set(results) == {'pydantic', 'compact'}
+    assert results['pydantic']['json_bytes'] > 0
+    assert results['compact']['retained_bytes'] < results['pydantic']['retained_bytes']
@@ -0,0 +1,164 @@
+"""
+This module contains unit tests for the query result caches.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import cache as cache_module
+from common.cache import InquiryResponseCache, LRUCache
+
+
+def test_lru_eviction_by_entries():
+    """
+    Test case to check that the least recently used entry is evicted first.
+    """
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert cache.stats()['evictions'] == 1
+
+
+def test_lru_eviction_by_bytes():
+    """
+    Test case to check that the cache stays within its byte budget.
+    """
+    cache = LRUCache(max_entries=10, max_bytes=10)
+    cache.set('a', 'xxxxxx')
+    cache.set('b', 'yyyyyy')
+
+    assert 'a' not in cache
+    assert cache.stats()['bytes'] == 6
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    """
+    Test case to check that entries with a TTL are neither returned nor peeked once
+    expired, and are then queried again.
+    """
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    cache = InquiryResponseCache()
+    calls = []
+
+    @cache.cached('images', ttl=60)
+    def query(inquiry_id, connection):
+        calls.append(inquiry_id)
+        return [inquiry_id]
+
+    @cache.cached_many('images', ttl=60)
+    def query_many(inquiry_ids, connection):
+        calls.extend(inquiry_ids)
+        return {inquiry_id: [inquiry_id] for inquiry_id in inquiry_ids}
+
+    query(1, None)
+    query_many([1, 2], None)
+    assert calls == [1, 2]
+
+    now[0] += 61
+    assert query.peek(1) is None
+    query_many([1, 2], None)
+    query(2, None)
+    assert calls == [1, 2, 1, 2]
+
+    cache.set('x', 1, ttl=1)
+    assert cache.get('x') == 1
+    now[0] += 1
+    assert cache.get('x') is None
+    assert len(cache) == 2
+
+
+def test_cached_counts_hits_and_misses():
+    """
+    Test case to check that the decorated function is only called on a miss.
+    """
+    cache = InquiryResponseCache()
+    calls = []
+
+    @cache.cached('measurements')
+    def query(inquiry_id, connection):
+        calls.append(inquiry_id)
+        return [{'inquiry_id': inquiry_id}]
+
+    assert query(1, None) == query(1, None)
+    assert calls == [1]
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_cached_keys_include_further_arguments():
+    """
+    Test case to check that every variant of a result is cached and evicted with its inquiry.
+    """
+    cache = InquiryResponseCache()
+
+    @cache.cached('measurements_lod')
+    def query(inquiry_id, connection, lod=0):
+        return [{'inquiry_id': inquiry_id, 'lod': lod}]
+
+    assert query(1, None, lod=2) == [{'inquiry_id': 1, 'lod': 2}]
+    assert query(1, None, lod=3) == [{'inquiry_id': 1, 'lod': 3}]
+    assert query.peek(1, lod=2) == [{'inquiry_id': 1, 'lod': 2}]
+    assert cache.evict_inquiries([1]) == 2
+    assert query.peek(1, lod=2) is None
+
+
+def test_evict_inquiries_only_removes_given_inquiries():
+    """
+    Test case to check that eviction removes every endpoint of the given inquiries only.
+    """
+    cache = InquiryResponseCache()
+    cache.set(('measurements', 1), [])
+    cache.set(('cable_points', 1), [])
+    cache.set(('measurements', 2), [])
+
+    assert cache.evict_inquiries([1]) == 2
+    assert ('measurements', 2) in cache
+
+
+def test_result_read_before_eviction_is_not_stored():
+    """
+    Test case to check that a result computed across an eviction is not cached.
+    """
+    cache = InquiryResponseCache()
+
+    @cache.cached('measurements')
+    def query(inquiry_id, connection):
+        cache.evict_inquiries([inquiry_id])
+        return ['stale']
+
+    query(1, None)
+    assert ('measurements', 1) not in cache
+
+
+def test_cached_many_only_fetches_missing_inquiries():
+    """
+    Test case to check that bulk results are cached per inquiry and shared with cached.
+    """
+    cache = InquiryResponseCache()
+    calls = []
+
+    @cache.cached('images')
+    def query(inquiry_id, connection):
+        calls.append([inquiry_id])
+        return [f'image of {inquiry_id}']
+
+    @cache.cached_many('images')
+    def query_many(inquiry_ids, connection):
+        calls.append(list(inquiry_ids))
+        return {inquiry_id: [f'image of {inquiry_id}'] for inquiry_id in inquiry_ids}
+
+    query(1, None)
+    assert query_many([1, 2, 3, 2], None) == {
+        inquiry_id: [f'image of {inquiry_id}'] for inquiry_id in (1, 2, 3)
+    }
+    assert query_many([3, 2], None) == {3: ['image of 3'], 2: ['image of 2']}
+    assert query.peek(2) == ['image of 2']
+    assert calls == [[1], [2, 3]]
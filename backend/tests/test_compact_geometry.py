@@ -0,0 +1,116 @@
+"""
+This module contains unit tests for the compact GeoJSON models.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import json
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.compact_geometry import CompactFeatureCollection
+from models.geojson_models import FeatureCollection
+
+COLLECTION = {
+    'type': 'FeatureCollection',
+    'features': [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [10.3951, 63.4305, 12.5]},
+            'properties': {'point_id': 1, 'metadata': {'edited': True}},
+        },
+        {
+            'type': 'Feature',
+            'geometry': {
+                'type': 'LineString',
+                'coordinates': [[10.3951, 63.4305], [10.3952, 63.4306], [10.3953, 63.4304]],
+            },
+            'properties': None,
+        },
+        {
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [
+                    [[0.0, 0.0, 1.0], [4.0, 0.0, 1.0], [4.0, 4.0, 1.0], [0.0, 0.0, 1.0]],
+                    [[1.0, 1.0, 1.0], [2.0, 1.0, 1.0], [2.0, 2.0, 1.0], [1.0, 1.0, 1.0]],
+                ],
+            },
+            'properties': {'name': 'area'},
+        },
+        {
+            'type': 'Feature',
+            'geometry': {
+                'type': 'MultiPoint',
+                'coordinates': [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]],
+            },
+            'properties': {},
+        },
+    ],
+}
+
+
+def test_geo_interface_matches_pydantic_models():
+    """
+    Test case to check that the compact models build the GeoJSON the pydantic ones do.
+    """
+    compact = CompactFeatureCollection.from_geojson(COLLECTION)
+    expected = FeatureCollection.model_validate(COLLECTION).__geo_interface__
+
+    assert compact.__geo_interface__ == expected
+    assert [feature.__geo_interface__ for feature in compact] == expected['features']
+    assert json.loads(compact.to_json()) == expected
+
+
+def test_coordinates_are_contiguous_views():
+    """
+    Test case to check that every coordinate is held once in one float64 array.
+    """
+    compact = CompactFeatureCollection.from_geojson(COLLECTION)
+
+    assert compact.coordinates.dtype == np.float64
+    assert compact.coordinates.shape == (1 + 3 + 8 + 2, 3)
+    assert len(compact) == 4
+    line = compact[1].coordinates
+    assert line.shape == (3, 2)
+    assert np.shares_memory(line, compact.coordinates)
+    assert compact[-2].geometry_type == 'Polygon'
+    with pytest.raises(IndexError):
+        compact[4]  # pylint: disable=pointless-statement
+
+
+def test_missing_values_and_empty_geometry():
+    """
+    Test case to check that missing heights and features without geometry round trip.
+    """
+    collection = {
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [10.0, 63.0, None]},
+                'properties': {'point_id': 1},
+            },
+            {'type': 'Feature', 'geometry': None, 'properties': {'point_id': 2}},
+        ],
+    }
+    compact = CompactFeatureCollection.from_geojson(collection)
+
+    assert np.isnan(compact[0].coordinates[0, 2])
+    assert compact.__geo_interface__ == collection
+    assert json.loads(compact.to_json()) == collection
+
+
+def test_unsupported_geometry_type_raises():
+    """
+    Test case to check that geometry types without a packed layout are rejected.
+    """
+    feature = {
+        'type': 'Feature',
+        'geometry': {'type': 'GeometryCollection', 'geometries': []},
+        'properties': {},
+    }
+    with pytest.raises(ValueError):
+        CompactFeatureCollection.from_geojson([feature])
@@ -0,0 +1,190 @@
+"""
+This module contains unit tests for the broadcasting of point edits.
+"""
+# pylint: disable=import-error, protected-access
+
+# Ensure the backend directory is in the sys.path
+import asyncio
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import edit_events
+from edit_events import (
+    RESYNC_MESSAGE,
+    EditEventBroker,
+    encode_notifications,
+    encode_refresh_notifications,
+    point_edit,
+    publish_views_refreshed,
+)
+from sqlalchemy.exc import OperationalError
+
+
+def test_notifications_are_grouped_by_inquiry_and_chunked():
+    """
+    Test case to check that every payload belongs to one inquiry and fits NOTIFY.
+    """
+    edits = [point_edit(i, 63.43, 10.39, 12.5, 569000.0 + i, 7034000.0) for i in range(200)]
+    point_inquiries = {i: [7] for i in range(200)}
+    point_inquiries[0] = [7, 8]
+
+    payloads = encode_notifications(point_inquiries, edits, max_bytes=1000)
+    decoded = [json.loads(payload) for payload in payloads]
+
+    assert len(payloads) > 1
+    assert all(len(payload.encode('utf-8')) < 1000 for payload in payloads)
+    assert [point['id'] for event in decoded if event['inquiry_id'] == 7
+            for point in event['points']] == list(range(200))
+    assert [event['points'] for event in decoded if event['inquiry_id'] == 8] == [[edits[0]]]
+
+
+def test_points_without_inquiry_are_not_sent():
+    """
+    Test case to check that edits of points outside any inquiry send no notification.
+    """
+    assert not encode_notifications({}, [point_edit(1, 63.0, 10.0, 1.0, 0.0, 0.0)])
+
+
+def test_dispatch_reaches_only_subscribers_of_the_inquiry():
+    """
+    Test case to check that a notification is queued for the viewers of its inquiry only.
+    """
+
+    async def scenario():
+        broker = EditEventBroker('postgresql://unused')
+        first, second, other = broker.subscribe(7), broker.subscribe(7), broker.subscribe(8)
+        payload = encode_notifications({1: [7]}, [point_edit(1, 63.0, 10.0, 1.0, 2.0, 3.0)])[0]
+
+        assert broker.dispatch(payload) == 2
+        assert await first.get() == await second.get() == f'event: points\ndata: {payload}\n\n'
+        assert other.queue.empty()
+        assert broker.dispatch('not json') == 0
+
+        for subscription in (first, second, other):
+            subscription.close()
+        assert not broker._subscribers
+        assert broker.dispatch(payload) == 0
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_told_to_resync():
+    """
+    Test case to check that a full queue is replaced by a resync event.
+    """
+
+    async def scenario():
+        broker = EditEventBroker('postgresql://unused', queue_size=2)
+        subscription = broker.subscribe(7)
+        payload = json.dumps({'inquiry_id': 7, 'points': []})
+        for _ in range(3):
+            broker.dispatch(payload)
+
+        assert await subscription.get() == RESYNC_MESSAGE
+        assert subscription.queue.empty()
+        subscription.close()
+
+    asyncio.run(scenario())
+
+
+def test_refreshed_inquiries_are_chunked():
+    """
+    Test case to check that the inquiries of refreshed views are split into payloads.
+    """
+    payloads = encode_refresh_notifications(range(1000, 1400), max_bytes=200)
+
+    assert len(payloads) > 1
+    assert all(len(payload) < 200 for payload in payloads)
+    assert [inquiry_id for payload in payloads
+            for inquiry_id in json.loads(payload)['inquiry_ids']] == list(range(1000, 1400))
+    assert not encode_refresh_notifications([])
+
+
+def test_refresh_notifications_reach_the_cache():
+    """
+    Test case to check that refreshed inquiries of any worker are passed to on_refreshed.
+    """
+    refreshed = []
+    broker = EditEventBroker('postgresql://unused', on_refreshed=refreshed.append)
+
+    assert broker.dispatch_refresh(encode_refresh_notifications([8, 7])[0]) == {7, 8}
+    assert broker.dispatch_refresh('{"inquiry_ids": "x"}') == set()
+    assert refreshed == [{7, 8}]
+
+
+def test_failed_refresh_notification_is_logged():
+    """
+    Test case to check that the views refresh does not fail when workers cannot be told.
+    """
+
+    class Engine:
+        """Engine whose connections cannot be opened."""
+
+        def begin(self):
+            raise OperationalError('SELECT 1', {}, Exception('connection refused'))
+
+    assert publish_views_refreshed(Engine(), [7]) == 0
+
+
+class Connection:
+    """Stand-in for a listening asyncpg connection, lost when told to."""
+
+    def __init__(self):
+        self.listeners = {}
+        self.lost = None
+        self.closed = False
+
+    def add_termination_listener(self, callback):
+        """Registers the callback of a lost connection."""
+        self.lost = callback
+
+    async def add_listener(self, channel, callback):
+        """Registers the callback of a channel."""
+        self.listeners[channel] = callback
+
+    def is_closed(self):
+        """Returns whether the connection was closed."""
+        return self.closed
+
+    async def close(self):
+        """Closes the connection."""
+        self.closed = True
+
+
+def test_unexpected_listen_errors_reconnect_and_resync(monkeypatch):
+    """
+    Test case to check that any error while listening is retried, followed by a resync.
+    """
+    connection = Connection()
+    attempts = []
+
+    async def connect(_dsn):
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise RuntimeError('unexpected')
+        return connection
+
+    async def scenario():
+        monkeypatch.setattr(edit_events.asyncpg, 'connect', connect)
+        reconnected = []
+        broker = EditEventBroker(
+            'postgresql://unused', retry_seconds=0, on_reconnected=lambda: reconnected.append(1)
+        )
+        subscription = broker.subscribe(7)
+        broker.start()
+
+        async def listening():
+            while len(connection.listeners) < 2:
+                await asyncio.sleep(0)
+
+        await asyncio.wait_for(listening(), 5)
+
+        assert attempts == [0, 1]
+        assert await subscription.get() == RESYNC_MESSAGE
+        assert reconnected == [1]
+        await broker.stop()
+        assert connection.closed
+        subscription.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,140 @@
+"""
+This module contains unit tests for conditional requests and compressed responses.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.http_cache import ConditionalResponder, etag_matches, negotiate_encoding
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+
+def make_client(responder, versions, renders, names=None):
+    """Returns a test client of an endpoint answering through the responder."""
+    app = FastAPI()
+
+    @app.get('/items/{item_id}')
+    async def get_item(request: Request, item_id: int):
+        async def render():
+            renders.append(item_id)
+            name = (names or {}).get(item_id, 'x' * 2000)
+            return JSONResponse([{'id': item_id, 'name': name}])
+
+        return await responder.respond(request, versions[item_id], render)
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    'accept_encoding, expected',
+    [
+        (None, None),
+        ('gzip, deflate', 'gzip'),
+        ('gzip;q=0, deflate', None),
+        ('*', 'gzip'),
+        ('identity', None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    """
+    Test case to check that the accepted content coding with the highest quality is chosen.
+    """
+    assert negotiate_encoding(accept_encoding, ('gzip',)) == expected
+
+
+def test_etag_matches_compares_weakly():
+    """
+    Test case to check that weak tags and lists of tags in If-None-Match are matched.
+    """
+    assert etag_matches('W/"a", "b"', ['"a"']) == '"a"'
+    assert etag_matches('"c"', ['"a"', '"b"']) is None
+    assert etag_matches('*', ['"a"']) == '"a"'
+    assert etag_matches(None, ['"a"']) is None
+    assert etag_matches('"a-gzip"', ['"a"']) == '"a"'
+    assert etag_matches('"a-br"', ['"a-gzip"']) == '"a-gzip"'
+
+
+def test_other_codings_of_the_same_version_are_not_modified():
+    """
+    Test case to check that a tag of one coding revalidates a request for another coding.
+    """
+    versions, renders = {1: 'v1'}, []
+    client = make_client(ConditionalResponder(min_size=1024), versions, renders)
+    etag = client.get('/items/1', headers={'Accept-Encoding': 'gzip'}).headers['etag']
+    assert etag.endswith('-gzip"')
+
+    identity = client.get(
+        '/items/1', headers={'If-None-Match': etag, 'Accept-Encoding': 'identity'}
+    )
+    assert identity.status_code == 304
+    assert identity.headers['etag'] == etag.replace('-gzip', '')
+    assert renders == [1]
+
+
+def test_unchanged_data_is_not_rendered_again():
+    """
+    Test case to check that revalidations get a 304 and repeated requests the cached body.
+    """
+    versions, renders = {1: 'v1'}, []
+    client = make_client(ConditionalResponder(min_size=1024), versions, renders)
+
+    first = client.get('/items/1', headers={'Accept-Encoding': 'gzip'})
+    assert first.status_code == 200
+    assert first.headers['content-encoding'] == 'gzip'
+    assert first.json()[0]['id'] == 1
+    etag = first.headers['etag']
+
+    revalidated = client.get(
+        '/items/1', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers['etag'] == etag
+    assert not revalidated.content
+
+    repeated = client.get('/items/1', headers={'Accept-Encoding': 'gzip'})
+    assert repeated.headers['etag'] == etag
+    assert renders == [1]
+
+    versions[1] = 'v2'
+    changed = client.get(
+        '/items/1', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'}
+    )
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != etag
+    assert renders == [1, 1]
+
+
+def test_unversioned_data_is_tagged_by_its_body():
+    """
+    Test case to check that data without a version is rendered every time and only
+    answered with a 304 while its body is unchanged.
+    """
+    names, renders = {}, []
+    client = make_client(ConditionalResponder(min_size=1024), {1: None}, renders, names)
+    headers = {'Accept-Encoding': 'gzip'}
+    etag = client.get('/items/1', headers=headers).headers['etag']
+
+    revalidated = client.get('/items/1', headers={**headers, 'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert renders == [1, 1]
+
+    names[1] = 'y' * 2000
+    changed = client.get('/items/1', headers={**headers, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.json()[0]['name'] == names[1]
+    assert changed.headers['etag'] != etag
+
+
+def test_small_bodies_are_not_compressed():
+    """
+    Test case to check that bodies below the threshold are sent as they are.
+    """
+    client = make_client(ConditionalResponder(min_size=10**6), {1: 'v1'}, [])
+    response = client.get('/items/1', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in response.headers
+    assert response.json()[0]['id'] == 1
@@ -0,0 +1,122 @@
+"""
+This module contains unit tests for the thumbnails and previews of inquiry images.
+"""
+# pylint: disable=import-error, redefined-outer-name, protected-access
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import time
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.file_cache import FileCache
+from images import derivatives
+from images.archive import DirectoryArchive, ImageNotFoundError
+from images.derivatives import ImageDerivatives, derivative_key
+
+
+@pytest.fixture
+def service(tmp_path):
+    """Derivatives of an archive directory, cached in a temporary directory."""
+    archive = tmp_path / 'archive'
+    archive.mkdir()
+    service = ImageDerivatives(
+        DirectoryArchive(str(archive)),
+        FileCache(str(tmp_path / 'cache'), 10_000_000, '.jpg'),
+        processes=1,
+        threads=2,
+    )
+    yield service
+    service.shutdown()
+
+
+def test_derivative_key_rejects_unsafe_ids_and_unknown_sizes():
+    """
+    Test case to check that keys are only built from plain IDs and known sizes.
+    """
+    assert derivative_key(613, 'thumbnail') == '613-thumbnail'
+    assert derivative_key('613a1528297e0ffcf6d9fa60', 'preview') == (
+        '613a1528297e0ffcf6d9fa60-preview'
+    )
+    with pytest.raises(ValueError):
+        derivative_key('../etc/passwd', 'thumbnail')
+    with pytest.raises(ValueError):
+        derivative_key(613, 'original')
+
+
+def test_directory_archive_finds_originals_by_id(tmp_path):
+    """
+    Test case to check that the directory stand-in finds originals with any extension.
+    """
+    (tmp_path / '613.jpg').write_bytes(b'jpeg')
+    (tmp_path / '6130.jpg').write_bytes(b'other')
+    archive = DirectoryArchive(str(tmp_path))
+
+    assert archive.path(613) == str(tmp_path / '613.jpg')
+    with pytest.raises(ImageNotFoundError):
+        archive.path(614)
+
+
+def test_missing_original_is_not_cached(service):
+    """
+    Test case to check that a missing original raises and leaves no file behind.
+    """
+    if derivatives.Image is None:
+        pytest.skip('Pillow is not installed')
+    with pytest.raises(ImageNotFoundError):
+        service.get(613, 'thumbnail')
+    assert os.listdir(service.cache.directory) == []
+
+
+def test_without_pillow_derivatives_are_unavailable(service, monkeypatch):
+    """
+    Test case to check that a missing Pillow is reported instead of rendering.
+    """
+    monkeypatch.setattr(derivatives, 'Image', None)
+    with pytest.raises(RuntimeError):
+        service.get(613, 'thumbnail')
+
+
+def test_prefetch_skips_cached_derivatives(service):
+    """
+    Test case to check that only derivatives which are not cached are queued.
+    """
+    with open(service.cache.path(derivative_key(1, 'thumbnail')), 'wb') as file:
+        file.write(b'jpeg')
+
+    assert service.prefetch([1, 2, 2, '../3']) == 1
+
+
+def test_failed_prefetch_is_not_queued_again(service):
+    """
+    Test case to check that a missing original is only retried after the failure TTL.
+    """
+    key = derivative_key(613, 'thumbnail')
+    assert service.prefetch([613]) == 1
+    deadline = time.monotonic() + 10
+    while key not in service._failures and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert service.prefetch([613]) == 0
+    service.failure_ttl = 0
+    service._failures.set(key, time.monotonic())
+    assert service.prefetch([613]) == 1
+
+
+def test_thumbnail_fits_size_and_is_cached(service):
+    """
+    Test case to check that thumbnails are scaled down once and then served from disk.
+    """
+    image_module = pytest.importorskip('PIL.Image')
+    original = os.path.join(service.archive.directory, '613.png')
+    image_module.new('RGBA', (2000, 1000), (200, 100, 50, 255)).save(original)
+
+    path = service.get(613, 'thumbnail')
+    with image_module.open(path) as thumbnail:
+        assert thumbnail.format == 'JPEG'
+        assert thumbnail.size == (256, 128)
+    modified = os.stat(path).st_mtime_ns
+
+    os.remove(original)
+    assert service.get(613, 'thumbnail') == path
+    assert os.stat(path).st_mtime_ns >= modified
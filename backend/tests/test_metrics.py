@@ -0,0 +1,80 @@
+"""
+This module contains unit tests for the metrics and request profiling.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.metrics import MetricsMiddleware, TimedJSONResponse, record_phase
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sql_executer import execute_sql, fetch_dicts
+from sqlalchemy import create_engine
+
+
+def make_client():
+    """Returns a test client of an app instrumented like the backend."""
+    app = FastAPI(default_response_class=TimedJSONResponse)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get('/items/{item_id}')
+    def get_item(item_id: int):
+        record_phase('db', 0.002)
+        return {'id': item_id}
+
+    return TestClient(app)
+
+
+def request_count(route):
+    """Returns the number of recorded requests to a route template."""
+    labels = {'method': 'GET', 'route': route, 'status': '200'}
+    return REGISTRY.get_sample_value('http_request_duration_seconds_count', labels) or 0
+
+
+def test_requests_are_recorded_by_route_template():
+    """
+    Test case to check that latencies are labelled by route template, not by raw path.
+    """
+    client = make_client()
+    before = request_count('/items/{item_id}')
+
+    client.get('/items/1')
+    client.get('/items/2')
+
+    assert request_count('/items/{item_id}') == before + 2
+
+
+def test_profile_header_returns_timing_breakdown():
+    """
+    Test case to check that only profiled requests get a Server-Timing header.
+    """
+    client = make_client()
+
+    profiled = client.get('/items/1', headers={'X-Profile': '1'})
+    plain = client.get('/items/1')
+
+    timing = profiled.headers['server-timing']
+    assert 'db;dur=2.00' in timing
+    assert 'serialize;dur=' in timing
+    assert 'total;dur=' in timing
+    assert 'server-timing' not in plain.headers
+
+
+def test_sql_files_record_duration_and_rows(tmp_path):
+    """
+    Test case to check that SQL execution time and row counts are recorded per statement.
+    """
+    path = tmp_path / 'numbers.sql'
+    path.write_text('SELECT 1 AS number UNION ALL SELECT 2', encoding='utf-8')
+    engine = create_engine('sqlite://')
+
+    with engine.connect() as connection:
+        rows = fetch_dicts(execute_sql(connection, str(path)), 'numbers')
+
+    assert rows == [{'number': 1}, {'number': 2}]
+    labels = {'statement': str(path)}
+    assert REGISTRY.get_sample_value('sql_statement_duration_seconds_count', labels) == 1
+    assert REGISTRY.get_sample_value('sql_rows_returned_total', {'statement': 'numbers'}) == 2
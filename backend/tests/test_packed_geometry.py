@@ -0,0 +1,174 @@
+"""
+This module contains unit tests for the packed geometry format.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import json
+import os
+import sys
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.packed_geometry import decode, encode, negotiate
+
+
+def point(point_id, lon, lat, height):
+    """Returns a cable point feature like Points_of_Cables_as_GeoJSON_3D."""
+    return {
+        'type': 'Feature',
+        'properties': {
+            'point_id': point_id,
+            'measurement_id': 7,
+            'metadata': {'height': height, 'lat': lat, 'lon': lon, 'edited': True},
+        },
+        'geometry': {'type': 'Point', 'coordinates': [lon, lat, height]},
+    }
+
+
+MEASUREMENTS = [
+    {
+        'inquiry_id': 1,
+        'geojson': {
+            'type': 'FeatureCollection',
+            'features': [
+                point(1, 10.3951, 63.4305, 12.5),
+                {
+                    'type': 'Feature',
+                    'properties': {'point_id': 2, 'metadata': {'note': None}},
+                    'geometry': {'type': 'Point', 'coordinates': [10.3952, 63.4306, None]},
+                },
+                {
+                    'type': 'Feature',
+                    'properties': {'measurement_id': 3},
+                    'geometry': {
+                        'type': 'LineString',
+                        'coordinates': [[10.39, 63.43, 11.0], [10.391, 63.431, 11.5]],
+                    },
+                },
+                {'type': 'Feature', 'properties': None, 'geometry': None},
+            ],
+        },
+    }
+]
+CABLE_POINTS = [
+    {
+        'inquiry_id': 2,
+        'geojson': [
+            {'type': 'FeatureCollection', 'features': [point(4, 10.1, 63.1, 3.25)]},
+            {'type': 'FeatureCollection', 'features': []},
+        ],
+    }
+]
+WORKING_AREA = [
+    {
+        'id': 3,
+        'geojson': {
+            'type': 'Feature',
+            'properties': {},
+            'geometry': {
+                'type': 'MultiPolygon',
+                'coordinates': [
+                    [[[10.0, 63.0], [10.1, 63.0], [10.1, 63.1], [10.0, 63.0]]],
+                    [
+                        [[11.0, 64.0], [11.2, 64.0], [11.2, 64.2], [11.0, 64.0]],
+                        [[11.05, 64.05], [11.1, 64.05], [11.1, 64.1], [11.05, 64.05]],
+                    ],
+                ],
+            },
+        },
+    }
+]
+
+
+@pytest.mark.parametrize('rows', [MEASUREMENTS, CABLE_POINTS, WORKING_AREA, []])
+def test_float64_round_trip_is_exact(rows):
+    """
+    Test case to check that float64 payloads decode to the encoded rows.
+    """
+    assert decode(encode(rows)) == rows
+
+
+def test_int32_round_trip_within_precision():
+    """
+    Test case to check that quantized coordinates decode within their precision.
+    """
+    decoded = decode(encode(MEASUREMENTS, coordinates='int32', precision=(1e-7, 1e-7, 1e-3)))
+
+    features = decoded[0]['geojson']['features']
+    original = MEASUREMENTS[0]['geojson']['features']
+    assert features[0]['geometry']['coordinates'] == pytest.approx(
+        original[0]['geometry']['coordinates'], abs=1e-6
+    )
+    assert features[1]['geometry']['coordinates'][2] is None
+    for actual, expected in zip(
+        features[2]['geometry']['coordinates'], original[2]['geometry']['coordinates']
+    ):
+        assert actual == pytest.approx(expected, abs=1e-6)
+    assert [feature['properties'] for feature in features] == [
+        feature['properties'] for feature in original
+    ]
+
+
+def test_two_dimensional_features_keep_two_coordinates():
+    """
+    Test case to check that 2D features in a 3D payload decode without a height.
+    """
+    decoded = decode(encode(WORKING_AREA + MEASUREMENTS))
+
+    assert decoded == WORKING_AREA + MEASUREMENTS
+
+
+def test_payload_is_smaller_than_json():
+    """
+    Test case to check that numeric properties and coordinates are packed.
+    """
+    rows = [
+        {
+            'inquiry_id': 1,
+            'geojson': {
+                'type': 'FeatureCollection',
+                'features': [
+                    point(index, 10 + index * 1e-5, 63 + index * 1e-5, 10 + index * 0.01)
+                    for index in range(1000)
+                ],
+            },
+        }
+    ]
+
+    assert len(encode(rows)) * 2 < len(json.dumps(rows))
+    assert len(encode(rows, coordinates='int32')) < len(encode(rows))
+
+
+def test_unsupported_geometry_is_rejected():
+    """
+    Test case to check that geometry collections cannot be packed.
+    """
+    rows = [
+        {
+            'geojson': {
+                'type': 'Feature',
+                'properties': {},
+                'geometry': {'type': 'GeometryCollection', 'geometries': []},
+            }
+        }
+    ]
+
+    with pytest.raises(ValueError):
+        encode(rows)
+
+
+@pytest.mark.parametrize(
+    'accept, expected',
+    [
+        (None, None),
+        ('application/json', None),
+        ('application/x-packed-geometry', 'float64'),
+        ('application/json;q=0.5, application/x-packed-geometry; coordinates=int32', 'int32'),
+        ('application/x-packed-geometry;q=0', None),
+    ],
+)
+def test_negotiate(accept, expected):
+    """
+    Test case to check the coordinate encoding chosen from the Accept header.
+    """
+    assert negotiate(accept) == expected
@@ -0,0 +1,40 @@
+"""
+This module contains unit tests for the connection pool monitoring.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.pool_stats import PoolStats
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+
+def test_pool_stats_records_occupancy_waits_and_timeouts(tmp_path):
+    """
+    Test case to check that checkouts, occupancy and exhausted pools are reported.
+    """
+    engine = create_engine(
+        f'sqlite:///{tmp_path / "pool.db"}', pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    stats = PoolStats('test', engine.pool)
+
+    with stats.measure():
+        connection = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        with stats.measure():
+            engine.connect()
+
+    report = stats.stats()
+    assert report['checkouts'] == 1
+    assert report['timeouts'] == 1
+    assert report['checked_out'] == 1
+    assert report['size'] == 1
+    assert report['max_wait_seconds'] < 0.05
+
+    connection.close()
+    assert stats.stats()['checked_out'] == 0
+    engine.dispose()
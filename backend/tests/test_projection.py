@@ -0,0 +1,72 @@
+"""
+This module contains unit tests for the in-process coordinate transformations.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import threading
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.projection import get_transformer, transform_point, transform_points
+
+# (lon, lat, x, y) in UTM zone 33N. The first point is the surveyed point in summary.md,
+# whose recorded x/y agree to within 5 mm. Compared with PostGIS below when available
+REFERENCE_POINTS = [
+    (10.436597, 63.4220986, 272340.2614, 7040733.7225),
+    (15.0, 59.0, 500000.0, 6540052.0175),
+    (18.9553, 69.6492, 653421.1876, 7731721.0830),
+]
+
+
+def test_transform_point_matches_reference():
+    """
+    Test case to check single point transformations to millimetre accuracy.
+    """
+    for lon, lat, x, y in REFERENCE_POINTS:
+        assert transform_point(lon, lat) == pytest.approx((x, y), abs=1e-3)
+
+
+def test_transform_points_matches_single_transform():
+    """
+    Test case to check that the vectorized transformation matches the single one.
+    """
+    lons, lats = [point[0] for point in REFERENCE_POINTS], [point[1] for point in REFERENCE_POINTS]
+    xs, ys = transform_points(lons, lats)
+
+    for lon, lat, x, y in zip(lons, lats, xs, ys):
+        assert (x, y) == transform_point(lon, lat)
+
+
+def test_transformer_is_cached_per_thread():
+    """
+    Test case to check that transformers are reused within, but not across, threads.
+    """
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_transformer()))
+    thread.start()
+    thread.join()
+
+    assert get_transformer() is get_transformer()
+    assert other[0] is not get_transformer()
+
+
+@pytest.mark.skipif('DATABASE_URL' not in os.environ, reason='Requires a PostGIS database')
+def test_transform_point_matches_postgis():
+    """
+    Test case comparing the transformation with PostGIS on the configured database.
+    """
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import create_engine, text
+
+    with create_engine(os.environ['DATABASE_URL']).connect() as connection:
+        for lon, lat, _, _ in REFERENCE_POINTS:
+            x, y = connection.execute(
+                text(
+                    'SELECT public.ST_X(geom), public.ST_Y(geom) FROM public.ST_Transform('
+                    'public.ST_SetSRID(public.ST_MakePoint(:lon, :lat), 4326), 32633) AS geom'
+                ),
+                {'lon': lon, 'lat': lat},
+            ).one()
+            assert transform_point(lon, lat) == pytest.approx((x, y), abs=1e-6)
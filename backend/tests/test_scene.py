@@ -0,0 +1,140 @@
+"""
+This module contains unit tests for the combined scene document of an inquiry.
+"""
+# pylint: disable=import-error, redefined-outer-name
+
+# Ensure the backend directory is in the sys.path
+import asyncio
+import importlib
+import os
+import sys
+import types
+from contextlib import asynccontextmanager
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Connections:
+    """Stand-in for the connection pools, recording the schema of every checkout."""
+
+    def __init__(self):
+        self.checkouts = []
+
+    @asynccontextmanager
+    async def connect_async(self, schema):
+        """Checks out a connection, which is the schema it searches."""
+        self.checkouts.append(schema)
+        yield schema
+
+
+async def run_query(connection, query, *args):
+    """Calls a stubbed query function like database.run_query does."""
+    return await query(*args, connection)
+
+
+@pytest.fixture
+def scene(monkeypatch):
+    """Imports the scene module with a stand-in for database during the test.
+
+    database creates its tables when imported, so a module with the names used by
+    scene stands in for it. Both modules are restored after the test, so other tests
+    importing database are not affected.
+
+    Yields:
+        module: The scene module.
+    """
+    database = types.ModuleType('database')
+    database.SCHEMA = 'analytics_cable_measurement_inquiries'
+    database.SCHEMA_PUBLIC = 'public'
+    database.connect_async = None
+    database.run_query = None
+    monkeypatch.setitem(sys.modules, 'database', database)
+    previous = sys.modules.pop('scene', None)
+    yield importlib.import_module('scene')
+    if previous is None:
+        del sys.modules['scene']
+    else:
+        sys.modules['scene'] = previous
+
+
+@pytest.fixture
+def connections(scene, monkeypatch):
+    """Stubbed query functions of every part, returning their name, and pools."""
+    connections = Connections()
+    monkeypatch.setattr(scene, 'connect_async', connections.connect_async)
+    monkeypatch.setattr(scene, 'run_query', run_query)
+    for part, (schema, _query) in list(scene.SCENE_PARTS.items()):
+
+        async def query(*args, part=part):
+            return [part, args[0]]
+
+        monkeypatch.setitem(scene.SCENE_PARTS, part, (schema, query))
+    monkeypatch.setattr(scene, 'SCENE_JSON_QUERIES', {})
+    return connections
+
+
+def test_parse_scene_parts_rejects_unknown_parts(scene):
+    """
+    Test case to check that unknown or missing parts are rejected, which is a 400.
+    """
+    assert scene.parse_scene_parts(' images,boundary,images ') == ['images', 'boundary']
+    with pytest.raises(ValueError, match='terrain'):
+        scene.parse_scene_parts('boundary,terrain')
+    with pytest.raises(ValueError):
+        scene.parse_scene_parts(' , ')
+
+
+def test_only_requested_parts_are_queried(scene, connections):
+    """
+    Test case to check that every requested part is queried on its own connection.
+    """
+    scene_parts = asyncio.run(scene.query_scene_by_inquiry(7, ['boundary', 'images'], None))
+
+    assert scene_parts == {
+        'boundary': ['boundary', 7],
+        'images': ['images', 7],
+    }
+    assert sorted(connections.checkouts) == ['analytics_cable_measurement_inquiries', 'public']
+
+
+def test_cached_parts_skip_connection_checkout(scene, connections):
+    """
+    Test case to check that a part found by peek is returned without a connection.
+    """
+    _schema, query = scene.SCENE_PARTS['measurements']
+    query.peek = lambda inquiry_id: ['cached measurements', inquiry_id]
+
+    scene_parts = asyncio.run(
+        scene.query_scene_by_inquiry(7, ['measurements', 'boundary'], None)
+    )
+
+    assert scene_parts['measurements'] == ['cached measurements', 7]
+    assert connections.checkouts == ['analytics_cable_measurement_inquiries']
+
+
+def test_failing_part_cancels_the_others(scene, connections, monkeypatch):
+    """
+    Test case to check that the first error is raised and the other parts are cancelled.
+    """
+    error = RuntimeError('boundary failed')
+    cancelled = []
+
+    async def failing(*_args):
+        await asyncio.sleep(0)
+        raise error
+
+    async def slow(*_args):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append('images')
+            raise
+
+    monkeypatch.setitem(scene.SCENE_PARTS, 'boundary', ('analytics', failing))
+    monkeypatch.setitem(scene.SCENE_PARTS, 'images', ('public', slow))
+
+    with pytest.raises(RuntimeError) as raised:
+        asyncio.run(scene.query_scene_by_inquiry(7, ['images', 'boundary'], None))
+
+    assert raised.value is error
+    assert cancelled == ['images']
@@ -0,0 +1,53 @@
+"""
+This module contains unit tests for the JSON encoding of response bodies.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import datetime
+import decimal
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.metrics import TimedJSONResponse
+from common.serialization import dumps, splice_object
+from fastapi.encoders import jsonable_encoder
+
+
+def test_dumps_matches_jsonable_encoder():
+    """
+    Test case to check that database values are encoded like by jsonable_encoder.
+    """
+    row = {
+        'id': 1,
+        'tidspunkt': datetime.datetime(2024, 6, 1, 12, 30),
+        'bearing': decimal.Decimal('12.5'),
+        'count': decimal.Decimal('3'),
+        'name': 'Bjørnøya',
+        2: [1.5, None, True],
+    }
+    assert json.loads(dumps(row)) == json.loads(json.dumps(jsonable_encoder(row)))
+
+
+def test_splice_object_inserts_encoded_json():
+    """
+    Test case to check that bytes are inserted into the object without being decoded.
+    """
+    geometry = b'[{"id" : 1, "geojson" : {"type" : "Feature"}}]'
+    body = splice_object({'boundary': geometry, 'images': [], 'inquiry_id': 7})
+    assert geometry in body
+    assert json.loads(body) == {
+        'boundary': [{'id': 1, 'geojson': {'type': 'Feature'}}],
+        'images': [],
+        'inquiry_id': 7,
+    }
+
+
+def test_response_passes_bytes_through():
+    """
+    Test case to check that an encoded body is sent as it is.
+    """
+    body = b'[{"id" : 1}]'
+    assert TimedJSONResponse(body).body == body
+    assert TimedJSONResponse({'id': 1}).body == b'{"id":1}'
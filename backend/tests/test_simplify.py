@@ -0,0 +1,104 @@
+"""
+This module contains unit tests for the simplification of geometry.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import copy
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.simplify import (
+    crossing_segments,
+    simplify_geometry,
+    simplify_line,
+    simplify_rows,
+    thin_points,
+)
+
+
+def cable(count=200):
+    """Returns a wavy 3D cable of about 700 metres with a height on every point."""
+    t = np.linspace(0, 1, count)
+    return [
+        [10.4 + 0.01 * x, 63.4 + 0.0005 * np.sin(12 * x), 5.0 + x] for x in t.tolist()
+    ]
+
+
+def test_simplification_keeps_ends_and_heights():
+    """
+    Test case to check that simplified lines keep their ends and the heights of their points.
+    """
+    coordinates = cable()
+    geometry = simplify_geometry({'type': 'LineString', 'coordinates': coordinates}, 2.0)
+    simplified = geometry['coordinates']
+
+    assert 2 < len(simplified) < len(coordinates)
+    assert simplified[0] == coordinates[0]
+    assert simplified[-1] == coordinates[-1]
+    assert all(coordinate in coordinates for coordinate in simplified)
+
+
+def test_simplification_does_not_create_crossings():
+    """
+    Test case to check that a simplified line does not cross itself if the original does not.
+    """
+    points = np.array(
+        [[1.8, 0.2], [1.1, -0.8], [3.4, 1.9], [2.8, 2.1], [0.8, 1.4], [2.8, 2.2], [3.7, 1.9]]
+    )
+    assert not crossing_segments(points)
+
+    keep = simplify_line(points, 1.5)
+    assert not crossing_segments(points[keep])
+    assert keep.sum() < len(points)
+
+
+def test_thin_points_keeps_one_point_per_cell():
+    """
+    Test case to check that points closer than the tolerance are thinned.
+    """
+    points = np.array([[0.0, 0.0], [0.4, 0.3], [5.0, 5.0], [5.2, 5.1], [20.0, 0.0]])
+    assert thin_points(points, 1.0).tolist() == [True, False, True, False, True]
+    assert thin_points(points, 0.0).all()
+
+
+def test_simplify_rows_does_not_modify_rows():
+    """
+    Test case to check that the rows, which may be cached, are copied rather than modified.
+    """
+    point = {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [10.123456789, 63.1, 4.0]},
+    }
+    line = {'type': 'Feature', 'geometry': {'type': 'LineString', 'coordinates': cable()}}
+    collection = {'type': 'FeatureCollection', 'features': [point, line]}
+    rows = [{'inquiry_id': 1, 'geojson': collection}]
+    original = copy.deepcopy(rows)
+
+    simplified = simplify_rows(rows, 2.0, precision=5)
+
+    assert rows == original
+    features = simplified[0]['geojson']['features']
+    assert features[0]['geometry']['coordinates'] == [10.12346, 63.1, 4.0]
+    assert len(features[1]['geometry']['coordinates']) < len(cable())
+
+
+def test_simplify_rows_thins_cable_points():
+    """
+    Test case to check that the points of a cable are thinned but never all removed.
+    """
+    features = [
+        {
+            'type': 'Feature',
+            'properties': {'point_id': index},
+            'geometry': {'type': 'Point', 'coordinates': coordinate},
+        }
+        for index, coordinate in enumerate(cable())
+    ]
+    rows = [{'inquiry_id': 1, 'geojson': [{'type': 'FeatureCollection', 'features': features}]}]
+
+    thinned = simplify_rows(rows, 50.0, thin=True)[0]['geojson'][0]['features']
+
+    assert 0 < len(thinned) < len(features) / 4
+    assert all(feature in features for feature in thinned)
@@ -0,0 +1,77 @@
+"""
+This module contains unit tests for the SQL statement registry.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sql_executer import QUERIES_DIR, StatementRegistry, statements
+
+
+def test_registry_loads_all_queries():
+    """
+    Test case to check that every query used by the endpoints is registered.
+    """
+    for name in (
+        'inquiry/fetch_inquiries',
+        'geometry/fetch_boundary_geometry_by_inquiry',
+        'geometry/fetch_working_area_by_inquiry',
+        'geometry/fetch_measurement_geometry_by_inquiry',
+        'geometry/fetch_points_of_cables_by_inquiry',
+        'geometry/fetch_geometry_by_bbox',
+        'fetch_images_by_inquiry_id',
+        'fetch_image_manifests',
+        'update_queries/refresh_materialized_views',
+    ):
+        assert name in statements.names()
+
+
+def test_placeholders_are_expanded():
+    """
+    Test case to check that placeholders are replaced when the statement is loaded.
+    """
+    source = statements.source('inquiry/fetch_inquiries')
+    assert '/*cable_measurements*/' not in source
+    assert 'number_of_measurements' in source
+
+
+def test_missing_placeholder_fails_fast():
+    """
+    Test case to check that a placeholder pointing to a missing file raises on load.
+    """
+    with pytest.raises(FileNotFoundError):
+        StatementRegistry(
+            QUERIES_DIR, placeholders={'inquiry/fetch_inquiries': {'/*x*/': 'missing'}}
+        )
+
+
+def test_reload_on_change(tmp_path):
+    """
+    Test case to check that a changed file is reloaded in reload mode.
+    """
+    path = tmp_path / 'query.sql'
+    path.write_text('SELECT 1', encoding='utf-8')
+    registry = StatementRegistry(str(tmp_path), reload=True)
+    assert registry.source('query') == 'SELECT 1'
+
+    path.write_text('SELECT 2', encoding='utf-8')
+    os.utime(path, (0, 0))
+    assert registry.source('query') == 'SELECT 2'
+
+
+def test_json_body_wraps_statement(tmp_path):
+    """
+    Test case to check that the JSON body statement aggregates the rows of the statement.
+    """
+    path = tmp_path / 'query.sql'
+    path.write_text('SELECT 1 AS id WHERE 1 = :value;\n', encoding='utf-8')
+    registry = StatementRegistry(str(tmp_path))
+
+    statement = registry.json_body('query')
+    assert 'json_agg' in statement.text
+    assert ';' not in statement.text
+    assert 'value' in statement.compile().params
+    assert registry.json_body('query') is statement
@@ -0,0 +1,99 @@
+"""
+This module contains unit tests for the terrain model cache.
+"""
+# pylint: disable=import-error, redefined-outer-name
+
+# Ensure the backend directory is in the sys.path
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import HTTPException
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import queries
+from terrain.cache import TerrainCache, terrain_key
+
+BBOX = '272669,7037582,273109,7038148'
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def local_wcs(wcs_server, tmp_path, monkeypatch):
+    """Points fetch_geotiff at the WCS stand-in and an empty cache."""
+    url, stub = wcs_server
+    monkeypatch.setattr(queries, 'WCS_URL', url)
+    monkeypatch.setattr(queries, 'terrain_cache', TerrainCache(str(tmp_path), 10_000))
+    return stub
+
+
+def test_terrain_key_is_normalized():
+    """
+    Test case to check that equivalent requests share a key and different ones do not.
+    """
+    key = terrain_key(BBOX, 440, 566, 'dtm')
+
+    assert key == terrain_key('272669.0, 7037582.0000,273109,7038148', 440.2, 566, 'dtm')
+    assert key != terrain_key(BBOX, 441, 566, 'dtm')
+    assert key != terrain_key(BBOX, 440, 566, 'dom')
+
+
+def test_repeated_fetch_is_served_from_cache(local_wcs):
+    """
+    Test case to check that a second request for the same area is not downloaded again.
+    """
+    first = queries.fetch_geotiff(BBOX, 440, 566, logger)
+    second = queries.fetch_geotiff(BBOX, 440, 566, logger)
+
+    assert first == second
+    assert len(local_wcs.requests) == 1
+    with open(first['file_path'], 'rb') as file:
+        assert file.read() == f'coverage {BBOX} 440x566'.encode()
+
+
+def test_concurrent_fetches_share_one_download(local_wcs):
+    """
+    Test case to check that concurrent requests for the same area wait for one download.
+    """
+    local_wcs.delay = 0.2
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: queries.fetch_geotiff(BBOX, 440, 566, logger), range(8)))
+
+    assert len({result['file_path'] for result in results}) == 1
+    assert len(local_wcs.requests) == 1
+
+
+def test_different_areas_get_different_files(local_wcs):
+    """
+    Test case to check that different areas do not overwrite each other.
+    """
+    first = queries.fetch_geotiff(BBOX, 440, 566, logger)
+    second = queries.fetch_geotiff('0,0,10,10', 10, 10, logger)
+
+    assert first['file_path'] != second['file_path']
+    assert os.path.exists(first['file_path'])
+
+
+def test_failed_download_is_not_cached(local_wcs, tmp_path):
+    """
+    Test case to check that a failed download raises and leaves no file behind.
+    """
+    local_wcs.status_code = 400
+    with pytest.raises(HTTPException):
+        queries.fetch_geotiff(BBOX, 440, 566, logger)
+
+    assert not os.listdir(tmp_path)
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    """
+    Test case to check that the cache removes the oldest files when over its size.
+    """
+    cache = TerrainCache(str(tmp_path), 250)
+    for index, key in enumerate(['a', 'b', 'c']):
+        cache.get_or_fetch(key, lambda path: open(path, 'wb').write(b'x' * 100))
+        os.utime(cache.path(key), (index, index))
+
+    cache.get_or_fetch('d', lambda path: open(path, 'wb').write(b'x' * 100))
+
+    assert sorted(os.listdir(tmp_path)) == ['c.tif', 'd.tif']
@@ -0,0 +1,53 @@
+"""
+This module contains unit tests for the WCS download client.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from terrain.client import WCSClient, WCSError
+
+PARAMS = {'BBOX': '0,0,10,10', 'WIDTH': 10, 'HEIGHT': 10}
+
+
+def test_download_streams_body_to_file(wcs_server, tmp_path):
+    """
+    Test case to check that the coverage is written to the file in chunks.
+    """
+    url, _ = wcs_server
+    client = WCSClient(chunk_size=4)
+    path = tmp_path / 'coverage.tif'
+
+    written = client.download(url, PARAMS, str(path))
+
+    assert path.read_bytes() == b'coverage 0,0,10,10 10x10'
+    assert written == len(path.read_bytes())
+
+
+def test_transient_errors_are_retried(wcs_server, tmp_path):
+    """
+    Test case to check that the download is retried after the service is unavailable.
+    """
+    url, stub = wcs_server
+    stub.failures = 2
+    client = WCSClient(retries=2, backoff_seconds=0.01)
+
+    client.download(url, PARAMS, str(tmp_path / 'coverage.tif'))
+
+    assert len(stub.requests) == 3
+
+
+def test_permanent_errors_are_not_retried(wcs_server, tmp_path):
+    """
+    Test case to check that client errors are raised without retrying.
+    """
+    url, stub = wcs_server
+    stub.status_code = 400
+    client = WCSClient(retries=2, backoff_seconds=0.01)
+
+    with pytest.raises(WCSError):
+        client.download(url, PARAMS, str(tmp_path / 'coverage.tif'))
+    assert len(stub.requests) == 1
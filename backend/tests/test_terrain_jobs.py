@@ -0,0 +1,114 @@
+"""
+This module contains unit tests for the terrain tile job queue.
+"""
+# pylint: disable=import-error, protected-access
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from terrain.jobs import DONE, FAILED, TileJobManager, tile_set_id
+
+
+def make_geotiff(tmp_path, name='terrain.tif'):
+    """Writes a placeholder input file and returns its path."""
+    path = tmp_path / name
+    path.write_bytes(b'GeoTIFF')
+    return str(path)
+
+
+def fake_tiler(release=None, calls=None):
+    """Returns a job runner writing layer.json, optionally waiting for an event."""
+
+    def run(job, report_progress):
+        if calls is not None:
+            calls.append(job.job_id)
+        report_progress('tiles', 0.5)
+        if release is not None:
+            release.wait(5)
+        with open(os.path.join(job.output_dir, 'layer.json'), 'w', encoding='utf-8') as file:
+            file.write('{}')
+
+    return run
+
+
+def wait_for(manager, job_id, timeout=5):
+    """Waits until the job with the ID has finished."""
+    deadline = time.monotonic() + timeout
+    while manager.get(job_id).status not in (DONE, FAILED):
+        assert time.monotonic() < deadline, 'job did not finish in time'
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+def test_job_runs_in_background_into_tile_set_dir(tmp_path):
+    """
+    Test case to check that submitting returns at once and the job writes the tile set of the file.
+    """
+    release = threading.Event()
+    manager = TileJobManager(str(tmp_path / 'output'), 'http://tiles/', run_job=fake_tiler(release))
+
+    job = manager.submit(make_geotiff(tmp_path))
+    assert job.status in ('queued', 'running')
+
+    release.set()
+    job = wait_for(manager, job.job_id)
+    assert job.status == DONE
+    set_id = tile_set_id(job.file_path)
+    assert job.to_dict()['tileSetUrl'] == f'http://tiles/{set_id}'
+    assert os.path.exists(os.path.join(str(tmp_path / 'output'), set_id, 'layer.json'))
+
+
+def test_identical_jobs_are_deduplicated(tmp_path):
+    """
+    Test case to check that the same file is only tiled once.
+    """
+    calls = []
+    release = threading.Event()
+    manager = TileJobManager(str(tmp_path), 'http://tiles', run_job=fake_tiler(release, calls))
+    file_path = make_geotiff(tmp_path)
+
+    first = manager.submit(file_path)
+    second = manager.submit(file_path)
+    release.set()
+    wait_for(manager, first.job_id)
+
+    assert first is second
+    assert calls == [first.job_id]
+
+
+def test_failed_job_reports_error(tmp_path):
+    """
+    Test case to check that a failing tiler marks the job as failed with its error.
+    """
+
+    def failing(job, report_progress):
+        raise RuntimeError('ctb-tile exited with code 1')
+
+    manager = TileJobManager(str(tmp_path), 'http://tiles', run_job=failing)
+    job = wait_for(manager, manager.submit(make_geotiff(tmp_path)).job_id)
+
+    assert job.status == FAILED
+    assert 'code 1' in job.error
+
+
+def test_finished_jobs_are_forgotten_after_retention(tmp_path):
+    """
+    Test case to check that new versions of a file do not accumulate jobs and locks.
+    """
+    manager = TileJobManager(
+        str(tmp_path), 'http://tiles', run_job=fake_tiler(), retention_seconds=0
+    )
+    file_path = make_geotiff(tmp_path)
+    first = wait_for(manager, manager.submit(file_path, bbox=(10.0, 63.0, 10.1, 63.1)).job_id)
+
+    second = manager.submit(file_path, bbox=(10.1, 63.0, 10.2, 63.1))
+    wait_for(manager, second.job_id)
+    assert manager.get(first.job_id) is None
+
+    other = manager.submit(make_geotiff(tmp_path, 'other.tif'))
+    wait_for(manager, other.job_id)
+    assert manager.get(second.job_id) is None
+    assert list(manager._tile_set_locks) == [other.output_dir]
@@ -0,0 +1,112 @@
+"""
+This module contains unit tests for fetching oversized terrain areas as a mosaic.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import threading
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+from terrain.client import WCSClient
+from terrain.mosaic import fetch_mosaic, plan_mosaic
+
+BOUNDS = (10.40, 63.42, 10.46, 63.45)
+
+
+def surface(lons, lats):
+    """The synthetic terrain served by the WCS stand-in."""
+    return (1000 * (lons - 10) + 3000 * (lats - 63)).astype(np.float32)
+
+
+def render_synthetic_geotiff(params):
+    """Renders the synthetic terrain of a GetCoverage request as a GeoTIFF."""
+    pytest.importorskip('rasterio')
+    from rasterio.io import MemoryFile  # pylint: disable=import-outside-toplevel
+    from rasterio.transform import from_bounds  # pylint: disable=import-outside-toplevel
+
+    west, south, east, north = (float(value) for value in params['BBOX'].split(','))
+    width, height = int(params['WIDTH']), int(params['HEIGHT'])
+    lons = west + (np.arange(width) + 0.5) * (east - west) / width
+    lats = north - (np.arange(height) + 0.5) * (north - south) / height
+    data = surface(lons[None, :], lats[:, None])
+    with MemoryFile() as memory:
+        with memory.open(
+            driver='GTiff',
+            width=width,
+            height=height,
+            count=1,
+            dtype='float32',
+            crs='EPSG:4326',
+            transform=from_bounds(west, south, east, north, width, height),
+        ) as dataset:
+            dataset.write(data, 1)
+        return memory.read()
+
+
+def test_plan_mosaic_covers_grid_within_limit():
+    """
+    Test case to check that the pieces tile the whole grid without gaps or overlaps.
+    """
+    pieces = plan_mosaic(BOUNDS, 120, 70, max_size=50)
+
+    assert len(pieces) == 6
+    assert all(piece.width <= 50 and piece.height <= 50 for piece in pieces)
+    covered = np.zeros((70, 120), dtype=int)
+    for piece in pieces:
+        covered[
+            piece.row_off : piece.row_off + piece.height,
+            piece.col_off : piece.col_off + piece.width,
+        ] += 1
+    assert np.all(covered == 1)
+
+    # Pieces share the pixel size of the whole grid
+    pixel_width = (BOUNDS[2] - BOUNDS[0]) / 120
+    for piece in pieces:
+        assert np.isclose((piece.bbox[2] - piece.bbox[0]) / piece.width, pixel_width)
+
+
+def test_fetch_mosaic_from_stub_with_bounded_concurrency(wcs_server, tmp_path):
+    """
+    Test case to check that pieces fetched concurrently mosaic into the full raster.
+    """
+    rasterio = pytest.importorskip('rasterio')
+    url, stub = wcs_server
+    stub.render = render_synthetic_geotiff
+    stub.delay = 0.05
+    client = WCSClient()
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def download(bbox, width, height, file_path):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        try:
+            params = {
+                'BBOX': ','.join(str(value) for value in bbox),
+                'WIDTH': width,
+                'HEIGHT': height,
+            }
+            client.download(url, params, file_path)
+        finally:
+            with lock:
+                active.pop()
+
+    path = str(tmp_path / 'mosaic.tif')
+    pieces = fetch_mosaic(download, BOUNDS, 300, 160, path, max_size=64, concurrency=3)
+
+    assert pieces == len(stub.requests) == 15
+    assert max(peak) <= 3
+    assert not [name for name in os.listdir(tmp_path) if name != 'mosaic.tif']
+    with rasterio.open(path) as mosaic:
+        assert (mosaic.width, mosaic.height) == (300, 160)
+        assert mosaic.profile['tiled']
+        data = mosaic.read(1)
+        west, south, east, north = mosaic.bounds
+    lons = west + (np.arange(300) + 0.5) * (east - west) / 300
+    lats = north - (np.arange(160) + 0.5) * (north - south) / 160
+    assert np.allclose(data, surface(lons[None, :], lats[:, None]), atol=1e-2)
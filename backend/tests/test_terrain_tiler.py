@@ -0,0 +1,140 @@
+"""
+This module contains unit tests for the in-process quantized-mesh terrain tiler.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import gzip
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+from terrain.compare import compare_tilesets
+from terrain.quantized_mesh import (
+    QUANTIZED_MAX,
+    decode_tile,
+    dequantize_heights,
+    encode_grid_tile,
+    geodetic_to_ecef,
+    high_water_mark_decode,
+    high_water_mark_encode,
+)
+from terrain.tiler import ArrayRaster, sample_heights, tile_bounds, tile_geotiff
+
+# A 0.02 x 0.01 degree raster near Trondheim with a sloping surface
+RASTER_BOUNDS = (10.40, 63.42, 10.42, 63.43)
+
+
+def make_raster(rows=40, cols=80):
+    """Returns an in-memory raster whose height grows towards the north-east."""
+    west, south, east, north = RASTER_BOUNDS
+    lats = np.linspace(north, south, rows)[:, None]
+    lons = np.linspace(west, east, cols)[None, :]
+    heights = 100 + (lons - west) * 5000 + (lats - south) * 8000
+    return ArrayRaster(heights, (west, north, (east - west) / cols, (south - north) / rows))
+
+
+def test_high_water_mark_round_trip():
+    """
+    Test case to check that high water mark encoding is lossless.
+    """
+    indices = np.array([0, 1, 2, 1, 3, 2, 3, 4, 0])
+    assert np.array_equal(high_water_mark_decode(high_water_mark_encode(indices)), indices)
+
+
+def test_grid_tile_round_trip():
+    """
+    Test case to check that an encoded grid tile decodes to the same surface.
+    """
+    heights = np.arange(25, dtype=float).reshape(5, 5) * 3.5 + 10
+    data = encode_grid_tile(heights, 10.0, 63.0, 10.1, 63.1)
+    tile = decode_tile(data)
+
+    assert len(tile['u']) == 25
+    assert tile['triangles'].shape == (32, 3)
+    assert tile['min_height'] == 10 and tile['max_height'] == heights.max()
+    for edge in ('west', 'south', 'east', 'north'):
+        assert len(tile[edge]) == 5
+
+    # Every vertex keeps its height at its position in the grid
+    cols = np.round(tile['u'] / QUANTIZED_MAX * 4).astype(int)
+    rows = np.round(tile['v'] / QUANTIZED_MAX * 4).astype(int)
+    step = (heights.max() - heights.min()) / QUANTIZED_MAX
+    assert np.allclose(dequantize_heights(tile), heights[rows, cols], atol=step)
+    assert np.all(tile['u'][tile['west']] == 0)
+    assert np.all(tile['v'][tile['north']] == QUANTIZED_MAX)
+
+    # Normals point away from the earth's center
+    center = geodetic_to_ecef(np.array([10.05]), np.array([63.05]), np.array([0.0]))[0]
+    assert np.all(tile['normals'] @ (center / np.linalg.norm(center)) > 0.9)
+
+
+def test_sample_heights_matches_raster_inside_and_zero_outside():
+    """
+    Test case to check that sampling interpolates the raster and is 0 outside of it.
+    """
+    raster = make_raster()
+    heights = sample_heights(raster, RASTER_BOUNDS, grid_size=9)
+    assert np.all(np.diff(heights, axis=0) > 0)  # rows grow towards the north
+    assert np.all(np.diff(heights, axis=1) > 0)  # columns grow towards the east
+
+    assert np.all(sample_heights(raster, (0.0, 0.0, 1.0, 1.0), grid_size=9) == 0)
+
+
+def test_tile_pyramid_and_layer(tmp_path):
+    """
+    Test case to check that every level is tiled and listed in layer.json.
+    """
+    output_dir = str(tmp_path / 'tiles')
+    written = tile_geotiff(make_raster(), output_dir, max_level=12, grid_size=17, processes=2)
+
+    with open(os.path.join(output_dir, 'layer.json'), encoding='utf-8') as file:
+        layer = json.load(file)
+    assert layer['format'] == 'quantized-mesh-1.0'
+    assert len(layer['available']) == 13
+    assert layer['available'][0] == [{'startX': 0, 'startY': 0, 'endX': 1, 'endY': 0}]
+
+    expected = sum(
+        (tiles['endX'] - tiles['startX'] + 1) * (tiles['endY'] - tiles['startY'] + 1)
+        for [tiles] in layer['available']
+    )
+    assert written == expected
+    with open(os.path.join(output_dir, '0', '1', '0.terrain'), 'rb') as file:
+        decode_tile(gzip.decompress(file.read()))
+
+    # A tile set compared with itself matches exactly
+    comparison = compare_tilesets(output_dir, output_dir)
+    assert comparison['tiles_compared'] == written
+    assert comparison['max_error'] == 0
+
+
+def test_bbox_only_regenerates_intersecting_tiles(tmp_path):
+    """
+    Test case to check that a bbox limits regeneration to the tiles intersecting it.
+    """
+    output_dir = str(tmp_path / 'tiles')
+    tile_geotiff(make_raster(), output_dir, max_level=12, grid_size=17, processes=2)
+    paths = {}
+    for directory, _, files in os.walk(output_dir):
+        for file_name in files:
+            if file_name.endswith('.terrain'):
+                path = os.path.join(directory, file_name)
+                level, x = os.path.relpath(directory, output_dir).split(os.sep)
+                bounds = tile_bounds(int(level), int(x), int(file_name.split('.')[0]))
+                paths[path] = bounds
+                os.utime(path, ns=(0, 0))
+
+    bbox = (10.400, 63.420, 10.401, 63.421)
+    written = tile_geotiff(
+        make_raster(), output_dir, bbox=bbox, max_level=12, grid_size=17, processes=2
+    )
+
+    rewritten = {path for path in paths if os.stat(path).st_mtime_ns != 0}
+    intersecting = {
+        path
+        for path, (west, south, east, north) in paths.items()
+        if west < bbox[2] and bbox[0] < east and south < bbox[3] and bbox[1] < north
+    }
+    assert rewritten == intersecting
+    assert written == len(intersecting) < len(paths)
@@ -0,0 +1,49 @@
+"""
+This module contains unit tests for the SQL update statement generators.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import pytest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sql.procedures.update_template import (
+    generate_batch_update_params,
+    generate_batch_update_sql,
+)
+
+COLUMNS = {'id': 'integer', 'hoyde': 'double precision'}
+
+
+def test_batch_update_sql():
+    """
+    Test case to check the statement generated for two rows.
+    """
+    statement = generate_batch_update_sql('punkt', 'id', COLUMNS, 2)
+
+    assert statement == (
+        'UPDATE punkt SET hoyde = v.hoyde FROM (VALUES '
+        '(CAST(:id_0 AS integer), CAST(:hoyde_0 AS double precision)), '
+        '(CAST(:id_1 AS integer), CAST(:hoyde_1 AS double precision))) AS v(id, hoyde) '
+        'WHERE punkt.id = v.id RETURNING punkt.id;'
+    )
+
+
+def test_batch_update_params_match_placeholders():
+    """
+    Test case to check that the parameters are named after the placeholders.
+    """
+    params = generate_batch_update_params(
+        [{'id': 1, 'hoyde': 10.5}, {'id': 2, 'hoyde': 11.0}], COLUMNS
+    )
+
+    assert params == {'id_0': 1, 'hoyde_0': 10.5, 'id_1': 2, 'hoyde_1': 11.0}
+
+
+def test_batch_update_sql_requires_key_column():
+    """
+    Test case to check that the key column must be part of the values.
+    """
+    with pytest.raises(ValueError):
+        generate_batch_update_sql('punkt', 'uuid', COLUMNS, 1)
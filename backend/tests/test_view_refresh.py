@@ -0,0 +1,56 @@
+"""
+This module contains unit tests for the materialized view refresh scheduler.
+"""
+# pylint: disable=import-error
+
+# Ensure the backend directory is in the sys.path
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from view_refresh import ViewRefreshScheduler
+
+
+class RecordingScheduler(ViewRefreshScheduler):
+    """Scheduler recording refreshes instead of executing them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(None, 'analytics', *args, **kwargs)
+        self.refreshed = []
+
+    def _get_concurrent_views(self):
+        return {'Cable_Line', 'Point'}
+
+    def _refresh_view(self, view, concurrent):
+        self.refreshed.append((view, concurrent))
+
+
+def test_only_dependent_views_are_refreshed():
+    """
+    Test case to check that a point edit only refreshes the views of points, concurrently.
+    """
+    evicted = []
+    scheduler = RecordingScheduler(on_refreshed=evicted.append)
+    scheduler.request_refresh(['ledningsmaaling_innmaaling_punkt'], [7])
+    scheduler.stop()
+
+    assert scheduler.refreshed == [('Point', True), ('Cable_Line', True)]
+    assert evicted == [{7}]
+
+
+def test_burst_of_edits_is_debounced_into_one_refresh():
+    """
+    Test case to check that edits within the debounce period cause a single refresh.
+    """
+    scheduler = RecordingScheduler(debounce_seconds=0.2)
+    scheduler.start()
+    for inquiry_id in range(5):
+        scheduler.request_refresh(['ledningsmaaling_innmaaling_punkt'], [inquiry_id])
+        time.sleep(0.02)
+
+    assert [status['stale'] for status in scheduler.status() if status['view'] == 'Point'] == [True]
+    time.sleep(0.6)
+    scheduler.stop()
+
+    assert scheduler.refreshed == [('Point', True), ('Cable_Line', True)]
+    assert not any(status['stale'] for status in scheduler.status())
@@ -0,0 +1,267 @@
+"""
+This module provides a scheduler refreshing materialized views outside of requests.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from sql_executer import execute_statement
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Materialized views in the analytics schema built from each table in the public schema
+MATERIALIZED_VIEW_DEPENDENCIES = {
+    'geometri': ('Geometry',),
+    'henvendelse': ('Inquiry',),
+    'henvendelse_ledningsmaaling': ('InquiryMeasurement',),
+    'kommune': ('Municipality',),
+    'ledningsmaaling_innmaaling': ('Measurement',),
+    'ledningsmaaling_innmaaling_kobling': ('Measurement_Point', 'Cable_Line'),
+    'ledningsmaaling_innmaaling_punkt': ('Point', 'Cable_Line'),
+    'organisasjon': ('Organization',),
+}
+
+# Same order as update_queries/refresh_materialized_views.sql
+MATERIALIZED_VIEWS = (
+    'Geometry',
+    'InquiryMeasurement',
+    'Measurement',
+    'Measurement_Point',
+    'Municipality',
+    'Organization',
+    'Point',
+    'Inquiry',
+    'Cable_Line',
+)
+
+
+def _timestamp(value):
+    """Formats an epoch timestamp as ISO 8601, or None."""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc).isoformat()
+
+
+class ViewRefreshScheduler:
+    """Refreshes the materialized views depending on changed tables in a background thread.
+
+    Edits only mark the views depending on the changed table as stale. The views are
+    refreshed once no edit has been requested for `debounce_seconds`, or at the latest
+    `max_delay_seconds` after the first pending edit, so a burst of edits costs one
+    refresh. Views with a unique index are refreshed concurrently, without blocking
+    readers.
+
+    Args:
+        engine (Engine): The engine used for refreshing.
+        schema (str): The schema containing the materialized views.
+        debounce_seconds (float, optional): Quiet period before refreshing. Defaults to 2.
+        max_delay_seconds (float, optional): Maximum time a view stays pending, and the
+            delay before retrying a failed refresh. Defaults to 30.
+        on_refreshed (callable, optional): Called with the set of inquiry IDs passed to
+            request_refresh once their views are refreshed. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        engine,
+        schema,
+        debounce_seconds=2.0,
+        max_delay_seconds=30.0,
+        on_refreshed=None,
+    ):
+        self.engine = engine
+        self.schema = schema
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.on_refreshed = on_refreshed
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._pending = {}
+        self._inquiry_ids = set()
+        self._first_request = None
+        self._last_request = None
+        self._not_before = 0.0
+        self._concurrent_views = None
+        self._status = {
+            view: {
+                'view': view,
+                'stale': False,
+                'pending_since': None,
+                'last_refreshed_at': None,
+                'last_duration_seconds': None,
+                'concurrent': None,
+                'last_error': None,
+            }
+            for view in MATERIALIZED_VIEWS
+        }
+
+    def start(self):
+        """Starts the background thread."""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name='view-refresh', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, flush=True):
+        """Stops the background thread.
+
+        Args:
+            flush (bool, optional): Refresh pending views before stopping. Defaults to True.
+        """
+        with self._condition:
+            thread = self._thread
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+        with self._condition:
+            self._thread = None
+        if flush and self._pending:
+            self._refresh_pending()
+
+    def request_refresh(self, tables, inquiry_ids=()):
+        """Marks the materialized views depending on the tables as stale.
+
+        Args:
+            tables (iterable): Names of the changed tables in the public schema.
+            inquiry_ids (iterable, optional): IDs of the inquiries affected by the change.
+
+        Raises:
+            ValueError: If a table has no known dependent views.
+        """
+        now = time.time()
+        views = set()
+        for table in tables:
+            if table not in MATERIALIZED_VIEW_DEPENDENCIES:
+                raise ValueError(f'No materialized views depend on table {table}')
+            views.update(MATERIALIZED_VIEW_DEPENDENCIES[table])
+
+        with self._condition:
+            for view in views:
+                self._pending.setdefault(view, now)
+                self._status[view]['stale'] = True
+                self._status[view]['pending_since'] = _timestamp(self._pending[view])
+            self._inquiry_ids.update(inquiry_ids)
+            self._last_request = time.monotonic()
+            if self._first_request is None:
+                self._first_request = self._last_request
+            self._condition.notify_all()
+
+    def status(self):
+        """Returns the staleness of every materialized view.
+
+        Returns:
+            list: One dictionary per view with its staleness and last refresh.
+        """
+        now = time.time()
+        with self._condition:
+            views = []
+            for view in MATERIALIZED_VIEWS:
+                status = dict(self._status[view])
+                pending_since = self._pending.get(view)
+                status['stale_seconds'] = now - pending_since if pending_since else 0.0
+                views.append(status)
+            return views
+
+    def _run(self):
+        """Waits for pending views and refreshes them once the debounce period passed."""
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    delay = self._seconds_until_due()
+                    if delay is not None and delay <= 0:
+                        break
+                    self._condition.wait(timeout=delay)
+                if self._stopping:
+                    return
+            self._refresh_pending()
+
+    def _seconds_until_due(self):
+        """Returns the seconds until pending views should be refreshed, or None if none."""
+        if not self._pending:
+            return None
+        now = time.monotonic()
+        due = min(
+            self._last_request + self.debounce_seconds,
+            self._first_request + self.max_delay_seconds,
+        )
+        return max(due, self._not_before) - now
+
+    def _refresh_pending(self):
+        """Refreshes the pending views in dependency order."""
+        with self._condition:
+            pending = self._pending
+            inquiry_ids = self._inquiry_ids
+            self._pending = {}
+            self._inquiry_ids = set()
+            self._first_request = None
+
+        failed = {}
+        for view in MATERIALIZED_VIEWS:
+            if view not in pending:
+                continue
+            start = time.monotonic()
+            concurrent = False
+            try:
+                concurrent = view in self._get_concurrent_views()
+                self._refresh_view(view, concurrent)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error('Failed to refresh materialized view %s: %s', view, e)
+                failed[view] = pending[view]
+                with self._condition:
+                    self._status[view]['last_error'] = str(e)
+                continue
+
+            duration = time.monotonic() - start
+            logger.info('Refreshed materialized view %s in %.2f s', view, duration)
+            with self._condition:
+                status = self._status[view]
+                status['last_refreshed_at'] = _timestamp(time.time())
+                status['last_duration_seconds'] = duration
+                status['concurrent'] = concurrent
+                status['last_error'] = None
+                if view not in self._pending:
+                    status['stale'] = False
+                    status['pending_since'] = None
+
+        with self._condition:
+            if failed:
+                # Retry later together with any edits requested meanwhile
+                for view, since in failed.items():
+                    self._pending[view] = min(since, self._pending.get(view, since))
+                self._inquiry_ids.update(inquiry_ids)
+                self._last_request = self._first_request = time.monotonic()
+                self._not_before = self._last_request + self.max_delay_seconds
+                return
+            self._not_before = 0.0
+
+        if self.on_refreshed is not None and inquiry_ids:
+            self.on_refreshed(inquiry_ids)
+
+    def _get_concurrent_views(self):
+        """Returns the materialized views which have a unique index, loaded once."""
+        if self._concurrent_views is None:
+            with self.engine.connect() as connection:
+                result = execute_statement(
+                    connection=connection,
+                    name='update_queries/fetch_concurrently_refreshable_views',
+                    params={'schema': self.schema},
+                )
+                self._concurrent_views = {row['view_name'] for row in result.mappings()}
+        return self._concurrent_views
+
+    def _refresh_view(self, view, concurrent):
+        """Refreshes a single materialized view in its own transaction."""
+        concurrently = 'CONCURRENTLY ' if concurrent else ''
+        with self.engine.begin() as connection:
+            connection.execute(
+                text(f'REFRESH MATERIALIZED VIEW {concurrently}"{self.schema}"."{view}"')
+            )
@@ -139,7 +139,7 @@ export class MapViewComponent implements OnInit, OnDestroy, AfterViewInit {
    */
   private fetchAndProcessTerrain(bbox: string, width: number, height: number) {
     this.terrainService
-      .fetchGeoTIFF(bbox, width, height)
+      .fetchGeoTIFF(bbox, width, height, true)
       .pipe(
         switchMap(response => {
           const filePath = response.file_path;
@@ -1,4 +1,4 @@
-import { TestBed } from '@angular/core/testing';
+import { fakeAsync, TestBed, tick } from '@angular/core/testing';
 import {
   HttpTestingController,
   provideHttpClientTesting,
@@ -58,6 +58,41 @@ describe('TerrainService', () => {
     req.flush(mockResponse);
   });
 
+  it('should poll a queued tile job until it is done', fakeAsync(() => {
+    const filePath = '/path/to/geotiff.tif';
+    let tileSetUrl: string | undefined;
+
+    service.processGeoTIFF(filePath).subscribe(response => {
+      tileSetUrl = response.tileSetUrl;
+    });
+
+    httpMock
+      .expectOne(
+        `${service['apiUrl']}/process-geotiff?file_path=${encodeURIComponent(filePath)}`
+      )
+      .flush({
+        job_id: 'abc',
+        status: 'queued',
+        status_url: '/process-geotiff/jobs/abc',
+      });
+
+    tick(service['pollInterval']);
+    httpMock
+      .expectOne(`${service['apiUrl']}/process-geotiff/jobs/abc`)
+      .flush({ job_id: 'abc', status: 'running', progress: 0.5 });
+
+    tick(service['pollInterval']);
+    httpMock
+      .expectOne(`${service['apiUrl']}/process-geotiff/jobs/abc`)
+      .flush({
+        job_id: 'abc',
+        status: 'done',
+        tileSetUrl: 'http://localhost:8080/tilesets/output/abc',
+      });
+
+    expect(tileSetUrl).toBe('http://localhost:8080/tilesets/output/abc');
+  }));
+
   it('should handle errors correctly when fetching GeoTIFF', () => {
     service.fetchGeoTIFF('272669,7037582,273109,7038148', 440, 566).subscribe({
       next: () => fail('expected an error, not data'),
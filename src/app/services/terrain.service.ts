@@ -1,12 +1,35 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { catchError, Observable, throwError } from 'rxjs';
+import {
+  catchError,
+  last,
+  map,
+  Observable,
+  of,
+  switchMap,
+  takeWhile,
+  throwError,
+  timer,
+} from 'rxjs';
+
+/**
+ * State of a terrain tile job on the server.
+ */
+export interface TileJob {
+  job_id?: string;
+  status?: 'queued' | 'running' | 'done' | 'failed';
+  progress?: number;
+  error?: string | null;
+  status_url?: string;
+  tileSetUrl?: string;
+}
 
 @Injectable({
   providedIn: 'root',
 })
 export class TerrainService {
   private apiUrl = 'http://localhost:8000';
+  private pollInterval = 1000;
 
   constructor(private http: HttpClient) {}
 
@@ -15,14 +38,19 @@ export class TerrainService {
    * @param bbox - The bounding box coordinates as a string.
    * @param width - The width of the GeoTIFF image.
    * @param height - The height of the GeoTIFF image.
+   * @param mosaic - Whether areas larger than the WCS limit are fetched at full resolution.
    * @returns An Observable that emits an object with the file path.
    */
   fetchGeoTIFF(
     bbox: string,
     width: number,
-    height: number
+    height: number,
+    mosaic = false
   ): Observable<{ file_path: string }> {
-    const url = `${this.apiUrl}/fetch-geotiff?bbox=${bbox}&width=${width}&height=${height}`;
+    let url = `${this.apiUrl}/fetch-geotiff?bbox=${bbox}&width=${width}&height=${height}`;
+    if (mosaic) {
+      url += '&mosaic=true';
+    }
     return this.http
       .get<{ file_path: string }>(url)
       .pipe(catchError(this.handleError));
@@ -30,14 +58,36 @@ export class TerrainService {
 
   /**
    * Processes a GeoTIFF file on the server.
+   * Tiles are generated by a background job, which is polled until it is done.
    * @param filePath - The file path of the GeoTIFF file.
    * @returns An Observable that emits an object with the tile set URL.
    */
   processGeoTIFF(filePath: string): Observable<{ tileSetUrl: string }> {
     const url = `${this.apiUrl}/process-geotiff?file_path=${encodeURIComponent(filePath)}`;
-    return this.http
-      .get<{ tileSetUrl: string }>(url)
-      .pipe(catchError(this.handleError));
+    return this.http.get<TileJob>(url).pipe(
+      switchMap(job => (job.tileSetUrl ? of(job) : this.pollTileJob(job))),
+      map(job => {
+        if (!job.tileSetUrl) {
+          throw new Error(job.error ?? 'Terrain tile job failed');
+        }
+        return { tileSetUrl: job.tileSetUrl };
+      }),
+      catchError(this.handleError)
+    );
+  }
+
+  /**
+   * Polls a terrain tile job until it is done or failed.
+   * @param job - The job as returned when it was submitted.
+   * @returns An Observable that emits the finished job.
+   */
+  private pollTileJob(job: TileJob): Observable<TileJob> {
+    const url = `${this.apiUrl}${job.status_url}`;
+    return timer(this.pollInterval, this.pollInterval).pipe(
+      switchMap(() => this.http.get<TileJob>(url)),
+      takeWhile(state => state.status !== 'done' && state.status !== 'failed', true),
+      last()
+    );
   }
 
   /**